@@ -14,4 +14,4 @@ OUTPUT_FILE = "../data/synthetic_customers_deepseek.csv"
 
 # Initialize and run generator
 generator = DeepSeekCustomerGenerator(API_KEY)
-generator.generate_customers(INPUT_DATA, OUTPUT_FILE)
\ No newline at end of file
+generator.generate_customers_concurrent(INPUT_DATA, OUTPUT_FILE, max_concurrency=8)
\ No newline at end of file
@@ -1,6 +1,6 @@
+import asyncio
 import pandas as pd
 import numpy as np
-import time
 from config import API_KEY_Groq
 import os
 import sys
@@ -10,16 +10,37 @@ sys.path.append(ROOT_DIR)
 print(ROOT_DIR)
 from src.component.transaction import TransactionSimulator
 from src.component.transaction import TransactionCTGAN
+from src.component.ctgan_training import TrainingProfile
 from src.Data_Synthesizer.code.transaction_deepseek_synthesizer import TransactionGenerator
+from src.component.job_runner import JobJournal
+from src.component.enrichment import DedupEnricher
+from src.component.llm_client import AsyncLLMClient
+from src.component.sinks import DataFrameSink, open_sink
 import random
 
+# CTGAN columns identifying one enrichment lookup: rows with equal values share one API call
+ENRICHMENT_KEY = ['merchant_name', 'zipcode', 'mapped_category']
+# Customer profile used in enrichment prompts (CTGAN rows carry no demographics)
+ENRICHMENT_PROFILE = {"age": 35, "gender": "resident", "household_size": 2, "income": 75000}
+
 
 class HybridTransactionGenerator:
-    def __init__(self, groq_api_key: str, ctgan_epochs=100):
+    def __init__(self, groq_api_key: str, ctgan_epochs=100, warm_start_epochs=5,
+                 enrich_batch_size=500, enrich_concurrency=8, enrich_requests_per_second=5.0):
         self.groq_gen = TransactionGenerator(api_key=groq_api_key)
-        self.ctgan = TransactionCTGAN(epochs=ctgan_epochs)
+        # Feedback cycles continue training for this many epochs on the new rows
+        # (None / 0 = refit from scratch on all data every cycle). Warm starts train
+        # through CTGANTrainer, so the discriminator and optimizers carry over too.
+        self.warm_start_epochs = warm_start_epochs
+        self.training_profile = TrainingProfile() if warm_start_epochs else None
+        self.ctgan = TransactionCTGAN(epochs=ctgan_epochs, training_profile=self.training_profile)
         self.feedback_data = pd.DataFrame()
         self.validation_threshold = 0.7  # Fraud score threshold
+        # Enrichment: rows per batch, max in-flight requests and request rate
+        self.enrich_batch_size = enrich_batch_size
+        self.enrich_concurrency = enrich_concurrency
+        self.enrich_requests_per_second = enrich_requests_per_second
+        self._enricher = None
 
     def _combine_data_sources(self, simulated_df, groq_df):
         """Merge and preprocess data from both sources"""
@@ -33,34 +54,161 @@ class HybridTransactionGenerator:
         combined['timestamp'] = pd.to_datetime(combined['timestamp'])
         return combined
 
-    def _enrich_with_groq(self, synthetic_df):
-        """Add Groq API validation to CTGAN outputs"""
-        enriched_data = []
-        for _, row in synthetic_df.iterrows():
-            try:
-                # Generate validation data through Groq API
+    def _enrich_with_groq(self, synthetic_df, output_path=None):
+        """
+        Add Groq API validation to CTGAN outputs.
+
+        Rows are enriched batch by batch with concurrent, rate-limited requests; rows
+        with the same (merchant, zipcode, category) share one request, and answers are
+        reused across cycles. With `output_path` (.parquet / .csv / .arrow), every batch
+        is also appended to that file as soon as it is done. Returns the enriched rows.
+        """
+        return asyncio.run(self._enrich_with_groq_async(synthetic_df, output_path))
+
+    async def _enrich_with_groq_async(self, synthetic_df, output_path=None):
+        frame_sink = DataFrameSink()
+        sinks = [frame_sink]
+        if output_path is not None:
+            sinks.append(open_sink(output_path))
+
+        async with AsyncLLMClient(self.groq_gen.api_url, self.groq_gen.headers,
+                                  requests_per_second=self.enrich_requests_per_second,
+                                  max_concurrency=self.enrich_concurrency) as client:
+
+            async def fetch(key):
+                merchant_name, zipcode, category = key
                 merchant = {
-                    "Name": row['merchant_name'],
-                    "Category": row['mapped_category'],
-                    "Zipcode": row['zipcode']
-                }
-                customer = {
-                    "customer_id": row['customer_id'],
-                    "income": 75000,  # Default value, can be enhanced
-                    "zipcode": row['zipcode']
+                    "Name": merchant_name,
+                    "Category": category,
+                    "Zipcode": zipcode,
+                    "mapped_category": category
                 }
+                customer = {"customer_id": None, "zipcode": zipcode, **ENRICHMENT_PROFILE}
+                return await self.groq_gen._generate_transaction_async(client, customer, merchant)
+
+            if self._enricher is None:
+                self._enricher = DedupEnricher(fetch, ENRICHMENT_KEY, batch_size=self.enrich_batch_size)
+            else:
+                self._enricher.fetch = fetch  # cached answers carry over; new lookups use this client
+
+            try:
+                await self._enricher.run(synthetic_df, self._merge_enrichment, sinks)
+            finally:
+                for sink in sinks:
+                    sink.close()
+
+        print(f"Enrichment: {self._enricher.stats()}, LLM client: {client.stats()}")
+        return frame_sink.frame()
+
+    @staticmethod
+    def _merge_enrichment(row, txn):
+        """Enriched record for one CTGAN row from the (shared) API transaction of its key."""
+        enriched = dict(txn, merchant_details=dict(txn['merchant_details']))
+        enriched['customer_id'] = row['customer_id']
+        enriched['category'] = row['category']
+        enriched['ctgan_amount'] = row['transaction_amount']
+        enriched['fraud_score'] = random.random()  # Replace with actual API validation
+        return enriched
+
+    @staticmethod
+    def _to_training_rows(enriched):
+        """Map enriched records back onto the CTGAN training schema (see _combine_data_sources)."""
+        if enriched.empty:
+            return pd.DataFrame()
+        details = pd.DataFrame(enriched['merchant_details'].tolist(), index=enriched.index)
+        return pd.DataFrame({
+            'customer_id': enriched['customer_id'],
+            'zipcode': details['zipcode'],
+            'category': enriched['category'],
+            'merchant_name': details['name'],
+            'mapped_category': details['category'],
+            'transaction_amount': enriched['amount'],
+            'timestamp': pd.to_datetime(enriched['timestamp']),
+            'data_source': 'groq',
+        })
+
+    def train_hybrid_model(self, customers_path, merchants_path, cycles=3, work_dir=None):
+        """
+        Main training loop with feedback integration.
+
+        With `work_dir`, every stage is checkpointed there and recorded in a JobJournal
+        (hybrid_journal.jsonl): the Groq transactions (journaled row by row), the initial
+        training data and model, and each cycle's feedback rows and retrained model
+        (enriched rows are also streamed to enriched_cycle_<n>.csv).
+        Rerunning with the same `work_dir` resumes after the last completed stage.
+        """
+        if work_dir is None:
+            return self._train_hybrid_model(customers_path, merchants_path, cycles)
 
-                txn = self.groq_gen._generate_transactions_api(customer, merchant)
-                txn['ctgan_amount'] = row['transaction_amount']
-                txn['fraud_score'] = random.random()  # Replace with actual API validation
-                enriched_data.append(txn)
-                time.sleep(0.1)  # Rate limiting
-            except Exception as e:
-                print(f"Enrichment failed: {str(e)}")
-        return pd.DataFrame(enriched_data)
-
-    def train_hybrid_model(self, customers_path, merchants_path, cycles=3):
-        """Main training loop with feedback integration"""
+        os.makedirs(work_dir, exist_ok=True)
+        with JobJournal(os.path.join(work_dir, "hybrid_journal.jsonl")) as journal:
+            # Initial Groq data generation
+            groq_path = os.path.join(work_dir, "groq_transactions.csv")
+            if not journal.is_done("groq"):
+                self.groq_gen.load_data(customers_path, merchants_path)
+                self.groq_gen.generate_transactions(groq_path, target=1000,
+                                                    journal_path=os.path.join(work_dir, "groq_transactions.journal.jsonl"))
+                journal.mark_done("groq", path=groq_path)
+
+            # Initial CTGAN training
+            if journal.is_done("initial"):
+                combined_data = pd.read_pickle(journal.info("initial")["data"])
+            else:
+                groq_data = pd.read_csv(groq_path)
+                sim = TransactionSimulator(customers=pd.read_csv(customers_path),
+                                           merchants=pd.read_csv(merchants_path))
+                simulated_data = sim.simulate_transactions(num_per_customer=30)
+                combined_data = self._combine_data_sources(simulated_data, groq_data)
+                self.ctgan.fit(combined_data)
+
+                data_path = os.path.join(work_dir, "combined_data.pkl")
+                combined_data.to_pickle(data_path)
+                journal.mark_done("initial", data=data_path, **self._save_checkpoint(work_dir, "initial"))
+
+            # Resume from the latest completed cycle
+            done_cycles = [cycle for cycle in range(cycles) if journal.is_done(f"cycle-{cycle + 1}")]
+            latest = f"cycle-{done_cycles[-1] + 1}" if done_cycles else "initial"
+            if self.ctgan.synthesizer is None:
+                self._load_checkpoint(journal.info(latest))
+            self.feedback_data = pd.DataFrame(
+                [row for cycle in done_cycles for row in journal.rows(f"cycle-{cycle + 1}")]
+            )
+
+            # Feedback loop training
+            for cycle in range(cycles):
+                if cycle in done_cycles:
+                    continue
+                print(f"Training cycle {cycle + 1}/{cycles}")
+                valid_data = self._feedback_cycle(
+                    combined_data, enrich_path=os.path.join(work_dir, f"enriched_cycle_{cycle + 1}.csv")
+                )
+
+                journal.mark_done(f"cycle-{cycle + 1}", rows=valid_data.to_dict('records'),
+                                  **self._save_checkpoint(work_dir, f"cycle_{cycle + 1}"))
+
+        return self.ctgan
+
+    def _save_checkpoint(self, work_dir, stage):
+        """Save the model of `stage` (plus the trainer state warm starts continue from);
+        returns the paths to record in the journal."""
+        paths = {"model": os.path.join(work_dir, f"ctgan_{stage}.pkl")}
+        self.ctgan.save(paths["model"])
+        if self.ctgan.trainer_ is not None:
+            paths["trainer"] = os.path.join(work_dir, f"ctgan_{stage}.trainer.pt")
+            self.ctgan.save_trainer_state(paths["trainer"])
+        return paths
+
+    def _load_checkpoint(self, info):
+        """Reload the model (and trainer state, if saved) recorded by _save_checkpoint."""
+        epochs = self.ctgan.epochs
+        self.ctgan = TransactionCTGAN.load(info["model"])
+        self.ctgan.epochs = epochs
+        self.ctgan.training_profile = self.training_profile
+        if info.get("trainer"):
+            self.ctgan.load_trainer_state(info["trainer"])
+
+    def _train_hybrid_model(self, customers_path, merchants_path, cycles=3):
+        """train_hybrid_model without checkpoints (everything stays in memory)"""
         # Initial Groq data generation
         self.groq_gen.load_data(customers_path, merchants_path)
         self.groq_gen.generate_transactions("groq_transactions.csv", target=1000)
@@ -78,27 +226,43 @@ class HybridTransactionGenerator:
         # Feedback loop training
         for cycle in range(cycles):
             print(f"Training cycle {cycle + 1}/{cycles}")
+            self._feedback_cycle(combined_data)
+
+        return self.ctgan
 
-            # Generate new synthetic data
-            synthetic = self.ctgan.generate(num_samples=5000)
+    def _feedback_cycle(self, combined_data, enrich_path=None):
+        """One feedback cycle: sample, validate through Groq, update the model with the new rows.
+        Enriched rows are streamed to `enrich_path` if given. Returns the validated rows
+        added to self.feedback_data."""
+        # Generate new synthetic data
+        synthetic = self.ctgan.generate(num_samples=5000)
 
-            # Validate and enrich with Groq
-            validated = self._enrich_with_groq(synthetic)
-            valid_data = validated[validated['fraud_score'] < self.validation_threshold]
+        # Validate and enrich with Groq
+        validated = self._enrich_with_groq(synthetic, output_path=enrich_path)
+        valid_data = validated[validated['fraud_score'] < self.validation_threshold]
 
-            # Augment training data
-            self.feedback_data = pd.concat([self.feedback_data, valid_data], ignore_index=True)
+        # Augment training data
+        self.feedback_data = pd.concat([self.feedback_data, valid_data], ignore_index=True)
 
+        if self.warm_start_epochs:
+            # Warm start on this cycle's rows plus an equal-sized replay sample of the
+            # original data, so cycle time does not grow with the cycle count
+            if len(valid_data):
+                new_rows = self._to_training_rows(valid_data)
+                replay = combined_data.sample(n=min(len(combined_data), len(new_rows)))
+                self.ctgan.partial_fit(pd.concat([new_rows, replay], ignore_index=True),
+                                       epochs=self.warm_start_epochs)
+        else:
             # Retrain with augmented dataset
-            updated_data = pd.concat([combined_data, self.feedback_data], ignore_index=True)
+            updated_data = pd.concat([combined_data, self._to_training_rows(self.feedback_data)],
+                                     ignore_index=True)
             self.ctgan.fit(updated_data)
+        return valid_data
 
-        return self.ctgan
-
-    def generate_enhanced_transactions(self, num_samples=1000):
-        """Generate final enhanced transactions"""
+    def generate_enhanced_transactions(self, num_samples=1000, output_path=None):
+        """Generate final enhanced transactions (streamed to `output_path` as they are enriched, if given)"""
         synthetic = self.ctgan.generate(num_samples)
-        return self._enrich_with_groq(synthetic.head(num_samples))
+        return self._enrich_with_groq(synthetic.head(num_samples), output_path=output_path)
 
     def save_model(self, path):
         """Save trained hybrid model"""
@@ -124,12 +288,14 @@ if __name__ == "__main__":
     trained_model = hybrid_gen.train_hybrid_model(
         customers_path="../data/synthetic_customer_gan.csv",
         merchants_path="../data/dc_businesses_cleaned.csv",
-        cycles=3
+        cycles=3,
+        work_dir="hybrid_run"  # rerun to resume after a crash
     )
 
     # Generate enhanced transactions
-    final_transactions = hybrid_gen.generate_enhanced_transactions(5000)
-    final_transactions.to_csv("enhanced_hybrid_transactions.csv", index=False)
+    final_transactions = hybrid_gen.generate_enhanced_transactions(
+        5000, output_path="enhanced_hybrid_transactions.csv"
+    )
 
     # Save model for API conversion
     hybrid_gen.save_model("hybrid_ctgan_model.pkl")
@@ -0,0 +1,85 @@
+"""
+Local mock of an OpenAI-style /v1/chat/completions endpoint for benchmarking the
+synthesizers without paying for API calls.
+
+    MOCK_LATENCY=0.8 MOCK_ERROR_RATE=0.05 python mock_llm_server.py
+
+then point a generator at it, e.g.
+    DeepSeekCustomerGenerator("test-key", api_url="http://127.0.0.1:8900/v1/chat/completions")
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.environ.get("MOCK_LATENCY", "0.5"))  # seconds per request
+ERROR_RATE = float(os.environ.get("MOCK_ERROR_RATE", "0.0"))  # fraction of 429 responses
+
+app = FastAPI()
+
+
+def _fake_customers(prompt: str) -> dict:
+    """Customer profiles in the format DeepSeekCustomerGenerator asks for"""
+    count = re.search(r"Generate (\d+)", prompt)
+    zipcode = re.search(r"zipcode (\d+)", prompt)
+    n = min(int(count.group(1)) if count else 5, 50)
+    return {"customers": [
+        {
+            "zipcode": zipcode.group(1) if zipcode else "20001",
+            "age": random.randint(18, 85),
+            "marital_status": random.choice(["married", "single"]),
+            "household_size": random.randint(1, 6),
+            "income": round(random.uniform(20000, 150000), 2),
+            "gender": random.choice(["female", "male"]),
+            "earners": random.randint(0, 3)
+        }
+        for _ in range(n)
+    ]}
+
+
+def _fake_transaction() -> dict:
+    return {
+        "amount": round(random.uniform(10, 200), 2),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "merchant_details": {"name": "Mock Merchant", "category": "Restaurant", "zipcode": "20001"},
+        "payment_type": "credit_card"
+    }
+
+
+def _fake_content(prompt: str) -> str:
+    if "customer profiles" in prompt:
+        return json.dumps(_fake_customers(prompt))
+    count = re.search(r"Generate exactly (\d+)", prompt)
+    if count:
+        return json.dumps([_fake_transaction() for _ in range(int(count.group(1)))])
+    return json.dumps(_fake_transaction())
+
+
+@app.post("/v1/chat/completions")
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(LATENCY)
+    if random.random() < ERROR_RATE:
+        return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+
+    prompt = body["messages"][-1]["content"]
+    content = _fake_content(prompt)
+    return {
+        "id": f"mock-{random.randint(0, 10**9)}",
+        "object": "chat.completion",
+        "model": body.get("model", "mock"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                  "total_tokens": (len(prompt) + len(content)) // 4}
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.environ.get("MOCK_PORT", "8900")))
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Add the project root directory to Python path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.append(ROOT_DIR)
+from src.component.postprocess import finalize_income_profiles
+
+# Benchmark: bracket -> number post-processing of AdvancedIncomeModel.generate,
+# row-wise .apply (previous implementation) vs. categorical-code lookup.
+
+AGE_BRACKETS = ['15-24', '25-44', '45-64', '65+']
+EARNERS = ['0', '1', '2', '3+']
+
+
+def synthetic_households(num_rows, seed=0):
+    """Household rows shaped like CTGANSynthesizer.sample output."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'zipcode': rng.choice(['20001', '20002', '20003'], num_rows),
+        'age_bracket': rng.choice(AGE_BRACKETS, num_rows),
+        'marital_status': rng.choice(['married', 'single'], num_rows),
+        'household_size': rng.integers(1, 8, num_rows),
+        'income': rng.normal(80000, 20000, num_rows).round(2),
+        'gender': rng.choice(['male', 'female'], num_rows),
+        'earners': rng.choice(EARNERS, num_rows),
+    })
+
+
+def finalize_rowwise(synthetic):
+    """Previous implementation: one string split and np.random.randint call per row."""
+    def bracket_to_age(bracket):
+        if '-' in bracket:
+            low, high = bracket.split('-')
+            return np.random.randint(int(low), int(high) + 1)
+        else:
+            return np.random.randint(65, 85)
+    synthetic['age'] = synthetic['age_bracket'].apply(bracket_to_age)
+
+    def parse_earners(e):
+        if e == '3+':
+            return np.random.randint(3, 6)
+        return int(e)
+    synthetic['earners'] = synthetic['earners'].apply(parse_earners)
+    return synthetic[['zipcode', 'age', 'marital_status',
+                      'household_size', 'income', 'gender', 'earners']]
+
+
+def time_per_million(fn, num_rows, repeats=3):
+    """Best-of-`repeats` seconds for `fn` on `num_rows` rows, scaled to 1M rows."""
+    best = float('inf')
+    for _ in range(repeats):
+        frame = synthetic_households(num_rows)
+        start = time.perf_counter()
+        fn(frame)
+        best = min(best, time.perf_counter() - start)
+    return best * 1_000_000 / num_rows
+
+
+if __name__ == "__main__":
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    rowwise = time_per_million(finalize_rowwise, num_rows)
+    vectorized = time_per_million(lambda frame: finalize_income_profiles(frame, rng=0), num_rows)
+    print(f"Rows per run: {num_rows:,}")
+    print(f"Row-wise .apply:     {rowwise:8.3f} s per 1M rows")
+    print(f"Vectorized lookup:   {vectorized:8.3f} s per 1M rows ({rowwise / vectorized:.0f}x faster)")
+
+    # Same value ranges per bracket
+    old = finalize_rowwise(synthetic_households(100_000))
+    new = finalize_income_profiles(synthetic_households(100_000), rng=0)
+    for name in ['age', 'earners']:
+        print(f"{name}: row-wise {old[name].min()}..{old[name].max()} (mean {old[name].mean():.2f}), "
+              f"vectorized {new[name].min()}..{new[name].max()} (mean {new[name].mean():.2f})")
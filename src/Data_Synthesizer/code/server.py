@@ -8,12 +8,22 @@ import os
 import sys
 import pandas as pd
 from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+import time
 import uvicorn
 
 # Add project root to sys.path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 sys.path.append(project_root)
 
+# Profile pool sizing: capacity must cover the largest request (1000 profiles)
+POOL_CAPACITY = 5000
+POOL_LOW_WATERMARK = 1000
+
+# Exported generator (see AdvancedIncomeModel.export_artifacts); served by the
+# lightweight ctgan_runtime instead of the pickled SDV model when present
+ARTIFACTS_PATH = "../model/income_artifacts"
+
 
 # --- Application Setup ---
 @asynccontextmanager
@@ -21,14 +31,36 @@ async def lifespan(app: FastAPI):
     """Lifespan manager for resource loading"""
     # Load model and data
     try:
-        from src.component.customer import AdvancedIncomeModel
-        app.state.model = AdvancedIncomeModel.load("../model/income_model.pkl")
+        from src.component.profile_pool import ProfilePool
+        from src.component.artifacts import has_artifacts
+        start = time.perf_counter()
+        if has_artifacts(ARTIFACTS_PATH):
+            # Inference-only runtime: numpy forward pass, no sdv / torch import
+            from src.component.ctgan_runtime import load_runtime
+            app.state.model = load_runtime(ARTIFACTS_PATH)
+            app.state.load_seconds = {"income_artifacts": time.perf_counter() - start}
+        else:
+            from src.component.customer import AdvancedIncomeModel
+            app.state.model = AdvancedIncomeModel.load("../model/income_model.pkl")
+            app.state.load_seconds = {"income_model": time.perf_counter() - start}
+        for name, seconds in app.state.load_seconds.items():
+            print(f"Loaded {name} in {seconds:.3f}s")
         training_data = pd.read_csv("../data/cleaned_income_data.csv")
         app.state.valid_zipcodes = training_data["Zipcode"].dropna().astype(int).unique().tolist()
+
+        # Warm pool of pre-sampled profiles per zipcode (None = no zipcode requested)
+        app.state.pool = ProfilePool(
+            lambda zipcode, n: app.state.model.generate(n, zipcode=zipcode),
+            capacity=POOL_CAPACITY,
+            low_watermark=POOL_LOW_WATERMARK
+        )
+        app.state.pool.prefill([None])
     except Exception as e:
         raise RuntimeError(f"Initialization failed: {str(e)}")
     yield
     # Cleanup resources
+    app.state.pool.shutdown()
+    app.state.pool = None
     app.state.model = None
     app.state.valid_zipcodes = []
 
@@ -54,6 +86,7 @@ class ProfileResponse(BaseModel):
     profiles: List[Dict]
     generated_count: int
     warnings: Optional[List[str]] = None
+    pool_hit: Optional[bool] = None
 
 
 class ErrorResponse(BaseModel):
@@ -101,6 +134,7 @@ async def generate_profiles(
         request_data: GenerationRequest = Body(...)
 ):
     """Generate synthetic customer profiles based on natural language input"""
+    from src.component.postprocess import SamplingError
     try:
         # Input validation
         if not re.search(r"(generate|create|make)\s+(\d+)?\s*(customer|profile)",
@@ -114,35 +148,26 @@ async def generate_profiles(
         # Parse parameters
         num_profiles, zipcode = parse_user_input(request_data.input_text)
 
-        # Generate data
-        synthetic_data = app.state.model.generate(num_profiles)
+        # Slice pre-sampled profiles from the pool; on a miss sample inline off the
+        # event loop (conditioned on the zipcode, so exactly num_profiles rows come back),
+        # through the pool so it runs ahead of, never alongside, refills on the same model
+        synthetic_data = app.state.pool.take(zipcode, num_profiles)
+        pool_hit = synthetic_data is not None
+        if not pool_hit:
+            synthetic_data = await run_in_threadpool(app.state.pool.sample, zipcode, num_profiles)
         synthetic_data.columns = synthetic_data.columns.str.lower()
 
-        # Apply zipcode filter
-        warnings = []
-        if zipcode:
-            if 'zipcode' not in synthetic_data.columns:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Zipcode field missing in generated data"
-                )
-
-            filtered_data = synthetic_data[synthetic_data["zipcode"] == zipcode]
-            if len(filtered_data) == 0:
-                warnings.append(f"No profiles for zipcode {zipcode}")
-                return ProfileResponse(
-                    profiles=synthetic_data.to_dict(orient="records"),
-                    generated_count=len(synthetic_data),
-                    warnings=warnings
-                )
-
-            synthetic_data = filtered_data
-
         return ProfileResponse(
             profiles=synthetic_data.to_dict(orient="records"),
-            generated_count=len(synthetic_data)
+            generated_count=len(synthetic_data),
+            pool_hit=pool_hit
         )
 
+    except HTTPException:
+        raise
+    except SamplingError as se:
+        # e.g. "No profiles for zipcode 20001: ..."
+        raise HTTPException(status_code=400, detail=str(se))
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
@@ -152,6 +177,18 @@ async def generate_profiles(
         )
 
 
+@router.get("/pool/metrics")
+async def pool_metrics():
+    """Profile pool hit/miss and refill metrics"""
+    return app.state.pool.stats()
+
+
+@router.get("/model/metrics")
+async def model_metrics():
+    """Startup load time per model artifact (seconds)"""
+    return app.state.load_seconds
+
+
 # --- Application Assembly ---
 app.include_router(router)
 
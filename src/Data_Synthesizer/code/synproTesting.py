@@ -1,3 +1,5 @@
+import os
+import sys
 import numpy as np
 import pandas as pd
 import torch
@@ -5,10 +7,18 @@ from sklearn.base import BaseEstimator, TransformerMixin
 
 from synpro.model import SynPro
 
+# Add the project root directory to Python path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.append(ROOT_DIR)
+from src.component.household import expand_households
+from src.component.postprocess import finalize_income_profiles
+
 class DataPreprocessor(BaseEstimator, TransformerMixin):
     """Enhanced data processor with full demographic expansion"""
 
-    def __init__(self):
+    def __init__(self, vectorized=True, random_state=None):
+        self.vectorized = vectorized  # use the array-based expansion instead of iterrows()
+        self.random_state = random_state
         self.required_columns = [
             'Zipcode',
             # Age distribution columns
@@ -47,6 +57,9 @@ class DataPreprocessor(BaseEstimator, TransformerMixin):
 
     def transform(self, X):
         """Convert aggregated data to household-level format with full demographics"""
+        if self.vectorized:
+            return expand_households(X, self.random_state)
+
         households = []
 
         for _, row in X.iterrows():
@@ -209,34 +222,8 @@ class AdvancedIncomeModelSynPro:
         # 1. Generate synthetic data
         synthetic = self.synthesizer.sample(n=num_samples)
 
-        # 2. Convert 'age_bracket' to numeric 'age'
-        if 'age_bracket' in synthetic.columns:
-            def bracket_to_age(bracket):
-                if '-' in str(bracket):
-                    low, high = bracket.split('-')
-                    return np.random.randint(int(low), int(high) + 1)
-                elif str(bracket).endswith('+'):
-                    # e.g. '65+' bracket
-                    return np.random.randint(65, 85)
-                else:
-                    # fallback
-                    return 30  # or anything default
-            synthetic['age'] = synthetic['age_bracket'].apply(bracket_to_age)
-
-        # 3. Convert '3+' earners to random range
-        if 'earners' in synthetic.columns:
-            def parse_earners(e):
-                if e == '3+':
-                    return np.random.randint(3, 6)
-                try:
-                    return int(e)
-                except ValueError:
-                    return 2  # fallback
-            synthetic['earners'] = synthetic['earners'].apply(parse_earners)
-
-        # 4. Return final columns
-        return synthetic[['zipcode', 'age', 'marital_status',
-                          'household_size', 'income', 'gender', 'earners']]
+        # 2. Brackets -> numeric 'age' / 'earners' (unparseable labels: age 30, 2 earners)
+        return finalize_income_profiles(synthetic, age_fallback=30, earner_fallback=2)
 
     def save(self, path):
         """
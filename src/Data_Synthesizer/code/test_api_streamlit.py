@@ -68,20 +68,10 @@ if st.button("Generate Profiles"):
                 if zipcode and zipcode not in valid_zipcodes:
                     st.error(f"Invalid zipcode: {zipcode}. Supported zipcodes: {', '.join(map(str, valid_zipcodes))}")
                 else:
-                    # Generate the synthetic data.
-                    synthetic_data = model.generate(num_profiles)
+                    # Generate the synthetic data, conditioned on the zipcode if one was given.
+                    synthetic_data = model.generate(num_profiles, zipcode=zipcode)
                     synthetic_data.columns = synthetic_data.columns.str.lower()
 
-                    if zipcode:
-                        if "zipcode" not in synthetic_data.columns:
-                            st.error("Zipcode field missing in generated data")
-                        else:
-                            filtered_data = synthetic_data[synthetic_data["zipcode"] == zipcode]
-                            if filtered_data.empty:
-                                st.warning(f"No profiles generated for zipcode {zipcode}. Showing all generated data.")
-                            else:
-                                synthetic_data = filtered_data
-
                     st.write(f"Generated {len(synthetic_data)} profiles:")
                     st.dataframe(synthetic_data)
         except Exception as e:
@@ -5,6 +5,7 @@ ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '
 sys.path.append(ROOT_DIR)
 from src.component.transaction import TransactionSimulator
 from src.component.transaction import TransactionCTGAN
+from src.component.sinks import print_chunk_stats
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -20,22 +21,26 @@ customers_file = 'synthetic_customers_deepseek.csv'
 merchants_path = os.path.join(data_dir, merchants_file)
 customers_path = os.path.join(data_dir, customers_file)
 
-customers_df = pd.read_csv(customers_path)
-merchants_df = pd.read_csv(merchants_path)
+# Guard the script body: the parallel sampler's worker processes re-import this module
+if __name__ == "__main__":
+    customers_df = pd.read_csv(customers_path)
+    merchants_df = pd.read_csv(merchants_path)
 
-# 2) Build a *simulated* transaction dataset for training
-sim = TransactionSimulator(customers=customers_df, merchants=merchants_df)
+    # 2) Build a *simulated* transaction dataset for training
+    sim = TransactionSimulator(customers=customers_df, merchants=merchants_df)
 
-training_transactions = sim.simulate_transactions(num_per_customer=30)
+    training_transactions = sim.simulate_transactions(num_per_customer=30)
 
-# 3) Fit CTGAN on the simulated transaction data
-model = TransactionCTGAN(epochs=100)
-model.fit(training_transactions)
+    # 3) Fit CTGAN on the simulated transaction data
+    model = TransactionCTGAN(epochs=100)
+    model.fit(training_transactions)
 
-# 4) Generate new synthetic transactions
-synthetic_output = model.generate(num_samples=500000)
-print(synthetic_output.head(10))
+    # 4) Generate new synthetic transactions, streamed to CSV in bounded-memory chunks
+    #    across a process pool (each worker loads its own copy of the synthesizer)
+    output_file = "synthetic_transactions_ctgan.csv"
+    rows_written = model.generate_to_sink(output_file, num_samples=500000, chunk_size=50000,
+                                          n_workers=None, seed=42, on_chunk=print_chunk_stats)
 
-# 5) Save to CSV or do whatever you want
-synthetic_output.to_csv("synthetic_transactions_ctgan.csv", index=False)
-print(f"Generated {len(synthetic_output)} synthetic transactions.")
\ No newline at end of file
+    # 5) Preview the saved output
+    print(pd.read_csv(output_file, nrows=10))
+    print(f"Generated {rows_written} synthetic transactions.")
@@ -1,12 +1,9 @@
 import pandas as pd
 import numpy as np
 import random
-import requests
 import json
 import time
-import re
-from typing import Dict, List
-from geopy.distance import geodesic
+from typing import Dict, List, Optional
 from config import API_KEY_Groq
 from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException, Request
@@ -18,9 +15,38 @@ from sse_starlette.sse import EventSourceResponse
 import asyncio
 from fastapi.routing import APIRouter
 import os
+import sys
 
 path = os.path.dirname(os.path.abspath(__file__))
 df_path = os.path.join(path, "..", "data", "dc_businesses_cleaned.csv")
+cache_path = os.environ.get("LLM_CACHE_PATH", os.path.join(path, "llm_cache.sqlite"))
+
+# SSE batch fan-out: transactions per LLM call, concurrent batches per stream,
+# launches allowed per planned batch, and the process-wide Groq request rate
+SSE_BATCH_SIZE = 5
+MAX_IN_FLIGHT_BATCHES = int(os.environ.get("GROQ_MAX_IN_FLIGHT_BATCHES", "4"))
+MAX_BATCH_ATTEMPTS = 3
+GROQ_REQUESTS_PER_SECOND = float(os.environ.get("GROQ_REQUESTS_PER_SECOND", "2"))
+
+# Hybrid generation: share of rows asked from the LLM (the rest come from the local
+# engine) and the SSE time budget after which unfinished LLM rows are filled locally
+LLM_FRACTION = float(os.environ.get("GROQ_LLM_FRACTION", "1.0"))
+SSE_LATENCY_BUDGET = float(os.environ.get("SSE_LATENCY_BUDGET", "30"))
+
+# Shared outbound HTTP pool: total connections, idle keep-alive connections, concurrent requests per host
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_PER_HOST_LIMIT = int(os.environ.get("HTTP_PER_HOST_LIMIT", "16"))
+
+# Add the project root directory to Python path
+ROOT_DIR = os.path.abspath(os.path.join(path, '..', '..', '..'))
+sys.path.append(ROOT_DIR)
+from src.component.llm_cache import PayloadOccurrences, ResponseCache
+from src.component.http_pool import HTTPClientPool
+from src.component.llm_client import AsyncLLMClient
+from src.component.geo_index import MerchantGeoIndex
+from src.component.local_transactions import LocalTransactionEngine
+from src.component.json_salvage import IncrementalJSONObjectParser, compile_schema
 
 if not API_KEY_Groq or len(API_KEY_Groq.strip()) < 20:
     raise ValueError("""
@@ -111,10 +137,32 @@ DC_ZIP_COORDS = {
     '20064': (38.9335, -76.9978),
 }
 
+# Radius (miles) of the precomputed ZIP centroid -> nearby merchant table
+NEARBY_MILES = 2
+
+
+def _transaction_amount(value) -> float:
+    """Amount as float within the $10-$200 range the prompt asks for."""
+    amount = float(value)
+    if not 10 <= amount <= 200:
+        raise ValueError(f"amount out of range: {amount}")
+    return amount
+
+
+# Schema of one LLM transaction, compiled once into a validating / coercing function
+validate_transaction = compile_schema({
+    "amount": _transaction_amount,
+    "timestamp": None,
+    "merchant_details": {"name": None, "category": None, "zipcode": None},
+    "payment_type": None
+})
+
 
 class TransactionGenerator:
-    def __init__(self, api_key: str, merchants_df: pd.DataFrame):
+    def __init__(self, api_key: str, merchants_df: pd.DataFrame, cache: ResponseCache = None):
         self.api_key = api_key
+        self.api_url = "https://api.groq.com/openai/v1/chat/completions"
+        self.cache = cache  # identical batch prompts are served from disk
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
@@ -125,6 +173,9 @@ class TransactionGenerator:
         # Add merchant caching
         self._merchant_cache = {}
         self._category_merchant_cache = {}
+
+        # LLM response parsing counters
+        self.parse_stats = {'responses': 0, 'transactions': 0, 'salvaged_truncated': 0, 'empty_responses': 0}
         
         self.spending_categories = {
             # Food & Grocery
@@ -184,6 +235,9 @@ class TransactionGenerator:
         self.MAX_TRANSACTIONS_PER_DAY = 8
         self.BASE_INCOME = 50000
 
+        # Local statistical engine: same transaction schema, no API calls
+        self.local_engine = LocalTransactionEngine(self.merchants, self.spending_categories)
+
     def _preprocess_merchants(self):
         """Clean and prepare merchant data"""
         try:
@@ -239,6 +293,9 @@ class TransactionGenerator:
             print("\nSample of processed merchants:")
             print(self.merchants[['Name', 'Category', 'mapped_category', 'Zipcode']].head())
 
+            # Spatial index for nearby-merchant lookups
+            self._build_geo_index()
+
         except Exception as e:
             print(f"Error in preprocessing merchants: {str(e)}")
             import traceback
@@ -266,6 +323,19 @@ class TransactionGenerator:
         merchants = self._merchant_cache[cache_key]
         return random.choice(merchants) if merchants else self._create_fallback_merchant(category, zipcode)
 
+    def _create_fallback_merchant(self, category: str, zipcode: str) -> Dict:
+        """Placeholder merchant at the ZIP centroid when no real merchant has the category."""
+        clean_zip = str(zipcode)[:5]
+        coords = DC_ZIP_COORDS.get(clean_zip, DC_ZIP_COORDS['20001'])
+        return {
+            "Name": f"DC {category.replace('_', ' ').title()} Service",
+            "Category": category,
+            "Zipcode": clean_zip,
+            "Latitude": coords[0],
+            "Longitude": coords[1],
+            "mapped_category": category
+        }
+
     def _calculate_transaction_count(self, income: float, days: int = 30) -> int:
         """Calculate monthly transactions based on income with reasonable limits"""
         # Base transaction counts per month
@@ -291,17 +361,29 @@ class TransactionGenerator:
         # Ensure within bounds
         return max(MIN_MONTHLY_TRANSACTIONS, min(final_count, MAX_MONTHLY_TRANSACTIONS))
 
-    def _get_nearby_merchants(self, base_zip: str, max_distance: int = 2) -> List[Dict]:
-        """Find merchants within 'max_distance' miles using geodesic distance."""
+    def _build_geo_index(self):
+        """Spatial index over merchant coordinates plus the ZIP centroid -> nearby merchants table."""
+        self.geo_index = MerchantGeoIndex(
+            pd.to_numeric(self.merchants['Latitude'], errors='coerce'),
+            pd.to_numeric(self.merchants['Longitude'], errors='coerce')
+        )
+        self.nearby_by_zip = self.geo_index.nearby_table(DC_ZIP_COORDS, NEARBY_MILES)
+
+    def _get_nearby_merchants(self, base_zip: str, max_distance: int = NEARBY_MILES) -> pd.DataFrame:
+        """Find merchants within 'max_distance' miles (with a 'distance' column); never mutates self.merchants."""
         clean_zip = str(int(float(base_zip))) if base_zip.replace('.', '').isdigit() else '20001'
         clean_zip = clean_zip[:5]
-        base_coord = DC_ZIP_COORDS.get(clean_zip, DC_ZIP_COORDS['20001'])
+        if clean_zip not in DC_ZIP_COORDS:
+            clean_zip = '20001'
+        base_coord = DC_ZIP_COORDS[clean_zip]
 
-        self.merchants['distance'] = self.merchants.apply(
-            lambda row: geodesic(base_coord, (row['Latitude'], row['Longitude'])).miles,
-            axis=1
-        )
-        return self.merchants[self.merchants['distance'] <= max_distance]
+        if max_distance == NEARBY_MILES:
+            positions = self.nearby_by_zip[clean_zip]
+            distances = self.geo_index.distances(base_coord[0], base_coord[1], positions)
+        else:
+            positions, distances = self.geo_index.query_radius(base_coord[0], base_coord[1], max_distance,
+                                                               return_distance=True)
+        return self.merchants.iloc[positions].assign(distance=distances)
 
     def _assign_categories(self) -> list:
         """Random category assignment with income weighting"""
@@ -321,16 +403,15 @@ class TransactionGenerator:
             for cat in categories
         }
 
-    def _batch_generate_transactions(self, customer: dict, merchants: list, num_tx: int) -> List[dict]:
-        try:
-            # Remove print statements that aren't necessary
-            current_date = time.strftime("%Y-%m-%d")
-            merchant_examples = "\n".join([
-                f'  - Name: "{m.get("Name", "")}", Category: "{m.get("Category", "")}"'
-                for m in merchants[:3]
-            ])
-            
-            prompt = f"""Generate exactly {num_tx} financial transactions as a JSON array.
+    def _build_batch_payload(self, customer: dict, merchants: list, num_tx: int) -> dict:
+        """Chat-completion payload asking for 'num_tx' transactions at 'merchants'."""
+        current_date = time.strftime("%Y-%m-%d")
+        merchant_examples = "\n".join([
+            f'  - Name: "{m.get("Name", "")}", Category: "{m.get("Category", "")}"'
+            for m in merchants[:3]
+        ])
+
+        prompt = f"""Generate exactly {num_tx} financial transactions as a JSON array.
 
 Available Merchants:
 {merchant_examples}
@@ -353,69 +434,114 @@ Requirements:
   }}
 ]"""
 
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=self.headers,
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a precise JSON generator. Output only valid JSON arrays matching the exact specified format. No additional text or explanations."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 1000,
-                    "top_p": 0.9
+        return {
+            "model": "llama-3.3-70b-versatile",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a precise JSON generator. Output only valid JSON arrays matching the exact specified format. No additional text or explanations."
                 },
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                return []
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.1,
+            "max_tokens": 1000,
+            "top_p": 0.9
+        }
 
-            try:
-                response_json = response.json()
-                content = response_json["choices"][0]["message"]["content"].strip()
-                
-                # Clean and parse JSON without debug output
-                content = content.replace('\n', ' ').replace('\r', '')
-                content = re.sub(r'```json|```', '', content)
-                content = re.sub(r'[^\[\]\{\}",:.\d\w\s-]', '', content)
-                
-                match = re.search(r'\[.*\]', content)
-                if not match:
-                    return []
-                
-                transactions = json.loads(match.group(0))
-                if not isinstance(transactions, list):
+    def _parse_batch_response(self, response_json: dict) -> List[dict]:
+        """
+        Extract the valid transactions from a chat-completion response body. Every
+        complete transaction object is kept, even when the array is wrapped in extra
+        text or truncated (e.g. by max_tokens), instead of discarding the whole batch.
+        """
+        try:
+            content = response_json["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            content = None
+        if not isinstance(content, str):
+            self.parse_stats['empty_responses'] += 1
+            return []
+
+        parser = IncrementalJSONObjectParser()
+        valid_transactions = [tx for tx in map(validate_transaction, parser.feed(content)) if tx is not None]
+        self.parse_stats['responses'] += 1
+        self.parse_stats['transactions'] += len(valid_transactions)
+        if parser.pending and valid_transactions:
+            self.parse_stats['salvaged_truncated'] += 1
+        if not valid_transactions:
+            self.parse_stats['empty_responses'] += 1
+        return valid_transactions
+
+    async def _with_llm_client(self, work):
+        """Run `work(client)` with a pooled AsyncLLMClient that lives for this call only."""
+        async with HTTPClientPool(max_connections=HTTP_MAX_CONNECTIONS,
+                                  max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                                  per_host_limit=HTTP_PER_HOST_LIMIT) as pool:
+            async with AsyncLLMClient(self.api_url, self.headers,
+                                      requests_per_second=GROQ_REQUESTS_PER_SECOND,
+                                      max_concurrency=MAX_IN_FLIGHT_BATCHES, pool=pool) as client:
+                return await work(client)
+
+    def _batch_generate_transactions(self, customer: dict, merchants: list, num_tx: int,
+                                     occurrences: Optional[PayloadOccurrences] = None) -> List[dict]:
+        """Blocking wrapper around _batch_generate_transactions_async (own pooled client)."""
+        return asyncio.run(self._with_llm_client(
+            lambda client: self._batch_generate_transactions_async(client, customer, merchants, num_tx,
+                                                                   occurrences)))
+
+    async def _batch_generate_transactions_async(self, client: AsyncLLMClient, customer: dict,
+                                                 merchants: list, num_tx: int,
+                                                 occurrences: Optional[PayloadOccurrences] = None) -> List[dict]:
+        """
+        Non-blocking _batch_generate_transactions: the request goes through 'client'
+        (shared HTTP/2 pool, rate limiter, bounded in-flight requests, retries with backoff).
+        'occurrences' numbers repeats of the same prompt within one request so each
+        repeat has its own cache entry instead of replaying the first answer.
+        """
+        try:
+            payload = self._build_batch_payload(customer, merchants, num_tx)
+            occurrence = occurrences.next(self.api_url, payload) if occurrences is not None else 0
+
+            response_json = self.cache.get(self.api_url, payload, occurrence) if self.cache is not None else None
+            from_cache = response_json is not None
+            if not from_cache:
+                response_json = await client.post_json(payload)
+                if response_json is None:
                     return []
-                
-                valid_transactions = []
-                for tx in transactions:
-                    if isinstance(tx, dict) and all(k in tx for k in ["amount", "timestamp", "merchant_details", "payment_type"]):
-                        if isinstance(tx["merchant_details"], dict) and all(k in tx["merchant_details"] for k in ["name", "category", "zipcode"]):
-                            try:
-                                tx["amount"] = float(tx["amount"])
-                                if 10 <= tx["amount"] <= 200:
-                                    valid_transactions.append(tx)
-                            except (ValueError, TypeError):
-                                continue
-                
-                return valid_transactions
 
-            except json.JSONDecodeError:
-                return []
-            
+            valid_transactions = self._parse_batch_response(response_json)
+
+            # Only cache responses that yielded usable transactions
+            if valid_transactions and self.cache is not None and not from_cache:
+                self.cache.set(self.api_url, payload, response_json, occurrence)
+            return valid_transactions
+
         except Exception:
             return []
 
-    def generate_transactions(self, user_data: dict) -> list:
-        """Main generation method with smaller batches"""
+    def _local_generate_transactions(self, customer: dict, num_tx: int, categories: list = None,
+                                     typical_count: int = None) -> List[dict]:
+        """Schema-identical transactions from the local engine (no API call)."""
+        return self.local_engine.generate(customer, num_tx, categories=categories, typical_count=typical_count)
+
+    def generate_transactions(self, user_data: dict, llm_fraction: float = 1.0) -> list:
+        """
+        Main generation method with smaller batches (blocking; all LLM calls go through
+        one pooled AsyncLLMClient for the duration of the call).
+
+        Only round(llm_fraction * total) rows are asked from the LLM, with at most
+        MAX_BATCH_ATTEMPTS calls per planned batch; the rest, and any rows the LLM
+        failed to deliver, come from the local engine.
+        """
+        return asyncio.run(self._with_llm_client(
+            lambda client: self._generate_transactions_async(client, user_data, llm_fraction)))
+
+    async def _generate_transactions_async(self, client: AsyncLLMClient, user_data: dict,
+                                           llm_fraction: float = 1.0) -> list:
+        """generate_transactions with LLM batches sent through `client`."""
         try:
             print("\n=== Starting Transaction Generation ===")
             print(f"User data: {user_data}")
@@ -428,35 +554,42 @@ Requirements:
 
             # Calculate transactions needed
             total_needed = self._calculate_transaction_count(float(user_data['income']), days=30)
-            print(f"\nNeed to generate {total_needed} transactions")
+            llm_needed = round(total_needed * min(max(llm_fraction, 0.0), 1.0))
+            print(f"\nNeed to generate {total_needed} transactions ({llm_needed} from the LLM)")
 
-            # Generate in very small batches
+            # Generate in very small batches (paced by the client's rate limiter)
             all_transactions = []
-            batch_size = 10 
+            occurrences = PayloadOccurrences()
+            batch_size = 10
             categories = self._assign_categories()
+            max_batches = math.ceil(llm_needed / batch_size) * MAX_BATCH_ATTEMPTS
 
-            while len(all_transactions) < total_needed:
+            for _ in range(max_batches):
+                if len(all_transactions) >= llm_needed:
+                    break
                 try:
-                    current_batch_size = min(batch_size, total_needed - len(all_transactions))
-                    merchants = [self._get_merchant(random.choice(categories), customer['zipcode']) 
-                               for _ in range(current_batch_size)]
-                    
-                    batch_transactions = self._batch_generate_transactions(customer, merchants, current_batch_size)
+                    current_batch_size = min(batch_size, llm_needed - len(all_transactions))
+                    merchants = [self._get_merchant(random.choice(categories), customer['zipcode'])
+                                 for _ in range(current_batch_size)]
+
+                    batch_transactions = await self._batch_generate_transactions_async(
+                        client, customer, merchants, current_batch_size, occurrences)
                     if batch_transactions:
-                        all_transactions.extend(batch_transactions)
+                        all_transactions.extend(batch_transactions[:llm_needed - len(all_transactions)])
                         print(f"Progress: {len(all_transactions)}/{total_needed} transactions")
-                    
-                    if not batch_transactions:
+                    else:
                         print("Batch generated no transactions, retrying...")
-                    
-                    time.sleep(1)  # Small delay between batches
-                    
+
                 except Exception as e:
                     print(f"Batch failed: {str(e)}")
                     continue
 
-                if len(all_transactions) >= total_needed:
-                    break
+            # Local rows for the non-LLM share and any LLM shortfall
+            missing = total_needed - len(all_transactions)
+            if missing > 0:
+                all_transactions.extend(self._local_generate_transactions(
+                    customer, missing, categories=categories, typical_count=total_needed))
+                print(f"Filled {missing} transactions locally")
 
             print(f"\nFinished generating {len(all_transactions)} transactions")
             return all_transactions
@@ -487,11 +620,16 @@ async def lifespan(app: FastAPI):
     print("\nSample merchants (raw data):")
     print(merchants_df_raw[['Name', 'Category', 'Zipcode']].head())
     print("\nUnique categories:", merchants_df_raw['Category'].nunique())
+    await http_pool.open()
     
     yield
     
     # Shutdown
     print("\nShutting down application...")
+    print(f"LLM client: {llm_client.stats()}")
+    print(f"HTTP pool: {http_pool.stats()}")
+    await http_pool.close()
+    print(f"Response cache: {response_cache.stats()}")
 
 # Update FastAPI initialization
 app = FastAPI(lifespan=lifespan)
@@ -515,7 +653,21 @@ class UserInput(BaseModel):
 
 
 # Initialize generator with processed data
-generator = TransactionGenerator(api_key=API_KEY_Groq, merchants_df=merchants_df_raw)
+response_cache = ResponseCache(cache_path)
+generator = TransactionGenerator(api_key=API_KEY_Groq, merchants_df=merchants_df_raw, cache=response_cache)
+# One HTTP pool for all outbound calls (opened / closed in lifespan) and one LLM client
+# on top of it for every SSE stream, so connections and the rate limit are process-wide
+http_pool = HTTPClientPool(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+    per_host_limit=HTTP_PER_HOST_LIMIT
+)
+llm_client = AsyncLLMClient(
+    generator.api_url, generator.headers,
+    requests_per_second=GROQ_REQUESTS_PER_SECOND,
+    max_concurrency=MAX_IN_FLIGHT_BATCHES * 4,
+    pool=http_pool
+)
 
 
 @app.route("/generate", methods=["GET", "POST"])
@@ -533,6 +685,11 @@ async def generate_transactions(request: Request):
             }
         else:  # POST
             user_data = await request.json()
+            params = user_data
+
+        # Hybrid settings: LLM share of rows and time budget for LLM batches
+        llm_fraction = min(max(float(params.get("llm_fraction", LLM_FRACTION)), 0.0), 1.0)
+        latency_budget = float(params.get("latency_budget", SSE_LATENCY_BUDGET))
 
         # Validate the data
         if not all([user_data.get("age"), user_data.get("gender"), 
@@ -564,68 +721,130 @@ async def generate_transactions(request: Request):
                 }
 
                 all_transactions = []
-                batch_size = 5
+                occurrences = PayloadOccurrences()  # repeated prompts in this request get fresh answers
                 categories = generator._assign_categories()
-
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + latency_budget
+
+                def local_batch_event(transactions, message):
+                    return {
+                        "event": "batch_complete",
+                        "data": json.dumps({
+                            "message": message,
+                            "transactions": transactions,
+                            "source": "local",
+                            "progress": len(all_transactions),
+                            "total": total_needed,
+                            "status": "batch_complete"
+                        })
+                    }
+
+                # Non-LLM share of the rows comes from the local engine right away
+                llm_needed = round(total_needed * llm_fraction)
+                if total_needed > llm_needed:
+                    local_transactions = generator._local_generate_transactions(
+                        user_data, total_needed - llm_needed, categories=categories, typical_count=total_needed)
+                    all_transactions.extend(local_transactions)
+                    yield local_batch_event(local_transactions,
+                                            f"Generated {len(local_transactions)} transactions locally")
+
+                # Up to MAX_IN_FLIGHT_BATCHES batches run concurrently; each one is
+                # streamed as soon as it completes, and short batches are topped up
+                max_batches = math.ceil(llm_needed / SSE_BATCH_SIZE) * MAX_BATCH_ATTEMPTS
+                pending = {}  # task -> (batch number, requested size)
+                in_flight_rows = 0
                 batch_number = 0
-                while len(all_transactions) < total_needed:
-                    if await request.is_disconnected():
-                        print("Client disconnected")
-                        break
-
-                    try:
-                        current_batch_size = min(batch_size, total_needed - len(all_transactions))
-                        merchants = [generator._get_merchant(random.choice(categories), user_data['zipcode']) 
-                                   for _ in range(current_batch_size)]
-
-                        yield {
-                            "event": "status",
-                            "data": json.dumps({
-                                "message": f"Processing batch {batch_number + 1}",
-                                "merchants": [m.get('Name') for m in merchants],
-                                "progress": len(all_transactions),
-                                "total": total_needed,
-                                "status": "processing"
-                            })
-                        }
-
-                        batch_transactions = generator._batch_generate_transactions(user_data, merchants, current_batch_size)
-                        
-                        if batch_transactions:
-                            all_transactions.extend(batch_transactions)
-                            yield {
-                                "event": "batch_complete",
-                                "data": json.dumps({
-                                    "message": f"Completed batch {batch_number + 1}",
-                                    "transactions": batch_transactions,
-                                    "progress": len(all_transactions),
-                                    "total": total_needed,
-                                    "status": "batch_complete"
-                                })
-                            }
-                        else:
+                disconnected = False
+                try:
+                    while len(all_transactions) < total_needed:
+                        if await request.is_disconnected():
+                            print("Client disconnected")
+                            disconnected = True
+                            break
+
+                        while (len(pending) < MAX_IN_FLIGHT_BATCHES and batch_number < max_batches
+                               and len(all_transactions) + in_flight_rows < total_needed):
+                            current_batch_size = min(SSE_BATCH_SIZE,
+                                                     total_needed - len(all_transactions) - in_flight_rows)
+                            merchants = [generator._get_merchant(random.choice(categories), user_data['zipcode'])
+                                         for _ in range(current_batch_size)]
+                            task = asyncio.create_task(generator._batch_generate_transactions_async(
+                                llm_client, user_data, merchants, current_batch_size, occurrences))
+                            batch_number += 1
+                            pending[task] = (batch_number, current_batch_size)
+                            in_flight_rows += current_batch_size
                             yield {
                                 "event": "status",
                                 "data": json.dumps({
-                                    "message": f"Retrying batch {batch_number + 1}",
+                                    "message": f"Processing batch {batch_number}",
+                                    "merchants": [m.get('Name') for m in merchants],
                                     "progress": len(all_transactions),
                                     "total": total_needed,
-                                    "status": "retrying"
+                                    "status": "processing"
                                 })
                             }
 
-                        batch_number += 1
-                        await asyncio.sleep(1)
+                        if not pending:
+                            break
+                        done, _ = await asyncio.wait(pending, timeout=max(deadline - loop.time(), 0),
+                                                     return_when=asyncio.FIRST_COMPLETED)
+                        if not done:
+                            print(f"Latency budget of {latency_budget}s reached")
+                            break
+
+                        # Emit in completion order
+                        for task in done:
+                            number, size = pending.pop(task)
+                            in_flight_rows -= size
+                            try:
+                                batch_transactions = task.result()
+                            except Exception as e:
+                                print(f"Error in batch {number}: {str(e)}")
+                                yield {
+                                    "event": "error",
+                                    "data": json.dumps({
+                                        "message": f"Error in batch {number}: {str(e)}",
+                                        "status": "error"
+                                    })
+                                }
+                                continue
 
-                    except Exception as e:
-                        print(f"Error in batch {batch_number}: {str(e)}")
-                        yield {
-                            "event": "error",
-                            "data": json.dumps({
-                                "message": f"Error in batch {batch_number + 1}: {str(e)}",
-                                "status": "error"
-                            })
-                        }
+                            batch_transactions = batch_transactions[:total_needed - len(all_transactions)]
+                            if batch_transactions:
+                                all_transactions.extend(batch_transactions)
+                                yield {
+                                    "event": "batch_complete",
+                                    "data": json.dumps({
+                                        "message": f"Completed batch {number}",
+                                        "transactions": batch_transactions,
+                                        "source": "llm",
+                                        "progress": len(all_transactions),
+                                        "total": total_needed,
+                                        "status": "batch_complete"
+                                    })
+                                }
+                            else:
+                                yield {
+                                    "event": "status",
+                                    "data": json.dumps({
+                                        "message": f"Retrying batch {number}",
+                                        "progress": len(all_transactions),
+                                        "total": total_needed,
+                                        "status": "retrying"
+                                    })
+                                }
+                finally:
+                    # Client gone, target reached or budget spent: drop batches still in flight
+                    for task in pending:
+                        task.cancel()
+
+                # Rows the LLM did not deliver in time (or at all) are filled locally
+                missing = total_needed - len(all_transactions)
+                if missing > 0 and not disconnected:
+                    local_transactions = generator._local_generate_transactions(
+                        user_data, missing, categories=categories, typical_count=total_needed)
+                    all_transactions.extend(local_transactions)
+                    yield local_batch_event(local_transactions, f"Filled {missing} transactions locally")
 
                 # Final status
                 yield {
@@ -653,6 +872,18 @@ async def generate_transactions(request: Request):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/cache/metrics")
+async def cache_metrics():
+    """LLM response cache hit rate and size"""
+    return response_cache.stats()
+
+
+@app.get("/http/metrics")
+async def http_metrics():
+    """Outbound HTTP pool utilization, LLM request / retry counters and response parsing counters"""
+    return {"pool": http_pool.stats(), "llm": llm_client.stats(), "parsing": generator.parse_stats}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,81 @@
+from typing import Dict, Optional
+
+
+class AdaptiveBatchSize:
+    """
+    Rows-per-request controller for multi-row LLM prompts (additive increase,
+    multiplicative decrease).
+
+    - Each successful, complete response grows the batch by `step` rows.
+    - A failed call, an empty / invalid answer or a truncated one (finish_reason
+      "length") halves it.
+    - Completion tokens per returned row are tracked as an exponential moving average,
+      and the batch never asks for more rows than fit in `token_budget` (the request's
+      max_tokens) with `headroom` to spare.
+
+    Call observe() after every request and read `size` before building the next one.
+    """
+
+    def __init__(self, initial: int = 5, minimum: int = 1, maximum: int = 25,
+                 token_budget: int = 4000, headroom: float = 0.8, step: int = 1,
+                 smoothing: float = 0.3):
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError("expected 1 <= minimum <= initial <= maximum")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.token_budget = token_budget
+        self.headroom = headroom
+        self.step = step
+        self.smoothing = smoothing
+        self._size = float(initial)
+
+        self.tokens_per_row: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.truncated = 0
+        self.rows = 0
+
+    @property
+    def token_limit(self) -> int:
+        """Largest batch whose expected completion fits the token budget."""
+        if not self.tokens_per_row:
+            return self.maximum
+        return max(self.minimum, int(self.token_budget * self.headroom / self.tokens_per_row))
+
+    @property
+    def size(self) -> int:
+        return max(self.minimum, min(int(self._size), self.maximum, self.token_limit))
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    def observe(self, requested: int, returned: int, completion_tokens: Optional[int] = None,
+                truncated: bool = False) -> None:
+        """Record one request that asked for `requested` rows and yielded `returned` valid rows."""
+        self.requests += 1
+        self.rows += returned
+        if returned and completion_tokens:
+            sample = completion_tokens / returned
+            self.tokens_per_row = (sample if self.tokens_per_row is None else
+                                   self.smoothing * sample + (1 - self.smoothing) * self.tokens_per_row)
+
+        if truncated:
+            self.truncated += 1
+        if returned == 0:
+            self.errors += 1
+        if returned == 0 or truncated or returned < requested:
+            self._size = max(float(self.minimum), min(self._size, float(self.token_limit)) / 2)
+        else:
+            self._size = min(float(self.maximum), float(self.token_limit), self._size + self.step)
+
+    def stats(self) -> Dict:
+        return {
+            'size': self.size,
+            'tokens_per_row': round(self.tokens_per_row, 1) if self.tokens_per_row else None,
+            'requests': self.requests,
+            'rows': self.rows,
+            'errors': self.errors,
+            'truncated': self.truncated,
+            'error_rate': round(self.error_rate, 3),
+        }
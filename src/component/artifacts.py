@@ -0,0 +1,240 @@
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+# Exported model layout: one directory per model
+WEIGHTS_FILE = 'generator.safetensors'
+METADATA_FILE = 'metadata.json'
+FORMAT_VERSION = 1
+
+# safetensors dtype codes <-> numpy dtypes
+_DTYPES = {
+    'F64': np.float64,
+    'F32': np.float32,
+    'F16': np.float16,
+    'I64': np.int64,
+    'I32': np.int32,
+    'U8': np.uint8,
+}
+_CODES = {np.dtype(dtype): code for code, dtype in _DTYPES.items()}
+
+
+# ----------------------------------
+# 1) SAFETENSORS READ / WRITE (numpy only)
+# ----------------------------------
+
+def save_safetensors(tensors: Dict[str, np.ndarray], path: str,
+                     metadata: Optional[Dict[str, str]] = None) -> None:
+    """
+    Write `tensors` in the safetensors format: an 8-byte little-endian header length,
+    a JSON header with dtype / shape / byte offsets per tensor, then the raw buffers.
+    Tensors are laid out widest dtype first so every one stays aligned for memory-mapping.
+    """
+    arrays = {name: np.asarray(value, order='C') for name, value in tensors.items()}
+    order = sorted(arrays, key=lambda name: (-arrays[name].dtype.itemsize, name))
+
+    header = {}
+    offset = 0
+    for name in order:
+        array = arrays[name]
+        if array.dtype not in _CODES:
+            raise ValueError(f"Unsupported dtype {array.dtype} for tensor '{name}'")
+        header[name] = {
+            'dtype': _CODES[array.dtype],
+            'shape': list(array.shape),
+            'data_offsets': [offset, offset + array.nbytes],
+        }
+        offset += array.nbytes
+    if metadata:
+        header['__metadata__'] = {str(k): str(v) for k, v in metadata.items()}
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 8)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for name in order:
+            f.write(arrays[name].astype(arrays[name].dtype.newbyteorder('<'), copy=False).tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_safetensors(path: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Read a safetensors file. With mmap=True the returned arrays are read-only views on a
+    memory-mapped file, so every process loading the same file shares one physical copy.
+    """
+    with open(path, 'rb') as f:
+        header_len = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+        header = json.loads(f.read(header_len))
+    header.pop('__metadata__', None)
+
+    start = 8 + header_len
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        with open(path, 'rb') as f:
+            buffer = np.frombuffer(f.read(), dtype=np.uint8)
+
+    tensors = {}
+    for name, info in header.items():
+        begin, end = info['data_offsets']
+        dtype = np.dtype(_DTYPES[info['dtype']]).newbyteorder('<')
+        tensors[name] = buffer[start + begin:start + end].view(dtype).reshape(info['shape'])
+    return tensors
+
+
+# ----------------------------------
+# 2) EXPORT FROM A TRAINED SDV CTGANSynthesizer
+# ----------------------------------
+
+def _json_value(value):
+    """Plain-JSON version of a category value (numpy scalars, NaN -> None)."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _transformer_columns(transformer) -> list:
+    """Per-column layout of ctgan's DataTransformer (GMM modes / one-hot categories)."""
+    columns = []
+    for info in transformer._column_transform_info_list:
+        if info.column_type == 'continuous':
+            gm = info.transform
+            valid = np.asarray(gm.valid_component_indicator, dtype=bool)
+            means = gm._bgm_transformer.means_.reshape([-1])[valid]
+            stds = np.sqrt(gm._bgm_transformer.covariances_).reshape([-1])[valid]
+            columns.append({
+                'name': info.column_name,
+                'type': 'continuous',
+                'means': means.tolist(),
+                'stds': stds.tolist(),
+                'std_multiplier': gm.STD_MULTIPLIER,
+            })
+        else:
+            columns.append({
+                'name': info.column_name,
+                'type': 'discrete',
+                'categories': [_json_value(v) for v in info.transform.dummies],
+            })
+    return columns
+
+
+def _condvec_layout(data_sampler) -> Optional[Dict]:
+    """Conditional-vector sizes and the training frequencies used for unconditioned sampling."""
+    if data_sampler._n_discrete_columns == 0:
+        return None
+    probs = data_sampler._discrete_column_category_prob.flatten()
+    probs = probs[probs != 0]
+    return {
+        'n_categories': int(data_sampler._n_categories),
+        'probs': (probs / probs.sum()).tolist(),
+        'discrete_offsets': data_sampler._discrete_column_cond_st.astype(int).tolist(),
+    }
+
+
+def _output_layout(synthesizer) -> Dict:
+    """SDV reverse-transform settings: column order, dtypes and numeric clipping / rounding."""
+    processor = synthesizer._data_processor
+    numerical = {}
+    for name, formatter in processor.formatters.items():
+        if not hasattr(formatter, 'enforce_rounding'):
+            continue
+        field_transformer = processor._hyper_transformer.field_transformers.get(name)
+        null_transformer = getattr(field_transformer, 'null_transformer', None)
+        null_ratio = 0.0
+        if null_transformer is not None and null_transformer.nulls:
+            null_ratio = float(null_transformer._null_percentage)
+        enforce_min_max = formatter.enforce_min_max_values
+        numerical[name] = {
+            'min': _json_value(formatter._min_value) if enforce_min_max else None,
+            'max': _json_value(formatter._max_value) if enforce_min_max else None,
+            'rounding_digits': getattr(formatter, '_rounding_digits', None) if formatter.enforce_rounding else None,
+            'null_ratio': null_ratio,
+        }
+    return {
+        'columns': list(synthesizer.metadata.columns.keys()),
+        'dtypes': {name: str(dtype) for name, dtype in processor._dtypes.items()},
+        'numerical': numerical,
+    }
+
+
+def export_ctgan_artifacts(synthesizer, path: str, kind: str, extra: Optional[Dict] = None) -> str:
+    """
+    Export a fitted SDV CTGANSynthesizer to `path`:
+     - generator.safetensors: generator network weights (memory-mappable),
+     - metadata.json: network shape, ctgan transformer GMM means/stds and categories,
+       conditional-vector layout and SDV min/max / rounding / dtype settings.
+    `kind` names the wrapper model and `extra` stores wrapper-specific settings.
+    """
+    model = synthesizer._model
+    if model is None or model._generator is None:
+        raise RuntimeError("The synthesizer must be fitted before exporting.")
+    os.makedirs(path, exist_ok=True)
+
+    state = model._generator.state_dict()
+    tensors = {name: value.detach().cpu().numpy() for name, value in state.items()}
+    residual_dims = [int(state[f'seq.{i}.fc.weight'].shape[0]) for i in range(len(model._generator_dim))]
+
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'kind': kind,
+        'embedding_dim': int(model._embedding_dim),
+        'batch_size': int(model._batch_size),
+        'generator': {
+            'residual_dims': residual_dims,
+            'output_layer': f'seq.{len(residual_dims)}',
+            'batchnorm_eps': 1e-5,
+            # ctgan samples with the generator left in train mode (batch statistics)
+            'batchnorm_stats': 'batch' if model._generator.training else 'running',
+        },
+        'transformer': _transformer_columns(model._transformer),
+        'condvec': _condvec_layout(model._data_sampler),
+        'output': _output_layout(synthesizer),
+        'extra': extra or {},
+    }
+    save_safetensors(tensors, os.path.join(path, WEIGHTS_FILE), metadata={'kind': kind})
+    with open(os.path.join(path, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return path
+
+
+# ----------------------------------
+# 3) LOADING
+# ----------------------------------
+
+@dataclass
+class ModelArtifacts:
+    """Exported generator weights (memory-mapped) plus their JSON metadata."""
+    path: str
+    metadata: Dict
+    weights: Dict[str, np.ndarray]
+    load_seconds: float
+
+    @property
+    def kind(self) -> str:
+        return self.metadata['kind']
+
+
+def has_artifacts(path: str) -> bool:
+    """True if `path` holds an exported model."""
+    return (os.path.isfile(os.path.join(path, WEIGHTS_FILE))
+            and os.path.isfile(os.path.join(path, METADATA_FILE)))
+
+
+def load_artifacts(path: str, mmap: bool = True) -> ModelArtifacts:
+    """Load an exported model directory; weights are memory-mapped unless mmap=False."""
+    start = time.perf_counter()
+    with open(os.path.join(path, METADATA_FILE)) as f:
+        metadata = json.load(f)
+    if metadata.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {metadata.get('format_version')}")
+    weights = load_safetensors(os.path.join(path, WEIGHTS_FILE), mmap=mmap)
+    return ModelArtifacts(path, metadata, weights, time.perf_counter() - start)
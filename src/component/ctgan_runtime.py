@@ -0,0 +1,249 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.component.artifacts import ModelArtifacts, load_artifacts
+from src.component.customer_sampler import resolve_rng
+from src.component.postprocess import (finalize_income_profiles, random_timestamps_within_30_days,
+                                       sample_matching)
+
+# Inference-only CTGAN sampling from exported artifacts (see artifacts.py).
+# Depends on numpy / pandas only: no torch, sdv, rdt or sklearn import at serve time.
+
+
+# ----------------------------------
+# 1) GENERATOR RUNTIME
+# ----------------------------------
+
+class CTGANRuntime:
+    """
+    NumPy re-implementation of ctgan's CTGAN.sample + SDV's reverse transform.
+
+    - Generator forward pass: Residual(fc -> BatchNorm -> ReLU, concat input) blocks and a
+      final Linear, evaluated for all batches at once as (steps, batch_size, dim) arrays.
+      BatchNorm uses per-batch statistics when the generator was exported in train mode,
+      which is how ctgan samples, so rows are generated in batch_size groups as well.
+    - Activations: tanh for the GMM-normalized value, Gumbel-max for every softmax span
+      (argmax of the Gumbel-softmax is the argmax of logits + Gumbel noise).
+    - Inverse transform: value * 4 * std[mode] + mean[mode] per continuous column and a
+      category lookup per discrete column, followed by SDV's clip / round / dtype casts.
+    """
+
+    def __init__(self, artifacts: ModelArtifacts, rng=None):
+        self.artifacts = artifacts
+        self.metadata = artifacts.metadata
+        self.rng = resolve_rng(rng)
+        self.batch_size = int(self.metadata['batch_size'])
+        self.embedding_dim = int(self.metadata['embedding_dim'])
+        self._build_network(artifacts.weights)
+        self._build_columns()
+
+    @classmethod
+    def from_path(cls, path: str, mmap: bool = True, rng=None) -> 'CTGANRuntime':
+        """Load exported artifacts from directory `path` (weights memory-mapped)."""
+        return cls(load_artifacts(path, mmap=mmap), rng=rng)
+
+    @property
+    def columns(self) -> list:
+        """Output column order (SDV metadata order)."""
+        return list(self.metadata['output']['columns'])
+
+    # --- setup ---
+
+    def _build_network(self, weights: Dict[str, np.ndarray]) -> None:
+        """Pre-transpose linear weights so each layer is one `x @ W + b`."""
+        generator = self.metadata['generator']
+        self.batch_stats = generator.get('batchnorm_stats', 'batch') == 'batch'
+        self.eps = float(generator['batchnorm_eps'])
+        self.layers = []
+        for i in range(len(generator['residual_dims'])):
+            prefix = f'seq.{i}'
+            self.layers.append({
+                'weight': np.asarray(weights[f'{prefix}.fc.weight'], dtype=np.float32).T,
+                'bias': np.asarray(weights[f'{prefix}.fc.bias'], dtype=np.float32),
+                'gamma': np.asarray(weights[f'{prefix}.bn.weight'], dtype=np.float32),
+                'beta': np.asarray(weights[f'{prefix}.bn.bias'], dtype=np.float32),
+                'running_mean': np.asarray(weights[f'{prefix}.bn.running_mean'], dtype=np.float32),
+                'running_var': np.asarray(weights[f'{prefix}.bn.running_var'], dtype=np.float32),
+            })
+        output = generator['output_layer']
+        self.out_weight = np.asarray(weights[f'{output}.weight'], dtype=np.float32).T
+        self.out_bias = np.asarray(weights[f'{output}.bias'], dtype=np.float32)
+
+    def _build_columns(self) -> None:
+        """Slice positions of every transformer column in the generator output."""
+        self.spans = []
+        self._discrete_ids = {}
+        st = 0
+        for column in self.metadata['transformer']:
+            if column['type'] == 'continuous':
+                width = 1 + len(column['means'])
+                self.spans.append({
+                    **column, 'start': st, 'stop': st + width,
+                    'means': np.asarray(column['means']), 'stds': np.asarray(column['stds']),
+                })
+            else:
+                width = len(column['categories'])
+                self._discrete_ids[column['name']] = len(self._discrete_ids)
+                self.spans.append({
+                    **column, 'start': st, 'stop': st + width,
+                    'categories': np.array(column['categories'], dtype=object),
+                    'lookup': {value: code for code, value in enumerate(column['categories'])},
+                })
+            st += width
+
+        condvec = self.metadata['condvec']
+        self.cond_dim = condvec['n_categories'] if condvec else 0
+        if condvec:
+            self.cond_probs = np.asarray(condvec['probs'])
+            self.cond_offsets = np.asarray(condvec['discrete_offsets'])
+
+    # --- forward pass ---
+
+    def _condition_index(self, column: str, value) -> int:
+        """Position of (column, value) in the conditional vector."""
+        if column not in self._discrete_ids:
+            raise ValueError(f"The column_name `{column}` is not a discrete column of the model.")
+        span = next(span for span in self.spans if span['name'] == column)
+        if value not in span['lookup']:
+            raise ValueError(f"The value `{value}` doesn't exist in the column `{column}`.")
+        return int(self.cond_offsets[self._discrete_ids[column]] + span['lookup'][value])
+
+    def _generate(self, steps: int, cond_index: Optional[int], rng: np.random.Generator) -> np.ndarray:
+        """Raw generator output for `steps` batches, as a (steps * batch_size, data_dim) array."""
+        n = steps * self.batch_size
+        h = rng.standard_normal((n, self.embedding_dim), dtype=np.float32)
+        if self.cond_dim:
+            cond = np.zeros((n, self.cond_dim), dtype=np.float32)
+            if cond_index is None:
+                cond_index = rng.choice(self.cond_dim, size=n, p=self.cond_probs)
+            cond[np.arange(n), cond_index] = 1
+            h = np.concatenate([h, cond], axis=1)
+
+        for layer in self.layers:
+            out = h @ layer['weight'] + layer['bias']
+            if self.batch_stats:
+                out = out.reshape(steps, self.batch_size, -1)
+                mean = out.mean(axis=1, keepdims=True)
+                var = out.var(axis=1, keepdims=True)
+                out = ((out - mean) / np.sqrt(var + self.eps)).reshape(n, -1)
+            else:
+                out = (out - layer['running_mean']) / np.sqrt(layer['running_var'] + self.eps)
+            out = np.maximum(out * layer['gamma'] + layer['beta'], 0)
+            h = np.concatenate([out, h], axis=1)
+        return h @ self.out_weight + self.out_bias
+
+    def _decode(self, raw: np.ndarray, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Activations + ctgan inverse transform: one array per transformer column."""
+        data = {}
+        for span in self.spans:
+            block = raw[:, span['start']:span['stop']]
+            if span['type'] == 'continuous':
+                alpha = np.clip(np.tanh(block[:, 0]), -1, 1)
+                logits = block[:, 1:]
+                mode = np.argmax(logits + rng.gumbel(size=logits.shape), axis=1)
+                data[span['name']] = (alpha * span['std_multiplier'] * span['stds'][mode]
+                                      + span['means'][mode])
+            else:
+                code = np.argmax(block + rng.gumbel(size=block.shape), axis=1)
+                data[span['name']] = span['categories'][code]
+        return data
+
+    def _format(self, data: Dict[str, np.ndarray], rng: np.random.Generator) -> pd.DataFrame:
+        """SDV reverse-transform formatting: nulls, min/max clipping, rounding, dtypes, order."""
+        output = self.metadata['output']
+        frame = {}
+        for name in output['columns']:
+            if name not in data:
+                continue
+            values = data[name]
+            dtype = output['dtypes'].get(name)
+            numerical = output['numerical'].get(name)
+            if numerical is not None:
+                values = values.astype(float)
+                if numerical['null_ratio']:
+                    values[rng.random(len(values)) < numerical['null_ratio']] = np.nan
+                if numerical['min'] is not None:
+                    values = np.clip(values, numerical['min'], numerical['max'])
+                is_integer = dtype is not None and np.issubdtype(np.dtype(dtype), np.integer)
+                if numerical['rounding_digits'] is not None:
+                    values = np.round(values, numerical['rounding_digits'])
+                elif is_integer:
+                    values = np.round(values)
+                if is_integer and np.isnan(values).any():
+                    dtype = 'float64'
+            column = pd.Series(values)
+            if dtype is not None:
+                try:
+                    column = column.astype(dtype)
+                except (TypeError, ValueError):
+                    pass
+            frame[name] = column
+        return pd.DataFrame(frame)
+
+    # --- sampling ---
+
+    def sample(self, num_rows: int, condition_column: Optional[str] = None,
+               condition_value=None, rng=None) -> pd.DataFrame:
+        """
+        Sample `num_rows` rows (like CTGANSynthesizer.sample). With a condition, every row
+        is generated under that (discrete column, value) conditional vector, which makes
+        the value likely but not guaranteed; see sample_matching.
+        """
+        rng = self.rng if rng is None else resolve_rng(rng)
+        cond_index = None
+        if condition_column is not None and condition_value is not None:
+            cond_index = self._condition_index(condition_column, condition_value)
+        steps = num_rows // self.batch_size + 1
+        raw = self._generate(steps, cond_index, rng)[:num_rows]
+        return self._format(self._decode(raw, rng), rng)
+
+    def sample_matching(self, num_rows: int, column: str, value, max_rounds: int = 20,
+                        rng=None) -> pd.DataFrame:
+        """
+        Sample exactly `num_rows` rows whose `column` equals `value`, topping up the rare
+        conditional misses in later rounds sized by the acceptance rate observed so far.
+        """
+        rng = self.rng if rng is None else resolve_rng(rng)
+        return sample_matching(lambda batch_size: self.sample(batch_size, column, value, rng=rng),
+                               num_rows, column, value, max_rounds=max_rounds)
+
+
+# ----------------------------------
+# 2) WRAPPER EQUIVALENTS
+# ----------------------------------
+
+class IncomeModelRuntime(CTGANRuntime):
+    """Serving counterpart of AdvancedIncomeModel.generate, from exported artifacts."""
+
+    def generate(self, num_samples=10, zipcode=None) -> pd.DataFrame:
+        """Generate profiles; with 'zipcode' exactly 'num_samples' rows for that ZIP."""
+        if zipcode is None:
+            synthetic = self.sample(num_samples)
+        else:
+            synthetic = self.sample_matching(num_samples, 'zipcode', zipcode)
+        return finalize_income_profiles(synthetic, rng=self.rng)
+
+
+class TransactionModelRuntime(CTGANRuntime):
+    """Serving counterpart of TransactionCTGAN.generate, from exported artifacts."""
+
+    def generate(self, num_samples=1000, rng=None) -> pd.DataFrame:
+        """Generate synthetic transactions and re-add a random timestamp to each row."""
+        rng = self.rng if rng is None else resolve_rng(rng)
+        synthetic_df = self.sample(num_samples, rng=rng)
+        synthetic_df['timestamp'] = random_timestamps_within_30_days(len(synthetic_df), rng)
+        return synthetic_df
+
+
+RUNTIMES = {
+    'AdvancedIncomeModel': IncomeModelRuntime,
+    'TransactionCTGAN': TransactionModelRuntime,
+}
+
+
+def load_runtime(path: str, mmap: bool = True, rng=None) -> CTGANRuntime:
+    """Load exported artifacts and wrap them in the runtime class matching their `kind`."""
+    artifacts = load_artifacts(path, mmap=mmap)
+    return RUNTIMES.get(artifacts.kind, CTGANRuntime)(artifacts, rng=rng)
@@ -0,0 +1,494 @@
+import csv
+import datetime
+import os
+import time
+import warnings
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import torch
+from torch import optim
+
+# CTGAN / SDV internals reused by the custom epoch loop (pinned: ctgan 0.11, sdv 1.19)
+from ctgan import CTGAN
+from ctgan.data_sampler import DataSampler
+from ctgan.data_transformer import DataTransformer
+from ctgan.synthesizers.ctgan import Discriminator, Generator
+from sdv import version
+from sdv.single_table.utils import detect_discrete_columns
+
+# ----------------------------------
+# 1) TRAINING PROFILE
+# ----------------------------------
+
+
+@dataclass
+class TrainingProfile:
+    """
+    Training-performance settings for the CTGAN wrappers (AdvancedIncomeModel, TransactionCTGAN).
+
+    - epochs: None keeps the wrapper's own `epochs`.
+    - batch_size / pac: CTGAN batch size (must be even and a multiple of pac) and PAC size.
+    - torch_threads / interop_threads: intra- and inter-op CPU thread pools (None = torch default).
+    - patience / min_delta: stop once the smoothed loss has not improved by `min_delta`
+      for `patience` epochs (None disables early stopping).
+    - checkpoint_path / checkpoint_every: save a resumable checkpoint every N epochs.
+    - log_path: CSV file receiving one timing/loss row per epoch.
+    """
+    epochs: Optional[int] = None
+    batch_size: int = 500
+    pac: int = 10
+    torch_threads: Optional[int] = None
+    interop_threads: Optional[int] = None
+    patience: Optional[int] = None
+    min_delta: float = 0.01
+    checkpoint_path: Optional[str] = None
+    checkpoint_every: int = 10
+    log_path: Optional[str] = None
+    verbose: bool = True
+
+    def __post_init__(self):
+        if self.batch_size % 2 != 0 or self.batch_size % self.pac != 0:
+            raise ValueError("batch_size must be even and a multiple of pac")
+
+    @classmethod
+    def cpu(cls, **overrides) -> 'TrainingProfile':
+        """Preset for CPU-only boxes: larger batches, all cores for intra-op work, early stopping."""
+        settings = {
+            'batch_size': 2000,
+            'pac': 10,
+            'torch_threads': os.cpu_count() or 1,
+            'interop_threads': 1,
+            'patience': 15,
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    def synthesizer_kwargs(self, epochs: int) -> Dict:
+        """Keyword arguments for CTGANSynthesizer built from this profile."""
+        return {
+            'epochs': self.epochs if self.epochs is not None else epochs,
+            'batch_size': self.batch_size,
+            'pac': self.pac,
+            'verbose': self.verbose,
+        }
+
+    def apply_threads(self) -> None:
+        """Configure torch's CPU thread pools (interop threads can only be set once per process)."""
+        if self.torch_threads is not None:
+            torch.set_num_threads(self.torch_threads)
+        if self.interop_threads is not None:
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError:
+                warnings.warn("torch interop threads were already set for this process; keeping them.")
+
+
+# ----------------------------------
+# 2) EPOCH LOG & EARLY STOPPING
+# ----------------------------------
+
+
+@dataclass
+class EpochRecord:
+    """Timing and loss report for one training epoch."""
+    epoch: int
+    seconds: float
+    rows_per_sec: float
+    generator_loss: float
+    discriminator_loss: float
+
+
+class EarlyStopping:
+    """
+    Stop training when the loss plateaus.
+
+    WGAN losses oscillate, so the monitored value is an exponential moving average of
+    |generator loss| + |discriminator loss|; training stops after `patience` epochs
+    without an improvement larger than `min_delta`.
+    """
+
+    def __init__(self, patience: int, min_delta: float = 0.01, smoothing: float = 0.3):
+        self.patience = patience
+        self.min_delta = min_delta
+        self.smoothing = smoothing
+        self.best = float('inf')
+        self.smoothed = None
+        self.stale_epochs = 0
+
+    def __call__(self, record: EpochRecord) -> bool:
+        """Update with one epoch; returns True when training should stop."""
+        value = abs(record.generator_loss) + abs(record.discriminator_loss)
+        if self.smoothed is None:
+            self.smoothed = value
+        else:
+            self.smoothed = self.smoothing * value + (1 - self.smoothing) * self.smoothed
+        if self.smoothed < self.best - self.min_delta:
+            self.best = self.smoothed
+            self.stale_epochs = 0
+        else:
+            self.stale_epochs += 1
+        return self.stale_epochs >= self.patience
+
+    def state_dict(self) -> Dict:
+        return {'best': self.best, 'smoothed': self.smoothed, 'stale_epochs': self.stale_epochs}
+
+    def load_state_dict(self, state: Dict) -> None:
+        self.best = state['best']
+        self.smoothed = state['smoothed']
+        self.stale_epochs = state['stale_epochs']
+
+
+def _append_log(path: str, record: EpochRecord) -> None:
+    """Append one epoch row to a CSV log (header written when the file is new)."""
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(asdict(record)))
+        if new_file:
+            writer.writeheader()
+        writer.writerow(asdict(record))
+
+
+# ----------------------------------
+# 3) CTGAN TRAINER
+# ----------------------------------
+
+
+class CTGANTrainer:
+    """
+    Epoch loop equivalent to ctgan.CTGAN.fit (ctgan 0.11), with the hooks CTGAN lacks:
+    per-epoch timing/loss records, early stopping, resumable checkpoints and warm starts.
+
+    fit_synthesizer() trains an SDV CTGANSynthesizer in place, so the result saves,
+    loads and samples exactly like one trained with `synthesizer.fit(data)`.
+    continue_synthesizer() then trains it further on new rows, reusing the fitted
+    transformer, the generator and (if trained here, or restored with load_state()) the
+    discriminator and optimizers.
+    """
+
+    def __init__(self, profile: TrainingProfile,
+                 on_epoch: Optional[Callable[[EpochRecord], None]] = None):
+        self.profile = profile
+        self.on_epoch = on_epoch
+        self.history: List[EpochRecord] = []
+        self.stopped_early = False
+        self._signature = None
+        # Kept after training so continue_model() can warm-start from them
+        self.discriminator_ = None
+        self.optimizers_ = None
+        self._warm_state = None  # saved by save_state(), applied by the next continue_model()
+
+    def fit_synthesizer(self, synthesizer, data: pd.DataFrame):
+        """Preprocess `data` with the synthesizer's own pipeline and train its CTGAN model."""
+        synthesizer._fitted = False
+        synthesizer._data_processor.reset_sampling()
+        synthesizer._random_state_set = False
+        processed_data = synthesizer.preprocess(data)
+
+        transformers = synthesizer._data_processor._hyper_transformer.field_transformers
+        discrete_columns = detect_discrete_columns(synthesizer.metadata, processed_data, transformers)
+        synthesizer._model = CTGAN(**synthesizer._model_kwargs)
+        self.fit_model(synthesizer._model, processed_data, discrete_columns)
+
+        synthesizer._fitted = True
+        synthesizer._fitted_date = datetime.datetime.today().strftime('%Y-%m-%d')
+        synthesizer._fitted_sdv_version = getattr(version, 'public', None)
+        synthesizer._fitted_sdv_enterprise_version = getattr(version, 'enterprise', None)
+        return synthesizer
+
+    def fit_model(self, model, train_data: pd.DataFrame, discrete_columns) -> None:
+        """Train a ctgan.CTGAN instance, resuming from the profile's checkpoint if present."""
+        self.profile.apply_threads()
+        model._validate_discrete_columns(train_data, discrete_columns)
+        model._validate_null_data(train_data, discrete_columns)
+
+        checkpoint = self._load_checkpoint(train_data)
+        if checkpoint is not None:
+            model._transformer = checkpoint['transformer']
+        else:
+            model._transformer = DataTransformer()
+            model._transformer.fit(train_data, discrete_columns)
+
+        train_data = model._transformer.transform(train_data)
+        model._data_sampler = DataSampler(train_data, model._transformer.output_info_list,
+                                          model._log_frequency)
+        data_dim = model._transformer.output_dimensions
+        cond_dim = model._data_sampler.dim_cond_vec()
+
+        model._generator = Generator(model._embedding_dim + cond_dim, model._generator_dim,
+                                     data_dim).to(model._device)
+        discriminator = Discriminator(data_dim + cond_dim, model._discriminator_dim,
+                                      pac=model.pac).to(model._device)
+        optimizerG = optim.Adam(model._generator.parameters(), lr=model._generator_lr,
+                                betas=(0.5, 0.9), weight_decay=model._generator_decay)
+        optimizerD = optim.Adam(discriminator.parameters(), lr=model._discriminator_lr,
+                                betas=(0.5, 0.9), weight_decay=model._discriminator_decay)
+
+        stopper = EarlyStopping(self.profile.patience, self.profile.min_delta) \
+            if self.profile.patience else None
+        start_epoch = 0
+        if checkpoint is not None:
+            model._generator.load_state_dict(checkpoint['generator'])
+            discriminator.load_state_dict(checkpoint['discriminator'])
+            optimizerG.load_state_dict(checkpoint['optimizerG'])
+            optimizerD.load_state_dict(checkpoint['optimizerD'])
+            self.history = [EpochRecord(**record) for record in checkpoint['history']]
+            if stopper is not None and checkpoint['early_stopping'] is not None:
+                stopper.load_state_dict(checkpoint['early_stopping'])
+            torch.set_rng_state(checkpoint['torch_rng'])
+            np.random.set_state(checkpoint['numpy_rng'])
+            self.stopped_early = checkpoint['stopped_early']
+            start_epoch = model._epochs if self.stopped_early else checkpoint['epoch'] + 1
+            if self.profile.verbose:
+                print(f"Resuming CTGAN training at epoch {start_epoch}")
+
+        self._train_epochs(model, discriminator, optimizerG, optimizerD, train_data,
+                           start_epoch, model._epochs, stopper, checkpoint=True)
+
+    def _train_epochs(self, model, discriminator, optimizerG, optimizerD, train_data,
+                      start_epoch: int, end_epoch: int, stopper: Optional[EarlyStopping],
+                      checkpoint: bool) -> None:
+        """Run epochs [start_epoch, end_epoch) on already-transformed `train_data`."""
+        self.discriminator_ = discriminator
+        self.optimizers_ = (optimizerG, optimizerD)
+        batch_size = model._batch_size
+        mean = torch.zeros(batch_size, model._embedding_dim, device=model._device)
+        std = mean + 1
+        steps_per_epoch = max(len(train_data) // batch_size, 1)
+
+        for epoch in range(start_epoch, end_epoch):
+            t0 = time.perf_counter()
+            for _ in range(steps_per_epoch):
+                for _ in range(model._discriminator_steps):
+                    loss_d = self._discriminator_step(model, discriminator, optimizerD, train_data,
+                                                      mean, std)
+                loss_g = self._generator_step(model, discriminator, optimizerG, mean, std)
+            elapsed = time.perf_counter() - t0
+
+            record = EpochRecord(
+                epoch=epoch,
+                seconds=round(elapsed, 4),
+                rows_per_sec=round(steps_per_epoch * batch_size / elapsed, 1) if elapsed > 0 else 0.0,
+                generator_loss=loss_g.detach().cpu().item(),
+                discriminator_loss=loss_d.detach().cpu().item(),
+            )
+            self._report(record)
+
+            self.stopped_early = stopper is not None and stopper(record)
+            last = self.stopped_early or epoch == end_epoch - 1
+            if checkpoint and self.profile.checkpoint_path and \
+                    ((epoch + 1) % self.profile.checkpoint_every == 0 or last):
+                self._save_checkpoint(model, discriminator, optimizerG, optimizerD, stopper, epoch)
+            if self.stopped_early:
+                if self.profile.verbose:
+                    print(f"Early stopping at epoch {epoch}: loss plateaued for {stopper.patience} epochs")
+                break
+
+        model.loss_values = pd.DataFrame({
+            'Epoch': [r.epoch for r in self.history],
+            'Generator Loss': [r.generator_loss for r in self.history],
+            'Discriminator Loss': [r.discriminator_loss for r in self.history],
+        })
+
+    # ----------------------------------
+    # Warm start
+    # ----------------------------------
+
+    def continue_synthesizer(self, synthesizer, data: pd.DataFrame, epochs: int):
+        """
+        Warm start: train a fitted SDV CTGANSynthesizer for `epochs` more epochs on `data`
+        (e.g. only the newly collected rows) without refitting anything.
+
+        Rows go through the synthesizer's already fitted data processor and CTGAN
+        transformer; columns the model was not trained on are dropped, and a ValueError
+        is raised if any of its columns is missing (rather than training on empty values).
+        The generator keeps its weights, and the discriminator and both Adam optimizers
+        are reused when this trainer trained the model (otherwise a fresh discriminator
+        is paired with the trained generator).
+        """
+        if not synthesizer._fitted or synthesizer._model is None:
+            raise RuntimeError("continue_synthesizer needs a fitted synthesizer; call fit first.")
+        columns = list(synthesizer.metadata.columns)
+        missing = [column for column in columns if column not in data.columns]
+        if missing:
+            raise ValueError(f"Warm-start data is missing model columns: {missing}")
+        processed_data = synthesizer._data_processor.transform(data[columns])
+        self.continue_model(synthesizer._model, processed_data, epochs)
+        synthesizer._fitted_date = datetime.datetime.today().strftime('%Y-%m-%d')
+        return synthesizer
+
+    def continue_model(self, model, train_data: pd.DataFrame, epochs: int) -> None:
+        """Train a fitted ctgan.CTGAN for `epochs` more epochs with its existing transformer."""
+        self.profile.apply_threads()
+        train_data = model._transformer.transform(train_data)
+        model._data_sampler = DataSampler(train_data, model._transformer.output_info_list,
+                                          model._log_frequency)
+        model._generator.train()
+
+        discriminator = self.discriminator_
+        warm_state, self._warm_state = self._warm_state, None
+        if discriminator is None:
+            data_dim = model._transformer.output_dimensions
+            cond_dim = model._data_sampler.dim_cond_vec()
+            discriminator = Discriminator(data_dim + cond_dim, model._discriminator_dim,
+                                          pac=model.pac).to(model._device)
+            self.optimizers_ = None
+            if warm_state is not None:
+                discriminator.load_state_dict(warm_state['discriminator'])
+        if self.optimizers_ is not None:
+            optimizerG, optimizerD = self.optimizers_
+        else:
+            optimizerG = optim.Adam(model._generator.parameters(), lr=model._generator_lr,
+                                    betas=(0.5, 0.9), weight_decay=model._generator_decay)
+            optimizerD = optim.Adam(discriminator.parameters(), lr=model._discriminator_lr,
+                                    betas=(0.5, 0.9), weight_decay=model._discriminator_decay)
+            if warm_state is not None:
+                optimizerG.load_state_dict(warm_state['optimizerG'])
+                optimizerD.load_state_dict(warm_state['optimizerD'])
+
+        start_epoch = self.history[-1].epoch + 1 if self.history else 0
+        self.stopped_early = False
+        self._train_epochs(model, discriminator, optimizerG, optimizerD, train_data,
+                           start_epoch, start_epoch + epochs, stopper=None, checkpoint=False)
+
+    def save_state(self, path: str) -> None:
+        """
+        Save the warm-start state of the last training run (discriminator, both Adam
+        optimizers and the epoch history) next to a saved model, so that a trainer
+        restored with load_state() continues it instead of starting a fresh critic.
+        """
+        if self.discriminator_ is None:
+            raise RuntimeError("Nothing to save: this trainer has not trained a model yet.")
+        optimizerG, optimizerD = self.optimizers_
+        state = {
+            'discriminator': self.discriminator_.state_dict(),
+            'optimizerG': optimizerG.state_dict(),
+            'optimizerD': optimizerD.state_dict(),
+            'history': [asdict(record) for record in self.history],
+        }
+        tmp_path = f"{path}.tmp"
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+
+    def load_state(self, path: str) -> None:
+        """Restore state written by save_state(); it is applied by the next continue_model()."""
+        self._warm_state = torch.load(path, map_location='cpu', weights_only=False)
+        self.history = [EpochRecord(**record) for record in self._warm_state['history']]
+        self.discriminator_ = None
+        self.optimizers_ = None
+
+    @staticmethod
+    def _discriminator_step(model, discriminator, optimizerD, train_data, mean, std):
+        """One critic update (same sampling and gradient penalty as CTGAN.fit)."""
+        batch_size = model._batch_size
+        fakez = torch.normal(mean=mean, std=std)
+        condvec = model._data_sampler.sample_condvec(batch_size)
+        if condvec is None:
+            c1 = None
+            real = model._data_sampler.sample_data(train_data, batch_size, None, None)
+        else:
+            c1, m1, col, opt = condvec
+            c1 = torch.from_numpy(c1).to(model._device)
+            fakez = torch.cat([fakez, c1], dim=1)
+            perm = np.arange(batch_size)
+            np.random.shuffle(perm)
+            real = model._data_sampler.sample_data(train_data, batch_size, col[perm], opt[perm])
+            c2 = c1[perm]
+
+        fakeact = model._apply_activate(model._generator(fakez))
+        real = torch.from_numpy(real.astype('float32')).to(model._device)
+        if c1 is not None:
+            fake_cat = torch.cat([fakeact, c1], dim=1)
+            real_cat = torch.cat([real, c2], dim=1)
+        else:
+            fake_cat, real_cat = fakeact, real
+
+        y_fake = discriminator(fake_cat)
+        y_real = discriminator(real_cat)
+        pen = discriminator.calc_gradient_penalty(real_cat, fake_cat, model._device, model.pac)
+        loss_d = -(torch.mean(y_real) - torch.mean(y_fake))
+
+        optimizerD.zero_grad(set_to_none=False)
+        pen.backward(retain_graph=True)
+        loss_d.backward()
+        optimizerD.step()
+        return loss_d
+
+    @staticmethod
+    def _generator_step(model, discriminator, optimizerG, mean, std):
+        """One generator update (adversarial loss plus conditional cross-entropy)."""
+        fakez = torch.normal(mean=mean, std=std)
+        condvec = model._data_sampler.sample_condvec(model._batch_size)
+        if condvec is not None:
+            c1, m1, col, opt = condvec
+            c1 = torch.from_numpy(c1).to(model._device)
+            m1 = torch.from_numpy(m1).to(model._device)
+            fakez = torch.cat([fakez, c1], dim=1)
+
+        fake = model._generator(fakez)
+        fakeact = model._apply_activate(fake)
+        if condvec is not None:
+            y_fake = discriminator(torch.cat([fakeact, c1], dim=1))
+            cross_entropy = model._cond_loss(fake, c1, m1)
+        else:
+            y_fake = discriminator(fakeact)
+            cross_entropy = 0
+        loss_g = -torch.mean(y_fake) + cross_entropy
+
+        optimizerG.zero_grad(set_to_none=False)
+        loss_g.backward()
+        optimizerG.step()
+        return loss_g
+
+    def _report(self, record: EpochRecord) -> None:
+        self.history.append(record)
+        if self.profile.log_path:
+            _append_log(self.profile.log_path, record)
+        if self.profile.verbose:
+            print(f"Epoch {record.epoch}: {record.seconds:.2f}s ({record.rows_per_sec:,.0f} rows/s) | "
+                  f"Gen. {record.generator_loss:.3f} | Discrim. {record.discriminator_loss:.3f}")
+        if self.on_epoch is not None:
+            self.on_epoch(record)
+
+    # ----------------------------------
+    # Checkpoints
+    # ----------------------------------
+
+    @staticmethod
+    def _data_signature(train_data: pd.DataFrame) -> Dict:
+        """Shape of the training table, used to refuse resuming on different data."""
+        return {'rows': len(train_data), 'columns': [str(c) for c in train_data.columns]}
+
+    def _save_checkpoint(self, model, discriminator, optimizerG, optimizerD, stopper, epoch) -> None:
+        path = self.profile.checkpoint_path
+        state = {
+            'epoch': epoch,
+            'stopped_early': self.stopped_early,
+            'signature': self._signature,
+            'transformer': model._transformer,
+            'generator': model._generator.state_dict(),
+            'discriminator': discriminator.state_dict(),
+            'optimizerG': optimizerG.state_dict(),
+            'optimizerD': optimizerD.state_dict(),
+            'early_stopping': stopper.state_dict() if stopper is not None else None,
+            'history': [asdict(record) for record in self.history],
+            'torch_rng': torch.get_rng_state(),
+            'numpy_rng': np.random.get_state(),
+        }
+        # Write then rename, so an interrupted save never corrupts the last good checkpoint
+        tmp_path = f"{path}.tmp"
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _load_checkpoint(self, train_data: pd.DataFrame) -> Optional[Dict]:
+        self._signature = self._data_signature(train_data)
+        path = self.profile.checkpoint_path
+        if not path or not os.path.exists(path):
+            return None
+        checkpoint = torch.load(path, map_location='cpu', weights_only=False)
+        if checkpoint.get('signature') != self._signature:
+            warnings.warn(f"Checkpoint {path} was made for different training data; starting fresh.")
+            return None
+        return checkpoint
@@ -1,13 +1,24 @@
 import pandas as pd
 import numpy as np
 from sklearn.base import BaseEstimator, TransformerMixin
+import os
 import time
 import random
+import tempfile
+from typing import Optional
 from sdv.single_table import CTGANSynthesizer
 from sdv.metadata.single_table import SingleTableMetadata
-from sdv.errors import SamplingError
+from sdv.errors import SamplingError as SDVSamplingError
+from sdv.sampling import Condition
 import joblib
 import torch
+from src.component.customer_sampler import BatchCustomerSampler, ZipConditionalSampler, resolve_rng
+from src.component.sinks import open_sink, timed_chunks, write_chunks
+from src.component.parallel import generate_customers_parallel, generate_income_parallel
+from src.component.household import expand_households
+from src.component.ctgan_training import CTGANTrainer, TrainingProfile
+from src.component.artifacts import export_ctgan_artifacts
+from src.component.postprocess import SamplingError, finalize_income_profiles, sample_matching
 
 class CSVColumnCleaner:
     def __init__(self, common_phrases, keywords):
@@ -172,9 +183,48 @@ class IncomeDataCleaner(BaseEstimator, TransformerMixin):
 
 class IncomeDataProcessor(BaseEstimator, TransformerMixin):
     """Advanced processor for census-style income data,
-       building ONE aggregated distribution across all ZIP codes."""
-
-    def __init__(self):
+       building ONE aggregated distribution across all ZIP codes
+       (plus, with per_zip=True, one conditional distribution per ZIP code)."""
+
+    # bracket -> census count / income columns, shared by the global and per-ZIP models
+    FAMILY_TYPES = {
+        'Married-couple families': {
+            'count_col': 'Number Families Married-couple families',
+            'income_col': 'Income Families Married-couple families'
+        },
+        'Female householder': {
+            'count_col': 'Number Families Female householder, no spouse present',
+            'income_col': 'Income Families Female householder, no spouse present'
+        },
+        'Male householder': {
+            'count_col': 'Number Families Male householder, no spouse present',
+            'income_col': 'Income Families Male householder, no spouse present'
+        }
+    }
+    EARNER_TYPES = {
+        '0':  {'count_col': 'Number No earners',          'income_col': 'Income No earners'},
+        '1':  {'count_col': 'Number 1 earner',            'income_col': 'Income 1 earner'},
+        '2':  {'count_col': 'Number 2 earners',           'income_col': 'Income 2 earners'},
+        '3+': {'count_col': 'Number 3 or more earners',   'income_col': 'Income 3 or more earners'}
+    }
+    HOUSEHOLD_SIZES = {
+        '2':  {'count_col': 'Number 2-person families',    'income_col': 'Income 2-person families'},
+        '3':  {'count_col': 'Number 3-person families',    'income_col': 'Income 3-person families'},
+        '4':  {'count_col': 'Number 4-person families',    'income_col': 'Income 4-person families'},
+        '5':  {'count_col': 'Number 5-person families',    'income_col': 'Income 5-person families'},
+        '6':  {'count_col': 'Number 6-person families',    'income_col': 'Income 6-person families'},
+        '7+': {'count_col': 'Number 7-or-more person families','income_col': 'Income 7-or-more person families'}
+    }
+
+    def __init__(self, per_zip=False):
+        """
+        Parameters
+        ----------
+        per_zip : bool
+            Also build `zip_model_`: per-ZIP bracket probabilities and incomes stored as
+            contiguous (n_zip, k) matrices indexed by ZIP, for ZipConditionalSampler.
+        """
+        self.per_zip = per_zip
         self.age_brackets = ['15-24', '25-44', '45-64', '65+']
 
         # Define all required columns for validation
@@ -212,6 +262,7 @@ class IncomeDataProcessor(BaseEstimator, TransformerMixin):
             'Household Income'
         ]
         self.model_ = None  # We'll store the single aggregated distribution here
+        self.zip_model_ = None  # Per-ZIP matrices (only with per_zip=True)
 
     def fit(self, X, y=None):
         """Aggregate bracket distributions + average incomes across the entire dataset (all ZIP codes)."""
@@ -230,6 +281,9 @@ class IncomeDataProcessor(BaseEstimator, TransformerMixin):
             'earner_dist': earner_dist,
             'size_dist': size_dist
         }
+
+        if self.per_zip:
+            self.zip_model_ = self._build_zip_model(X)
         return self
 
     def transform(self, X):
@@ -285,41 +339,54 @@ class IncomeDataProcessor(BaseEstimator, TransformerMixin):
         }
 
     def _calculate_family_distribution(self, df):
-        family_types = {
-            'Married-couple families': {
-                'count_col': 'Number Families Married-couple families',
-                'income_col': 'Income Families Married-couple families'
-            },
-            'Female householder': {
-                'count_col': 'Number Families Female householder, no spouse present',
-                'income_col': 'Income Families Female householder, no spouse present'
-            },
-            'Male householder': {
-                'count_col': 'Number Families Male householder, no spouse present',
-                'income_col': 'Income Families Male householder, no spouse present'
-            }
-        }
-        return self._calc_global_distribution(df, family_types)
+        return self._calc_global_distribution(df, self.FAMILY_TYPES)
 
     def _calculate_earner_distribution(self, df):
-        earner_types = {
-            '0':  {'count_col': 'Number No earners',          'income_col': 'Income No earners'},
-            '1':  {'count_col': 'Number 1 earner',            'income_col': 'Income 1 earner'},
-            '2':  {'count_col': 'Number 2 earners',           'income_col': 'Income 2 earners'},
-            '3+': {'count_col': 'Number 3 or more earners',   'income_col': 'Income 3 or more earners'}
-        }
-        return self._calc_global_distribution(df, earner_types)
+        return self._calc_global_distribution(df, self.EARNER_TYPES)
 
     def _calculate_household_size(self, df):
-        sizes = {
-            '2':  {'count_col': 'Number 2-person families',    'income_col': 'Income 2-person families'},
-            '3':  {'count_col': 'Number 3-person families',    'income_col': 'Income 3-person families'},
-            '4':  {'count_col': 'Number 4-person families',    'income_col': 'Income 4-person families'},
-            '5':  {'count_col': 'Number 5-person families',    'income_col': 'Income 5-person families'},
-            '6':  {'count_col': 'Number 6-person families',    'income_col': 'Income 6-person families'},
-            '7+': {'count_col': 'Number 7-or-more person families','income_col': 'Income 7-or-more person families'}
+        return self._calc_global_distribution(df, self.HOUSEHOLD_SIZES)
+
+    def _build_zip_model(self, df):
+        """
+        Per-ZIP model: for each bracket family (age, family, earner, size) store
+        'probs' and 'incomes' as contiguous (n_zip, k) float matrices, with
+        'zip_index' mapping a ZIP code to its row. Incomes are each ZIP's own
+        bracket income figures; 'weights' is each ZIP's household count.
+        """
+        zipcodes = df['Zipcode'].to_numpy()
+        age_cols = {
+            b: {'count_col': f'Number Household Income ({s})', 'income_col': f'Household Income ({s})'}
+            for b, s in zip(self.age_brackets,
+                            ['15 to 24 years', '25 to 44 years', '45 to 64 years', '65 years and over'])
+        }
+
+        age_dist = self._calc_zip_distribution(df, age_cols)
+        return {
+            'zipcodes': zipcodes,
+            'zip_index': {z: i for i, z in enumerate(zipcodes.tolist())},
+            'weights': age_dist['counts'].sum(axis=1),
+            'age_dist': age_dist,
+            'family_dist': self._calc_zip_distribution(df, self.FAMILY_TYPES),
+            'earner_dist': self._calc_zip_distribution(df, self.EARNER_TYPES),
+            'size_dist': self._calc_zip_distribution(df, self.HOUSEHOLD_SIZES)
+        }
+
+    def _calc_zip_distribution(self, df, bracket_map):
+        """Per-row version of _calc_global_distribution -> (n_zip, k) count/prob/income matrices."""
+        counts = np.column_stack([df[cols['count_col']].to_numpy(dtype=float)
+                                  for cols in bracket_map.values()])
+        counts = np.ascontiguousarray(np.nan_to_num(counts))
+        incomes = np.column_stack([df[cols['income_col']].to_numpy(dtype=float)
+                                   for cols in bracket_map.values()])
+        totals = counts.sum(axis=1, keepdims=True)
+        probs = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+        return {
+            'labels': list(bracket_map.keys()),
+            'counts': counts,
+            'probs': np.ascontiguousarray(probs),
+            'incomes': np.ascontiguousarray(np.nan_to_num(incomes))
         }
-        return self._calc_global_distribution(df, sizes)
 
     def _calc_global_distribution(self, df, bracket_map):
         """
@@ -369,10 +436,18 @@ class ABMGlobalModel:
 
     - Use .set_global_model(...) to supply the bracket distributions from your IncomeDataProcessor.
     - Call .generate_customers(n) to create n synthetic customers with a timing report.
+    - Call .generate_customers_batch(n, rng) for the vectorized engine (columnar output).
+    - Call .iter_customers(n, chunk_size) / .write_customers(path, n) to stream large populations
+      in bounded memory.
+    - Call .generate_customers_parallel(n, n_workers, seed) to spread sampling over a process pool.
+    - Use .set_zip_model(...) with IncomeDataProcessor(per_zip=True).zip_model_ to sample
+      directly for one ZIP or a weighted mix of ZIPs (generate_customers_batch(zipcode=...)).
     """
 
     def __init__(self):
         self.model_ = None  # Will store your bracket distributions { 'age_dist':..., ... }
+        self.sampler_ = None  # BatchCustomerSampler built from model_
+        self.zip_sampler_ = None  # ZipConditionalSampler built from a per-ZIP model
 
     def set_global_model(self, global_model):
         """
@@ -385,6 +460,15 @@ class ABMGlobalModel:
           }
         """
         self.model_ = global_model
+        # Precompute the cumulative weight tables once per model
+        self.sampler_ = BatchCustomerSampler(global_model)
+
+    def set_zip_model(self, zip_model):
+        """
+        zip_model: The dictionary from IncomeDataProcessor(per_zip=True).zip_model_,
+        holding per-ZIP (n_zip, k) probability and income matrices.
+        """
+        self.zip_sampler_ = ZipConditionalSampler(zip_model)
 
     def generate_customers(self, n=100):
         """
@@ -408,6 +492,78 @@ class ABMGlobalModel:
 
         return results
 
+    def generate_customers_batch(self, n=100, rng=None, as_frame=True, zipcode=None, zip_weights=None):
+        """
+        Vectorized version of generate_customers: draw all 'n' customers as NumPy arrays in one pass.
+
+        rng: a numpy.random.Generator (or int seed) so runs are reproducible.
+        as_frame: return a columnar DataFrame (default) or the raw dict of column arrays,
+                  where 'family_type' holds integer codes into sampler_.family_categories.
+        zipcode / zip_weights: sample from the per-ZIP model (see set_zip_model) for one
+                  ZIP, or a {zipcode: weight} mix of ZIPs; adds a 'zipcode' column.
+        """
+        if zipcode is not None or zip_weights is not None:
+            if self.zip_sampler_ is None:
+                raise ValueError("No per-ZIP model set. Call set_zip_model(...) first.")
+            sampler = self.zip_sampler_
+            kwargs = {'zipcode': zipcode, 'zip_weights': zip_weights}
+        else:
+            if self.sampler_ is None:
+                raise ValueError("No global model set. Call set_global_model(...) first.")
+            sampler = self.sampler_
+            kwargs = {}
+
+        rng = resolve_rng(rng)
+        start_time = time.time()
+        arrays = sampler.sample_arrays(n, rng, **kwargs)
+        elapsed_sec = time.time() - start_time
+        print(f"Generated {n} customers in {elapsed_sec:.2f} seconds.")
+
+        return sampler.to_frame(arrays) if as_frame else arrays
+
+    def iter_customers(self, n=100, chunk_size=100_000, rng=None, on_chunk=None):
+        """
+        Yield 'n' synthetic customers as DataFrame chunks of at most 'chunk_size' rows.
+
+        Only one chunk is held in memory at a time. 'on_chunk' (optional) receives a
+        ChunkStats with per-chunk timing and throughput.
+        """
+        if self.sampler_ is None:
+            raise ValueError("No global model set. Call set_global_model(...) first.")
+
+        return timed_chunks(self.sampler_.iter_chunks(n, chunk_size, rng), on_chunk)
+
+    def write_customers(self, path, n=100, chunk_size=100_000, rng=None, on_chunk=None, fmt=None):
+        """
+        Stream 'n' synthetic customers straight to 'path' in constant memory.
+
+        fmt: 'csv', 'parquet' or 'arrow' (inferred from the file extension if omitted).
+        'on_chunk' receives generation + write timing for every chunk. Returns rows written.
+        """
+        if self.sampler_ is None:
+            raise ValueError("No global model set. Call set_global_model(...) first.")
+
+        with open_sink(path, fmt) as sink:
+            return write_chunks(self.sampler_.iter_chunks(n, chunk_size, rng), sink, on_chunk)
+
+    def generate_customers_parallel(self, n=100, n_workers=None, seed=None, chunk_size=1_000_000):
+        """
+        Generate 'n' synthetic customers across 'n_workers' processes (default: all cores).
+
+        Each worker draws from its own spawned SeedSequence child and writes into shared
+        memory, so the output is bit-identical for a given (seed, n_workers, chunk_size).
+        """
+        if self.model_ is None:
+            raise ValueError("No global model set. Call set_global_model(...) first.")
+
+        start_time = time.time()
+        customers = generate_customers_parallel(self.model_, n, n_workers=n_workers,
+                                                seed=seed, chunk_size=chunk_size)
+        elapsed_sec = time.time() - start_time
+        print(f"Generated {n} customers in {elapsed_sec:.2f} seconds.")
+
+        return customers
+
     # ----------------------------------------------------------------
     # Internal methods
     # ----------------------------------------------------------------
@@ -490,7 +646,18 @@ class ABMGlobalModel:
 class DataPreprocessor(BaseEstimator, TransformerMixin):
     """Enhanced data processor with full demographic expansion"""
 
-    def __init__(self):
+    def __init__(self, vectorized=True, random_state=None):
+        """
+        Parameters
+        ----------
+        vectorized : bool
+            Expand households with array operations (see household.expand_households)
+            instead of the row-by-row iterrows() path.
+        random_state : int, numpy Generator or None
+            Seed for the vectorized path.
+        """
+        self.vectorized = vectorized
+        self.random_state = random_state
         self.required_columns = [
             'Zipcode',
             # Age distribution columns
@@ -529,6 +696,9 @@ class DataPreprocessor(BaseEstimator, TransformerMixin):
 
     def transform(self, X):
         """Convert aggregated data to household-level format with full demographics"""
+        if self.vectorized:
+            return expand_households(X, self.random_state)
+
         households = []
 
         for _, row in X.iterrows():
@@ -648,11 +818,13 @@ class DataPreprocessor(BaseEstimator, TransformerMixin):
 class AdvancedIncomeModel:
     """Enhanced model using SDV 1.19.0 Single-Table CTGAN approach."""
 
-    def __init__(self, epochs=100):
+    def __init__(self, epochs=100, training_profile: Optional[TrainingProfile] = None):
         self.epochs = epochs
+        self.training_profile = training_profile  # None = plain synthesizer.fit
         self.preprocessor = DataPreprocessor()
         self.metadata = None
         self.synthesizer = None
+        self.trainer_ = None
 
     def fit(self, X):
         """1. Preprocess data, 2. Build Metadata, 3. Train CTGANSynthesizer."""
@@ -673,41 +845,98 @@ class AdvancedIncomeModel:
         self.metadata.update_column('household_size', sdtype='numerical')
 
         # 3. Create and train the CTGANSynthesizer
+        if self.training_profile is None:
+            self.synthesizer = CTGANSynthesizer(
+                metadata=self.metadata,
+                enforce_rounding=False,
+                epochs=self.epochs,
+                verbose=True
+            )
+            self.synthesizer.fit(household_data)
+            return self
+
+        # Performance profile: batch size / PAC / threads, early stopping, checkpoints, epoch log
         self.synthesizer = CTGANSynthesizer(
             metadata=self.metadata,
             enforce_rounding=False,
-            epochs=self.epochs,
-            verbose=True
+            **self.training_profile.synthesizer_kwargs(self.epochs)
         )
-        self.synthesizer.fit(household_data)
+        self.trainer_ = CTGANTrainer(self.training_profile)
+        self.trainer_.fit_synthesizer(self.synthesizer, household_data)
         return self
 
-    def generate(self, num_samples=10):
-        """Generate synthetic data from the trained synthesizer."""
-        synthetic = self.synthesizer.sample(num_rows=num_samples)
-
-
-        if 'age_bracket' in synthetic.columns:
-            def bracket_to_age(bracket):
-                if '-' in bracket:
-                    low, high = bracket.split('-')
-                    return np.random.randint(int(low), int(high) + 1)
-                else:
-                    # e.g. '65+' bracket
-                    return np.random.randint(65, 85)
-            synthetic['age'] = synthetic['age_bracket'].apply(bracket_to_age)
-
-        # Convert '3+' earners to random 3-5
-        if 'earners' in synthetic.columns:
-            def parse_earners(e):
-                if e == '3+':
-                    return np.random.randint(3, 6)
-                return int(e)
-            synthetic['earners'] = synthetic['earners'].apply(parse_earners)
-
-        # Return final columns
-        return synthetic[['zipcode', 'age', 'marital_status',
-                          'household_size', 'income', 'gender', 'earners']]
+    def generate(self, num_samples=10, zipcode=None, rng=None):
+        """
+        Generate synthetic data from the trained synthesizer.
+
+        With 'zipcode', rows are sampled conditionally on that ZIP and exactly
+        'num_samples' rows for it are returned (no generate-then-filter).
+        'rng' drives the age / earner draws of the post-processing step.
+        """
+        if zipcode is None:
+            synthetic = self.synthesizer.sample(num_rows=num_samples)
+        else:
+            synthetic = self._sample_zipcode(num_samples, zipcode)
+
+        return finalize_income_profiles(synthetic, rng=rng)
+
+    def _sample_zipcode(self, num_rows, zipcode, max_rounds=20):
+        """
+        Sample exactly 'num_rows' rows whose zipcode equals 'zipcode'.
+
+        Each round asks CTGAN for rows generated under the zipcode's conditional vector,
+        so nearly every row already matches; the rare misses are topped up in the next
+        round (see postprocess.sample_matching).
+        """
+        try:
+            return sample_matching(lambda batch_size: self._sample_conditioned_batch(batch_size, zipcode),
+                                   num_rows, 'zipcode', zipcode, max_rounds=max_rounds)
+        except SamplingError as e:
+            raise SamplingError(f"No profiles for zipcode {zipcode}: {e}") from e
+
+    def _sample_conditioned_batch(self, num_rows, zipcode):
+        """
+        One batch of rows conditioned on 'zipcode'.
+
+        Uses CTGAN's conditional vector directly when the zipcode is one of its discrete
+        columns; otherwise falls back to SDV's Condition-based sampling. CTGANSynthesizer
+        has no public conditional-vector sampling, hence the fitted ctgan model and data
+        processor behind it are used here.
+        """
+        try:
+            raw = self.synthesizer._model.sample(num_rows, condition_column='zipcode',
+                                                 condition_value=zipcode)
+        except ValueError as e:
+            # ctgan: zipcode is not a discrete column, or this value was never seen in training
+            if "doesn't exist" not in str(e):
+                raise
+            condition = Condition(num_rows=num_rows, column_values={'zipcode': zipcode})
+            try:
+                return self.synthesizer.sample_from_conditions(conditions=[condition])
+            except (SDVSamplingError, ValueError) as sdv_error:
+                raise SamplingError(str(sdv_error)) from sdv_error
+        return self.synthesizer._data_processor.reverse_transform(raw)
+
+    def generate_parallel(self, num_samples=10, n_workers=None, seed=None,
+                          model_path=None, output_path=None, torch_threads=1):
+        """
+        Generate synthetic data across a process pool.
+
+        Workers load the synthesizer from 'model_path' (the model is saved to a temporary
+        file first if not given), are seeded from spawned SeedSequence children and
+        write ordered chunk files that are merged here, so results are reproducible for a
+        given (seed, num_samples, n_workers). With 'output_path' the chunks are streamed to that file
+        and the number of rows written is returned instead of a DataFrame.
+        """
+        if model_path is not None:
+            return generate_income_parallel(model_path, num_samples, n_workers=n_workers, seed=seed,
+                                            output_path=output_path, torch_threads=torch_threads)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, 'income_model.pkl')
+            self.save(model_path)
+            return generate_income_parallel(model_path, num_samples, n_workers=n_workers, seed=seed,
+                                            output_path=output_path, torch_threads=torch_threads)
 
     def save(self, path):
         """Save the entire synthesizer object using SDV's save method."""
@@ -728,6 +957,16 @@ class AdvancedIncomeModel:
 
         return model
 
+    def export_artifacts(self, path):
+        """
+        Export the trained generator for fast serving: memory-mappable weights
+        (generator.safetensors) plus transformer metadata (metadata.json) in directory 'path'.
+        Load with src.component.artifacts.load_artifacts.
+        """
+        if not self.synthesizer:
+            raise RuntimeError("You must fit the model before exporting it.")
+        return export_ctgan_artifacts(self.synthesizer, path, kind='AdvancedIncomeModel')
+
     @classmethod
     def _force_cpu_loading(cls, path):
         """Handle GPU-trained model loading on CPU."""
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import pandas as pd
 import requests
 import json
@@ -8,12 +9,23 @@ import time
 from retrying import retry
 from typing import Dict, List, Optional
 
+from src.component.llm_cache import ResponseCache
+from src.component.llm_client import AsyncLLMClient
+from src.component.job_runner import JobJournal
+from src.component.sinks import CSVSink
+
+# Columns of the generated customer CSV (fixed so results can be streamed chunk by chunk)
+CUSTOMER_FIELDS = ["zipcode", "age", "marital_status", "household_size", "income", "gender", "earners"]
+
 
 class DeepSeekCustomerGenerator:
     """Generates synthetic customer profiles using DeepSeek's API"""
 
-    def __init__(self, api_key: str):
-        self.api_url = "https://api.deepseek.com/v1/chat/completions"
+    def __init__(self, api_key: str, api_url: str = "https://api.deepseek.com/v1/chat/completions",
+                 cache: Optional[ResponseCache] = None):
+        self.api_url = api_url  # point at mock_llm_server.py for benchmarks
+        self.cache = cache  # re-runs are answered from disk instead of the API
+        self._last_cached = False
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
@@ -22,7 +34,12 @@ class DeepSeekCustomerGenerator:
 
     @retry(stop_max_attempt_number=3, wait_fixed=2000)
     def _api_request(self, payload: Dict) -> Optional[Dict]:
-        """Make API request with retry logic"""
+        """Make API request with retry logic (served from the response cache when possible)"""
+        if self.cache is not None:
+            cached = self.cache.get(self.api_url, payload)
+            self._last_cached = cached is not None
+            if cached is not None:
+                return cached
         try:
             response = requests.post(
                 self.api_url,
@@ -31,6 +48,7 @@ class DeepSeekCustomerGenerator:
                 timeout=30
             )
             response.raise_for_status()
+            # Cached by the caller once the answer has parsed into customers
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"API Error: {str(e)}")
@@ -157,38 +175,123 @@ class DeepSeekCustomerGenerator:
         except:
             return []
 
-    def generate_customers(self, input_file: str, output_file: str) -> None:
-        """Main generation workflow"""
+    def _build_payload(self, row: Dict) -> Dict:
+        """Chat completion request body for one census row"""
+        return {
+            "model": "deepseek-chat",
+            "messages": [
+                {"role": "system", "content": "You are a synthetic data generator that outputs accurate JSON."},
+                {"role": "user", "content": self._build_prompt(row)}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 2000,
+            "response_format": {"type": "json_object"}
+        }
+
+    @staticmethod
+    def _zip_unit(row) -> str:
+        """Journal key of a census row: its ZIP code (20001.0 and 20001 map to '20001')"""
+        zipcode = row.get('Zipcode', 'unknown')
+        if isinstance(zipcode, float) and zipcode.is_integer():
+            zipcode = int(zipcode)
+        return str(zipcode)
+
+    def generate_customers(self, input_file: str, output_file: str, journal_path: Optional[str] = None) -> None:
+        """
+        Main generation workflow. With `journal_path`, each ZIP's customers are recorded
+        in a JobJournal as soon as they arrive; rerunning with the same journal skips
+        the ZIPs already done.
+        """
         raw_data = pd.read_csv(input_file)
+        journal = JobJournal(journal_path) if journal_path else None
         all_customers = []
 
         for _, row in raw_data.iterrows():
+            zipcode = self._zip_unit(row)
+            if journal is not None and journal.is_done(zipcode):
+                continue
             try:
-                payload = {
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {"role": "system", "content": "You are a synthetic data generator that outputs accurate JSON."},
-                        {"role": "user", "content": self._build_prompt(row.to_dict())}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 2000,
-                    "response_format": {"type": "json_object"}
-                }
+                payload = self._build_payload(row.to_dict())
 
                 response = self._api_request(payload)
                 if response:
                     customers = self._process_response(response)
                     all_customers.extend(customers)
+                    if self.cache is not None and customers and not self._last_cached:
+                        self.cache.set(self.api_url, payload, response)
+                    if journal is not None and customers:
+                        journal.mark_done(zipcode, customers)
 
-                time.sleep(self.rate_limit_delay)
+                # Only pace calls that actually reached the API
+                if not self._last_cached:
+                    time.sleep(self.rate_limit_delay)
 
             except Exception as e:
-                print(f"Skipping zipcode {row.get('Zipcode', 'unknown')}: {str(e)}")
+                print(f"Skipping zipcode {zipcode}: {str(e)}")
                 continue
 
+        if journal is not None:
+            all_customers = journal.rows()
+            journal.close()
+
         df = pd.DataFrame(all_customers)
         df.to_csv(output_file, index=False)
         print(f"Successfully generated {len(df)} customer profiles")
+        if self.cache is not None:
+            print(f"Response cache: {self.cache.stats()}")
+
+    async def generate_customers_async(self, input_file: str, output_file: str,
+                                       max_concurrency: int = 8, requests_per_second: float = 4.0,
+                                       max_retries: int = 4, journal_path: Optional[str] = None) -> int:
+        """
+        Concurrent generation workflow: one request per ZIP, at most `max_concurrency`
+        in flight over pooled connections, paced by a token bucket and retried with
+        jittered backoff. Customers are appended to `output_file` as each ZIP completes.
+
+        With `journal_path`, finished ZIPs are also recorded in a JobJournal; a rerun
+        only requests the remaining ZIPs and rewrites `output_file` with all customers.
+        Returns the number of customers written.
+        """
+        raw_data = pd.read_csv(input_file)
+        rows = raw_data.to_dict('records')
+        journal = JobJournal(journal_path) if journal_path else None
+        if journal is not None:
+            rows = [row for row in rows if not journal.is_done(self._zip_unit(row))]
+
+        async with AsyncLLMClient(self.api_url, self.headers, requests_per_second=requests_per_second,
+                                  max_concurrency=max_concurrency, max_retries=max_retries,
+                                  cache=self.cache) as client:
+
+            async def fetch(row: Dict):
+                try:
+                    return row, await client.post_json(self._build_payload(row), validate=self._process_response)
+                except Exception as e:
+                    print(f"Skipping zipcode {row.get('Zipcode', 'unknown')}: {str(e)}")
+                    return row, None
+
+            with CSVSink(output_file) as sink:
+                if journal is not None and journal.rows_loaded:
+                    sink.write(pd.DataFrame(journal.rows()).reindex(columns=CUSTOMER_FIELDS))
+                    print(f"Resuming: {sink.rows_written} customers from {len(journal.done_units)} ZIPs already done")
+                for finished in asyncio.as_completed([fetch(row) for row in rows]):
+                    row, response = await finished
+                    if not response:
+                        continue
+                    customers = self._process_response(response)
+                    if customers:
+                        sink.write(pd.DataFrame(customers).reindex(columns=CUSTOMER_FIELDS))
+                        if journal is not None:
+                            journal.mark_done(self._zip_unit(row), customers)
+
+            if journal is not None:
+                journal.close()
+            print(f"Successfully generated {sink.rows_written} customer profiles "
+                  f"({client.stats()['requests']} requests, {client.stats()['retries']} retries)")
+            return sink.rows_written
+
+    def generate_customers_concurrent(self, input_file: str, output_file: str, **kwargs) -> int:
+        """Blocking wrapper around generate_customers_async"""
+        return asyncio.run(self.generate_customers_async(input_file, output_file, **kwargs))
 
     @staticmethod
     def _validate_row(row: Dict) -> bool:
@@ -0,0 +1,281 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, Tuple
+
+from src.component.sinks import chunk_sizes
+
+# ----------------------------------
+# 1) BRACKET BOUNDS & ROW-WISE DRAWS
+# ----------------------------------
+
+# Inclusive (low, high) numeric range each bracket label expands to.
+# These mirror ABMGlobalModel._bracket_to_age / _parse_earners / _parse_household_size.
+AGE_BOUNDS = {
+    '15-24': (15, 24),
+    '25-44': (25, 44),
+    '45-64': (45, 64),
+    '65+': (65, 90),
+}
+AGE_FALLBACK = (18, 85)
+
+EARNER_BOUNDS = {'3+': (3, 5)}
+SIZE_BOUNDS = {'7+': (7, 9)}
+
+
+def resolve_rng(rng=None) -> np.random.Generator:
+    """Return a numpy Generator from None, an int seed, a SeedSequence or an existing Generator."""
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
+
+
+def _bounds_for(labels, bounds_map, fallback=None) -> Tuple[np.ndarray, np.ndarray]:
+    """Build (low, high) int arrays aligned with `labels`; plain integer labels map to (k, k)."""
+    low = np.empty(len(labels), dtype=np.int64)
+    high = np.empty(len(labels), dtype=np.int64)
+    for i, label in enumerate(labels):
+        if label in bounds_map:
+            low[i], high[i] = bounds_map[label]
+        elif fallback is not None:
+            low[i], high[i] = fallback
+        else:
+            low[i] = high[i] = int(label)
+    return low, high
+
+
+def row_cdf(counts: np.ndarray, fallback: np.ndarray) -> np.ndarray:
+    """
+    Turn a (n_rows, k) matrix of counts/weights into per-row cumulative probabilities.
+    Rows whose counts sum to 0 use the `fallback` weights instead.
+    """
+    counts = np.nan_to_num(np.asarray(counts, dtype=float))
+    totals = counts.sum(axis=1, keepdims=True)
+    empty = totals[:, 0] == 0
+    counts[empty] = fallback
+    totals[empty] = np.sum(fallback)
+    cdf = np.cumsum(counts / totals, axis=1)
+    cdf[:, -1] = 1.0
+    return cdf
+
+
+def draw_per_row(cdf: np.ndarray, row_idx: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw one category code per entry of `row_idx`, using that row's cdf.
+
+    Row i's cdf is shifted into [i, i + 1] so every row can be searched with a
+    single `searchsorted` over the flattened matrix.
+    """
+    n_rows, k = cdf.shape
+    flat = (cdf + np.arange(n_rows)[:, None]).ravel()
+    positions = np.searchsorted(flat, rng.random(len(row_idx)) + row_idx, side='right')
+    return np.minimum(positions - row_idx * k, k - 1)
+
+
+# ----------------------------------
+# 2) CATEGORICAL TABLE
+# ----------------------------------
+
+class CategoricalTable:
+    """
+    Precomputed sampling table for one bracket distribution, e.g. the
+    {'distribution': {...}, 'incomes': {...}} dicts built by IncomeDataProcessor.
+
+    Labels, cumulative weights and bracket incomes are stored as aligned arrays
+    so that n draws cost one `searchsorted` instead of n `np.random.choice` calls.
+    """
+
+    def __init__(self, dist: Dict):
+        self.labels = np.array(list(dist['distribution'].keys()), dtype=object)
+        weights = np.array(list(dist['distribution'].values()), dtype=float)
+        total = weights.sum()
+        if total == 0:
+            # fallback uniform, same as ABMGlobalModel._weighted_choice
+            weights = np.ones(len(weights)) / len(weights)
+        else:
+            weights = weights / total
+        self.cdf = np.cumsum(weights)
+        self.cdf[-1] = 1.0
+        self.incomes = np.array([dist['incomes'][label] for label in self.labels], dtype=float)
+
+    def draw_codes(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """Draw `n` bracket codes (indices into `labels`)."""
+        return np.searchsorted(self.cdf, rng.random(n), side='right')
+
+
+# ----------------------------------
+# 3) BATCH SAMPLER
+# ----------------------------------
+
+class BatchCustomerSampler:
+    """
+    Vectorized engine behind ABMGlobalModel: draws every bracket, age, earner count,
+    household size and income for `n` customers as NumPy arrays in one pass.
+
+    - Build once per global model (the weight tables are precomputed here).
+    - Call .sample_arrays(n, rng) for raw columns or .sample(n, rng) for a DataFrame.
+    """
+
+    columns = ['age', 'family_type', 'earners', 'household_size', 'income']
+
+    def __init__(self, global_model: Dict):
+        self.age = CategoricalTable(global_model['age_dist'])
+        self.family = CategoricalTable(global_model['family_dist'])
+        self.earner = CategoricalTable(global_model['earner_dist'])
+        self.size = CategoricalTable(global_model['size_dist'])
+
+        self.age_low, self.age_high = _bounds_for(self.age.labels, AGE_BOUNDS, AGE_FALLBACK)
+        self.earner_low, self.earner_high = _bounds_for(self.earner.labels, EARNER_BOUNDS)
+        self.size_low, self.size_high = _bounds_for(self.size.labels, SIZE_BOUNDS)
+
+    @property
+    def family_categories(self) -> list:
+        """Family-type labels, in the order used by the `family_type` codes."""
+        return list(self.family.labels)
+
+    def sample_arrays(self, n: int, rng=None) -> Dict[str, np.ndarray]:
+        """
+        Draw `n` customers and return a dict of column arrays.
+        `family_type` is returned as integer codes into `family_categories`.
+        """
+        rng = resolve_rng(rng)
+
+        # 1) Weighted bracket picks
+        age_code = self.age.draw_codes(n, rng)
+        family_code = self.family.draw_codes(n, rng)
+        earner_code = self.earner.draw_codes(n, rng)
+        size_code = self.size.draw_codes(n, rng)
+
+        # 2) Brackets -> numeric values (one vectorized integer draw each)
+        age = rng.integers(self.age_low[age_code], self.age_high[age_code], endpoint=True)
+        earners = rng.integers(self.earner_low[earner_code], self.earner_high[earner_code], endpoint=True)
+        household_size = rng.integers(self.size_low[size_code], self.size_high[size_code], endpoint=True)
+
+        # 3) Combine bracket incomes + 20% noise, clamp min at $5k
+        raw_income = (self.age.incomes[age_code] + self.family.incomes[family_code]
+                      + self.earner.incomes[earner_code] + self.size.incomes[size_code]) / 4.0
+        income = np.maximum(5000, rng.normal(raw_income, 0.2 * raw_income))
+
+        return {
+            'age': age,
+            'family_type': family_code.astype(np.int8),
+            'earners': earners,
+            'household_size': household_size,
+            'income': np.round(income, 2),
+        }
+
+    def to_frame(self, arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """Wrap sampled arrays into a columnar DataFrame with a categorical `family_type`."""
+        frame = dict(arrays)
+        frame['family_type'] = pd.Categorical.from_codes(arrays['family_type'], categories=self.family_categories)
+        return pd.DataFrame(frame, columns=self.columns)
+
+    def sample(self, n: int, rng=None, **kwargs) -> pd.DataFrame:
+        """Draw `n` customers as a DataFrame (same columns as ABMGlobalModel.generate_customers)."""
+        return self.to_frame(self.sample_arrays(n, rng, **kwargs))
+
+    def iter_chunks(self, n: int, chunk_size: int = 100_000, rng=None, **kwargs) -> Iterator[pd.DataFrame]:
+        """Yield `n` customers as DataFrames of at most `chunk_size` rows, sharing one rng stream."""
+        rng = resolve_rng(rng)
+        for size in chunk_sizes(n, chunk_size):
+            yield self.sample(size, rng, **kwargs)
+
+
+# ----------------------------------
+# 4) PER-ZIP CONDITIONAL SAMPLER
+# ----------------------------------
+
+class ZipCategoricalTable:
+    """
+    Per-ZIP version of CategoricalTable: one row of cumulative weights and bracket
+    incomes per ZIP, stored as contiguous (n_zip, k) matrices.
+    """
+
+    def __init__(self, dist: Dict):
+        self.labels = np.array(dist['labels'], dtype=object)
+        self.cdf = row_cdf(dist['probs'], fallback=np.ones(len(self.labels)))
+        self.incomes = np.ascontiguousarray(dist['incomes'], dtype=float)
+
+    def draw_codes(self, row_idx: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Draw one bracket code per entry of `row_idx` (a ZIP row index)."""
+        return draw_per_row(self.cdf, row_idx, rng)
+
+
+class ZipConditionalSampler(BatchCustomerSampler):
+    """
+    Samples customers conditioned on ZIP code from the per-ZIP model built by
+    IncomeDataProcessor(per_zip=True).
+
+    - sample_arrays(n, rng, zipcode=z) draws n customers for one ZIP.
+    - sample_arrays(n, rng, zip_weights={z: w, ...}) draws a weighted mix of ZIPs
+      (default mix: each ZIP's household count).
+    Both are O(n) with no generate-then-filter rejection.
+    """
+
+    columns = ['zipcode'] + BatchCustomerSampler.columns
+
+    def __init__(self, zip_model: Dict):
+        self.zipcodes = np.asarray(zip_model['zipcodes'])
+        self.zip_index = dict(zip_model['zip_index'])
+        self.zip_weights = np.asarray(zip_model['weights'], dtype=float)
+
+        self.age = ZipCategoricalTable(zip_model['age_dist'])
+        self.family = ZipCategoricalTable(zip_model['family_dist'])
+        self.earner = ZipCategoricalTable(zip_model['earner_dist'])
+        self.size = ZipCategoricalTable(zip_model['size_dist'])
+
+        self.age_low, self.age_high = _bounds_for(self.age.labels, AGE_BOUNDS, AGE_FALLBACK)
+        self.earner_low, self.earner_high = _bounds_for(self.earner.labels, EARNER_BOUNDS)
+        self.size_low, self.size_high = _bounds_for(self.size.labels, SIZE_BOUNDS)
+
+    def zip_rows(self, n: int, rng: np.random.Generator, zipcode=None, zip_weights=None) -> np.ndarray:
+        """Pick the ZIP row index of each of the `n` customers."""
+        if zipcode is not None:
+            if zipcode not in self.zip_index:
+                raise ValueError(f"Unknown zipcode: {zipcode}")
+            return np.full(n, self.zip_index[zipcode], dtype=np.int64)
+
+        if zip_weights is None:
+            rows = np.arange(len(self.zipcodes))
+            weights = self.zip_weights
+        else:
+            unknown = [z for z in zip_weights if z not in self.zip_index]
+            if unknown:
+                raise ValueError(f"Unknown zipcodes: {unknown}")
+            rows = np.array([self.zip_index[z] for z in zip_weights], dtype=np.int64)
+            weights = np.array(list(zip_weights.values()), dtype=float)
+
+        cdf = row_cdf(weights[None, :], fallback=np.ones(len(weights)))[0]
+        return rows[np.searchsorted(cdf, rng.random(n), side='right')]
+
+    def sample_arrays(self, n: int, rng=None, zipcode=None, zip_weights=None) -> Dict[str, np.ndarray]:
+        """
+        Draw `n` customers for one `zipcode` or a `zip_weights` mix of ZIPs.
+        Same columns as BatchCustomerSampler.sample_arrays plus `zipcode`.
+        """
+        rng = resolve_rng(rng)
+        row_idx = self.zip_rows(n, rng, zipcode, zip_weights)
+
+        # 1) Weighted bracket picks, each from the customer's own ZIP row
+        age_code = self.age.draw_codes(row_idx, rng)
+        family_code = self.family.draw_codes(row_idx, rng)
+        earner_code = self.earner.draw_codes(row_idx, rng)
+        size_code = self.size.draw_codes(row_idx, rng)
+
+        # 2) Brackets -> numeric values
+        age = rng.integers(self.age_low[age_code], self.age_high[age_code], endpoint=True)
+        earners = rng.integers(self.earner_low[earner_code], self.earner_high[earner_code], endpoint=True)
+        household_size = rng.integers(self.size_low[size_code], self.size_high[size_code], endpoint=True)
+
+        # 3) Combine the ZIP's bracket incomes + 20% noise, clamp min at $5k
+        raw_income = (self.age.incomes[row_idx, age_code] + self.family.incomes[row_idx, family_code]
+                      + self.earner.incomes[row_idx, earner_code] + self.size.incomes[row_idx, size_code]) / 4.0
+        income = np.maximum(5000, rng.normal(raw_income, 0.2 * raw_income))
+
+        return {
+            'zipcode': self.zipcodes[row_idx],
+            'age': age,
+            'family_type': family_code.astype(np.int8),
+            'earners': earners,
+            'household_size': household_size,
+            'income': np.round(income, 2),
+        }
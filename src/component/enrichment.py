@@ -0,0 +1,128 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from src.component.sinks import ChunkSink
+
+# (row, fetched result) -> output record, or None to drop the row
+MergeFn = Callable[[Dict, Dict], Optional[Dict]]
+
+
+class DedupEnricher:
+    """
+    Streaming enrichment stage for large DataFrames whose rows need one (slow, paid)
+    lookup each, e.g. an LLM call per synthetic transaction.
+
+    - Rows are processed in batches of `batch_size`; every batch is emitted as soon as
+      it is complete, and the lookups of the next batch are already running meanwhile.
+    - Rows sharing the same values in `key_columns` share one lookup: each distinct key
+      is fetched once (concurrent duplicates await the same task) and successful
+      results are kept in `cache` for later batches and later runs of this instance.
+    - `fetch(key)` is an async callable (typically going through an AsyncLLMClient, which
+      provides the rate limiting and bounded concurrency); returning None or raising
+      drops the affected rows of that batch (the key is retried in later batches).
+    """
+
+    def __init__(self, fetch: Callable[[Tuple], Awaitable[Optional[Dict]]], key_columns: Sequence[str],
+                 batch_size: int = 500):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.fetch = fetch
+        self.key_columns = list(key_columns)
+        self.batch_size = batch_size
+        self.cache: Dict[Tuple, Dict] = {}
+        self._in_flight: Dict[Tuple, asyncio.Task] = {}
+
+        self.rows = 0
+        self.rows_written = 0
+        self.fetches = 0
+        self.failures = 0
+
+    def _keys(self, batch: pd.DataFrame) -> List[Tuple]:
+        return list(batch[self.key_columns].itertuples(index=False, name=None))
+
+    async def _fetch(self, key: Tuple) -> Optional[Dict]:
+        self.fetches += 1
+        try:
+            result = await self.fetch(key)
+        except Exception as e:
+            print(f"Enrichment failed for {key}: {str(e)}")
+            result = None
+        finally:
+            self._in_flight.pop(key, None)
+        if result is None:
+            self.failures += 1
+        else:
+            self.cache[key] = result
+        return result
+
+    def _schedule(self, keys: Iterable[Tuple]) -> Dict[Tuple, asyncio.Task]:
+        """Start a lookup for every key that is neither cached nor already in flight."""
+        tasks = {}
+        for key in dict.fromkeys(keys):
+            if key in self.cache:
+                continue
+            if key not in self._in_flight:
+                self._in_flight[key] = asyncio.ensure_future(self._fetch(key))
+            tasks[key] = self._in_flight[key]
+        return tasks
+
+    async def stream(self, df: pd.DataFrame, merge: MergeFn) -> AsyncIterator[pd.DataFrame]:
+        """Yield one enriched DataFrame per input batch of `df` (rows that failed are dropped)."""
+        starts = range(0, len(df), self.batch_size)
+        batches = [df.iloc[start:start + self.batch_size] for start in starts]
+        if not batches:
+            return
+
+        keys = self._keys(batches[0])
+        tasks = self._schedule(keys)
+        try:
+            for index, batch in enumerate(batches):
+                # Look ahead: the next batch's lookups run while this one is awaited and written
+                if index + 1 < len(batches):
+                    next_keys = self._keys(batches[index + 1])
+                    next_tasks = self._schedule(next_keys)
+                else:
+                    next_keys, next_tasks = [], {}
+
+                if tasks:
+                    await asyncio.gather(*tasks.values())
+                records = []
+                for row, key in zip(batch.to_dict('records'), keys):
+                    result = self.cache.get(key)
+                    if result is None:
+                        continue
+                    record = merge(row, result)
+                    if record is not None:
+                        records.append(record)
+                self.rows += len(batch)
+                yield pd.DataFrame(records)
+
+                keys, tasks = next_keys, next_tasks
+        finally:
+            for task in list(self._in_flight.values()):
+                task.cancel()
+
+    async def run(self, df: pd.DataFrame, merge: MergeFn, sinks: Sequence[ChunkSink]) -> int:
+        """Enrich `df` batch by batch, writing every non-empty chunk to all `sinks`. Returns rows written."""
+        written = 0
+        async for chunk in self.stream(df, merge):
+            if chunk.empty:
+                continue
+            for sink in sinks:
+                sink.write(chunk)
+            written += len(chunk)
+        self.rows_written += written
+        return written
+
+    def stats(self) -> Dict:
+        """Rows seen / written, distinct lookups made, rows served by deduplication, failures."""
+        return {
+            'rows': self.rows,
+            'rows_written': self.rows_written,
+            'fetches': self.fetches,
+            'deduplicated_rows': max(self.rows - self.fetches, 0),
+            'failures': self.failures,
+            'cached_keys': len(self.cache),
+        }
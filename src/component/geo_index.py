@@ -0,0 +1,98 @@
+import numpy as np
+from typing import Dict, Sequence, Tuple
+
+# Mean Earth radius in miles (haversine great-circle distance)
+EARTH_RADIUS_MILES = 3958.7613
+# Miles per degree of latitude
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * np.pi / 180.0
+
+
+def haversine_miles(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Vectorized great-circle distance in miles between coordinate arrays (degrees)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class MerchantGeoIndex:
+    """
+    Grid index of merchant coordinates for radius queries.
+
+    Merchants are bucketed into square lat/lon cells of `cell_degrees`; row positions
+    are sorted once by cell and a CSR-style offset array marks where each cell starts
+    (like MerchantIndex). A radius query only computes exact haversine distances for
+    merchants in the cells overlapping the query's bounding box.
+
+    Haversine on a sphere differs from geopy's ellipsoidal geodesic by well under 1%
+    at city scale. Positions returned by queries index the coordinate arrays the index
+    was built from (use `.iloc` on a DataFrame); the source table is never modified.
+    Merchants with missing coordinates are left out, as they never match a radius.
+    """
+
+    def __init__(self, latitudes: Sequence[float], longitudes: Sequence[float], cell_degrees: float = 0.02):
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.cell_degrees = float(cell_degrees)
+
+        valid = np.flatnonzero(np.isfinite(self.latitudes) & np.isfinite(self.longitudes))
+        if len(valid):
+            self.lat_origin = self.latitudes[valid].min()
+            self.lon_origin = self.longitudes[valid].min()
+            rows = self._cell(self.latitudes[valid], self.lat_origin)
+            cols = self._cell(self.longitudes[valid], self.lon_origin)
+            self.n_rows, self.n_cols = int(rows.max()) + 1, int(cols.max()) + 1
+        else:
+            self.lat_origin = self.lon_origin = 0.0
+            rows = cols = np.zeros(0, dtype=np.int64)
+            self.n_rows = self.n_cols = 1
+
+        keys = rows * self.n_cols + cols
+        order = np.argsort(keys, kind='stable')
+        self.positions = valid[order]
+        self.cell_offsets = np.searchsorted(keys[order], np.arange(self.n_rows * self.n_cols + 1))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _cell(self, values: np.ndarray, origin: float) -> np.ndarray:
+        return np.floor((values - origin) / self.cell_degrees).astype(np.int64)
+
+    def _candidates(self, lat: float, lon: float, max_miles: float) -> np.ndarray:
+        """Positions of merchants in every cell overlapping the query's bounding box."""
+        dlat = max_miles / MILES_PER_DEGREE
+        # Widest longitude span of the circle is at its poleward edge
+        dlon = max_miles / (MILES_PER_DEGREE * np.cos(np.radians(min(abs(lat) + dlat, 89.9))))
+        if lat + dlat < self.lat_origin or lon + dlon < self.lon_origin:
+            return np.zeros(0, dtype=np.int64)
+        row_lo, row_hi = np.clip(self._cell(np.array([lat - dlat, lat + dlat]), self.lat_origin), 0, self.n_rows - 1)
+        col_lo, col_hi = np.clip(self._cell(np.array([lon - dlon, lon + dlon]), self.lon_origin), 0, self.n_cols - 1)
+
+        # One contiguous key range per grid row of the box
+        starts = np.arange(row_lo, row_hi + 1) * self.n_cols + col_lo
+        begin = self.cell_offsets[starts]
+        end = self.cell_offsets[starts + (col_hi - col_lo) + 1]
+        return np.concatenate([self.positions[b:e] for b, e in zip(begin, end)])
+
+    def query_radius(self, lat: float, lon: float, max_miles: float,
+                     return_distance: bool = False):
+        """
+        Positions (ascending) of merchants within `max_miles` of (lat, lon); with
+        return_distance=True also their distances in miles, as a (positions, miles) tuple.
+        """
+        candidates = self._candidates(lat, lon, max_miles)
+        miles = self.distances(lat, lon, candidates)
+        keep = miles <= max_miles
+        positions, miles = candidates[keep], miles[keep]
+        order = np.argsort(positions)
+        if return_distance:
+            return positions[order], miles[order]
+        return positions[order]
+
+    def distances(self, lat: float, lon: float, positions: np.ndarray) -> np.ndarray:
+        """Haversine miles from (lat, lon) to the merchants at `positions`."""
+        return haversine_miles(lat, lon, self.latitudes[positions], self.longitudes[positions])
+
+    def nearby_table(self, centroids: Dict[str, Tuple[float, float]], max_miles: float) -> Dict[str, np.ndarray]:
+        """Precompute query_radius for every ZIP centroid: {zipcode: positions}."""
+        return {zipcode: self.query_radius(lat, lon, max_miles) for zipcode, (lat, lon) in centroids.items()}
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from typing import List
+
+from src.component.customer_sampler import draw_per_row, resolve_rng, row_cdf
+
+# ----------------------------------
+# 1) CENSUS COLUMN LAYOUT
+# ----------------------------------
+
+AGE_BRACKETS = ['15-24', '25-44', '45-64', '65+']
+AGE_SUFFIX = {
+    '15-24': '15 to 24 years',
+    '25-44': '25 to 44 years',
+    '45-64': '45 to 64 years',
+    '65+': '65 years and over',
+}
+
+MARITAL_LABELS = ['married', 'single']
+GENDER_LABELS = ['female', 'male']
+SIZE_LABELS = ['2', '3', '4', '5', '6', '7+']
+SIZE_COLUMNS = [
+    'Number 2-person families',
+    'Number 3-person families',
+    'Number 4-person families',
+    'Number 5-person families',
+    'Number 6-person families',
+    'Number 7-or-more person families',
+]
+EARNER_LABELS = ['0', '1', '2', '3+']
+EARNER_COLUMNS = ['Number No earners', 'Number 1 earner', 'Number 2 earners', 'Number 3 or more earners']
+
+FEMALE_COL = 'Number Families Female householder, no spouse present'
+MALE_COL = 'Number Families Male householder, no spouse present'
+MARRIED_COL = 'Number Families Married-couple families'
+
+
+# ----------------------------------
+# 2) HOUSEHOLD EXPANSION
+# ----------------------------------
+
+def expand_households(X: pd.DataFrame, rng=None) -> pd.DataFrame:
+    """
+    Vectorized equivalent of DataPreprocessor._process_zipcode over every ZIP row.
+
+    Households are laid out with `np.repeat` over the per-ZIP age-bracket counts, then
+    marital status, household size, gender, earners and income are drawn as arrays,
+    one draw per column for the whole table. Columns and per-ZIP distributions match
+    the row-by-row path, including its fallbacks for ZIPs with zero counts.
+    """
+    rng = resolve_rng(rng)
+    n_zip = len(X)
+
+    # 1) One (zip, age bracket) pair per household
+    counts = np.column_stack([
+        X[f'Number Household Income ({AGE_SUFFIX[b]})'].to_numpy(dtype=float) for b in AGE_BRACKETS
+    ])
+    counts = np.clip(np.trunc(np.nan_to_num(counts)), 0, None).astype(np.int64)
+    base_incomes = np.column_stack([
+        X[f'Household Income ({AGE_SUFFIX[b]})'].to_numpy(dtype=float) for b in AGE_BRACKETS
+    ])
+
+    pair = np.repeat(np.arange(n_zip * len(AGE_BRACKETS)), counts.ravel())
+    row_idx = pair // len(AGE_BRACKETS)
+    bracket_idx = pair % len(AGE_BRACKETS)
+    n = len(pair)
+
+    # 2) Per-ZIP cumulative tables (fallbacks mirror the _sample_* helpers)
+    female = X[FEMALE_COL].to_numpy(dtype=float)
+    male = X[MALE_COL].to_numpy(dtype=float)
+    marital_cdf = row_cdf(np.column_stack([X[MARRIED_COL].to_numpy(dtype=float), female + male]),
+                          fallback=np.array([1.0, 1.0]))
+    size_cdf = row_cdf(X[SIZE_COLUMNS].to_numpy(dtype=float),
+                       fallback=np.array([1.0, 0, 0, 0, 0, 0]))
+    gender_cdf = row_cdf(np.column_stack([female, male]), fallback=np.array([1.0, 1.0]))
+    earner_cdf = row_cdf(X[EARNER_COLUMNS].to_numpy(dtype=float),
+                         fallback=np.array([1.0, 0, 0, 0]))
+
+    # 3) Draw all households at once
+    marital = draw_per_row(marital_cdf, row_idx, rng)
+    size_code = draw_per_row(size_cdf, row_idx, rng)
+    gender = draw_per_row(gender_cdf, row_idx, rng)
+    earners = draw_per_row(earner_cdf, row_idx, rng)
+
+    # '7+' expands to a random size in [7, 9]
+    size_low = np.array([2, 3, 4, 5, 6, 7])
+    size_high = np.array([2, 3, 4, 5, 6, 9])
+    household_size = rng.integers(size_low[size_code], size_high[size_code], endpoint=True)
+
+    income = np.maximum(5000, base_incomes[row_idx, bracket_idx] * rng.normal(1, 0.2, n))
+
+    return pd.DataFrame({
+        'zipcode': X['Zipcode'].to_numpy()[row_idx],
+        'age_bracket': _labels(AGE_BRACKETS)[bracket_idx],
+        'marital_status': _labels(MARITAL_LABELS)[marital],
+        'household_size': household_size,
+        'gender': _labels(GENDER_LABELS)[gender],
+        'earners': _labels(EARNER_LABELS)[earners],
+        'income': income,
+    })
+
+
+def _labels(values: List[str]) -> np.ndarray:
+    return np.array(values, dtype=object)
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+def http2_available() -> bool:
+    """True if the optional `h2` package needed for httpx HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HostStats:
+    """Request counters for one upstream host."""
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_wait_ms': round(1000 * self.wait_seconds / self.requests, 2) if self.requests else 0.0,
+        }
+
+
+class HTTPClientPool:
+    """
+    Process-wide async HTTP client for outbound API calls.
+
+    - One httpx.AsyncClient: keep-alive connections (and TLS sessions) are reused by
+      every caller instead of one connection per request.
+    - HTTP/2 when the optional `h2` package is installed (falls back to HTTP/1.1).
+    - Global connection limits plus a per-host cap on concurrent requests, so one slow
+      upstream cannot take every connection.
+    - stats() reports in-flight / peak / per-host counters and open connections.
+
+    Open it once (e.g. in a FastAPI lifespan hook) and share it; AsyncLLMClient accepts
+    it as `pool=`. Use as `async with HTTPClientPool(...) as pool:` or open() / close().
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, per_host_limit: int = 16,
+                 timeout: float = 30.0, http2: bool = True):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.http2 = http2 and http2_available()
+        if http2 and not self.http2:
+            print("HTTP/2 requested but 'h2' is not installed (pip install httpx[http2]); using HTTP/1.1")
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, HostStats] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.opened_at: Optional[float] = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None
+
+    async def open(self) -> None:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_keepalive_connections,
+                                  keepalive_expiry=self.keepalive_expiry)
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits, http2=self.http2)
+            self.opened_at = time.monotonic()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host(self, url: str) -> HostStats:
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = HostStats(self.per_host_limit)
+        return self._hosts[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send one request through the shared client, within the host's concurrency cap."""
+        await self.open()
+        host = self._host(url)
+        host.waiting += 1
+        start = time.monotonic()
+        async with host.semaphore:
+            host.waiting -= 1
+            host.wait_seconds += time.monotonic() - start
+            host.in_flight += 1
+            host.requests += 1
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                return await self._client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                host.errors += 1
+                self.errors += 1
+                raise
+            finally:
+                host.in_flight -= 1
+                self.in_flight -= 1
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    def _open_connections(self) -> Optional[int]:
+        """Connections currently held by httpx's pool (None if not introspectable)."""
+        pool = getattr(getattr(self._client, '_transport', None), '_pool', None)
+        connections = getattr(pool, 'connections', None)
+        return len(connections) if connections is not None else None
+
+    def stats(self) -> Dict:
+        """Pool utilization: limits, in-flight / peak requests, open connections, per-host counters."""
+        open_connections = self._open_connections() if self._client is not None else 0
+        return {
+            'open': self.is_open,
+            'http2': self.http2,
+            'max_connections': self.max_connections,
+            'max_keepalive_connections': self.max_keepalive_connections,
+            'per_host_limit': self.per_host_limit,
+            'open_connections': open_connections,
+            'utilization': (round(open_connections / self.max_connections, 3)
+                            if open_connections is not None else None),
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'requests': self.requests,
+            'errors': self.errors,
+            'hosts': {host: stats.as_dict() for host, stats in self._hosts.items()},
+        }
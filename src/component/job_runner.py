@@ -0,0 +1,146 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def _json_default(value):
+    """json.dumps fallback for numpy scalars, timestamps and other non-JSON values."""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class JobJournal:
+    """
+    Durable, append-only JSONL journal of a long generation job, so an interrupted run
+    can be restarted without redoing (or paying again for) finished work.
+
+    A job is split into named units (a ZIP code, a customer id, a training cycle, ...).
+    Each line of the journal is one entry:
+     - {"meta": key, "value": ...}:      job-level state such as the work plan (last write wins),
+     - {"unit": u, "rows": [...]}:       results appended while unit `u` is in progress,
+     - {"unit": u, "done": true, ...}:   unit `u` is complete (extra keys are kept as its info).
+
+    Entries are flushed as they are written (and fsync'ed with `fsync=True`). On open
+    the existing journal is replayed; a last line torn by a crash is ignored.
+    Use as `with JobJournal(path) as journal:`.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self._meta: Dict[str, Any] = {}
+        self._rows: Dict[str, List[Dict]] = {}
+        self._done: Dict[str, Dict] = {}
+        self._file = None
+        self.rows_loaded = self._replay()
+
+    def _replay(self) -> int:
+        """Rebuild state from an existing journal; returns the number of rows recovered."""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, encoding='utf-8') as f:
+            lines = f.readlines()
+        rows = 0
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # an entry cut off by a crash mid-write
+            if 'meta' in entry:
+                self._meta[entry['meta']] = entry.get('value')
+                continue
+            unit = entry['unit']
+            if entry.get('done'):
+                self._done[unit] = {k: v for k, v in entry.items() if k not in ('unit', 'done')}
+            else:
+                self._rows.setdefault(unit, []).extend(entry.get('rows', []))
+                rows += len(entry.get('rows', []))
+        if lines and not lines[-1].endswith('\n'):
+            # Terminate the partial line so new entries start on a fresh one
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n')
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _append(self, entry: Dict) -> None:
+        if self._file is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry, default=_json_default) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    # ---- job-level state ----
+
+    def get_meta(self, key: str, default=None):
+        return self._meta.get(key, default)
+
+    def set_meta(self, key: str, value) -> None:
+        self._meta[key] = value
+        self._append({'meta': key, 'value': value})
+
+    # ---- units ----
+
+    def is_done(self, unit) -> bool:
+        return str(unit) in self._done
+
+    def info(self, unit) -> Optional[Dict]:
+        """Extra fields recorded when `unit` was marked done (None if it is not done)."""
+        return self._done.get(str(unit))
+
+    @property
+    def done_units(self) -> List[str]:
+        """Completed units, in completion order."""
+        return list(self._done)
+
+    def pending(self, units: Iterable) -> List:
+        """The subset of `units` that is not done yet (original order and values kept)."""
+        return [unit for unit in units if str(unit) not in self._done]
+
+    def append_rows(self, unit, rows: List[Dict]) -> None:
+        """Durably record partial results of a unit that is still in progress."""
+        if not rows:
+            return
+        unit = str(unit)
+        self._rows.setdefault(unit, []).extend(rows)
+        self._append({'unit': unit, 'rows': rows})
+
+    def mark_done(self, unit, rows: Optional[List[Dict]] = None, **info) -> None:
+        """Record the unit's last `rows` (if any) and mark it complete, with optional `info`."""
+        if rows:
+            self.append_rows(unit, rows)
+        unit = str(unit)
+        self._done[unit] = info
+        self._append({'unit': unit, 'done': True, **info})
+
+    def row_count(self, unit) -> int:
+        return len(self._rows.get(str(unit), []))
+
+    def rows(self, unit=None) -> List[Dict]:
+        """Rows recorded for `unit`, or for every unit (in the order units were first seen)."""
+        if unit is not None:
+            return list(self._rows.get(str(unit), []))
+        return [row for unit_rows in self._rows.values() for row in unit_rows]
+
+    def stats(self) -> Dict:
+        return {
+            'path': self.path,
+            'units_done': len(self._done),
+            'units_started': len(set(self._rows) | set(self._done)),
+            'rows': sum(len(unit_rows) for unit_rows in self._rows.values()),
+        }
@@ -0,0 +1,133 @@
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Validator: returns the (coerced) record, or None to reject it
+Validator = Callable[[Any], Optional[Dict]]
+
+
+# ----------------------------------
+# 1) INCREMENTAL OBJECT SCANNER
+# ----------------------------------
+
+class IncrementalJSONObjectParser:
+    """
+    Pull every complete JSON object out of LLM output that may be wrapped in prose or
+    code fences, cut off mid-array, or arrive in streamed chunks.
+
+    A single pass tracks string / escape state and the nesting of '{' '}' so each
+    object is decoded as soon as its closing brace arrives; feed() can be called
+    with successive chunks and returns the objects completed by that chunk.
+    Objects are reported innermost first (a nested object closes before its parent);
+    slices that are not valid JSON on their own are skipped.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._length = 0
+        self._starts = []  # buffer offsets of the currently open '{'
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume `chunk` and return the objects it completed."""
+        completed = []
+        base = self._length
+        self._buffer.append(chunk)
+        self._length += len(chunk)
+        text = None
+
+        for i, char in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = self._starts != []
+            elif char == '{':
+                self._starts.append(base + i)
+            elif char == '}' and self._starts:
+                start = self._starts.pop()
+                if text is None:
+                    text = ''.join(self._buffer)
+                    self._buffer = [text]
+                try:
+                    value = json.loads(text[start:base + i + 1])
+                except ValueError:
+                    continue
+                if isinstance(value, dict):
+                    completed.append(value)
+
+        if not self._starts and not self._in_string:
+            # Nothing open: earlier text can never be part of a future object
+            self._buffer = []
+            self._length = 0
+        return completed
+
+    @property
+    def pending(self) -> bool:
+        """True if an object was opened but has not been closed yet (truncated output)."""
+        return bool(self._starts)
+
+
+def iter_json_objects(text: str) -> Iterator[Dict]:
+    """Every complete JSON object in `text`, innermost first (see IncrementalJSONObjectParser)."""
+    yield from IncrementalJSONObjectParser().feed(text)
+
+
+# ----------------------------------
+# 2) COMPILED SCHEMA VALIDATION
+# ----------------------------------
+
+def compile_schema(schema: Dict) -> Validator:
+    """
+    Compile a record schema into one validating / coercing function.
+
+    `schema` maps each required key to:
+     - None: any value is accepted as-is,
+     - a callable: applied to the value, its result is stored; raising ValueError or
+       TypeError rejects the record (e.g. `float`, or a range-checking coercer),
+     - a dict: a nested schema for a required sub-object.
+    The compiled validator returns a new dict with the schema keys first (extra keys
+    are kept), or None when the value does not match.
+    """
+    fields = []
+    for key, rule in schema.items():
+        if isinstance(rule, dict):
+            fields.append((key, compile_schema(rule), True))
+        else:
+            fields.append((key, rule, False))
+
+    def validate(value: Any) -> Optional[Dict]:
+        if not isinstance(value, dict):
+            return None
+        record = dict(value)
+        for key, rule, nested in fields:
+            if key not in value:
+                return None
+            if rule is None:
+                continue
+            if nested:
+                sub = rule(value[key])
+                if sub is None:
+                    return None
+                record[key] = sub
+            else:
+                try:
+                    record[key] = rule(value[key])
+                except (TypeError, ValueError):
+                    return None
+        return record
+
+    return validate
+
+
+def salvage_records(text: str, validator: Validator) -> List[Dict]:
+    """
+    All records in `text` accepted by `validator`, in order of appearance. Works on
+    complete arrays, arrays wrapped in objects or prose, and truncated output alike:
+    every object that closed before the cut-off is kept.
+    """
+    return [record for record in map(validator, iter_json_objects(text)) if record is not None]
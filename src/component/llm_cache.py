@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Payload fields that do not change the model's answer and are left out of the cache key
+_IGNORED_FIELDS = {'stream', 'user'}
+
+
+def cache_key(endpoint: str, payload: Dict, occurrence: int = 0) -> str:
+    """
+    Content address of one LLM call: SHA-256 over the endpoint and the canonical JSON of
+    its payload (model, messages and sampling parameters), so identical prompts collide.
+    `occurrence` > 0 addresses a repeat of the same prompt (see PayloadOccurrences).
+    """
+    material = {
+        'endpoint': endpoint,
+        'payload': {k: v for k, v in payload.items() if k not in _IGNORED_FIELDS},
+    }
+    if occurrence:
+        material['occurrence'] = occurrence
+    canonical = json.dumps(material, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class PayloadOccurrences:
+    """
+    Counts how often each payload has been requested in the current run.
+
+    Sampled prompts (temperature > 0) repeat, e.g. the same customer at the same
+    merchants; keying the cache on the payload alone would answer every repeat with a
+    copy of the first response. next() returns 0 for the first request of a payload,
+    1 for the second, ..., to be passed as `occurrence` to ResponseCache.get / set:
+    every repeat gets its own entry, and a rerun replays them in the same order.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def next(self, endpoint: str, payload: Dict) -> int:
+        key = cache_key(endpoint, payload)
+        with self._lock:
+            occurrence = self._counts.get(key, 0)
+            self._counts[key] = occurrence + 1
+        return occurrence
+
+    def reset(self) -> None:
+        """Start a new run: the next request of every payload is occurrence 0 again."""
+        with self._lock:
+            self._counts.clear()
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of LLM responses, shared by all synthesizers.
+
+    - Backed by SQLite (one file, safe to share between threads and processes).
+    - Entries expire after `ttl_seconds` (None = never).
+    - When the stored bodies exceed `max_bytes`, least recently used entries are evicted.
+    - stats() reports hits, misses and hit rate so API cost savings can be measured.
+    """
+
+    def __init__(self, path: str = 'llm_cache.sqlite', ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' body TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' created REAL NOT NULL,'
+            ' accessed REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self._conn.commit()
+
+    def get(self, endpoint: str, payload: Dict, occurrence: int = 0) -> Optional[Dict]:
+        """Cached JSON response for this call, or None on a miss / expired entry."""
+        key = cache_key(endpoint, payload, occurrence)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT body, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, endpoint: str, payload: Dict, response: Dict, occurrence: int = 0) -> None:
+        """Store a successful JSON response, evicting old entries if over the size limit."""
+        key = cache_key(endpoint, payload, occurrence)
+        body = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, body, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                (key, body, len(body), now, now)
+            )
+            self.writes += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under `max_bytes`."""
+        if self.ttl_seconds is not None:
+            cursor = self._conn.execute('DELETE FROM responses WHERE created < ?',
+                                        (time.time() - self.ttl_seconds,))
+            self.evictions += cursor.rowcount
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall():
+            self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict:
+        """Hit-rate statistics plus current size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,165 @@
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from src.component.http_pool import HTTPClientPool
+from src.component.llm_cache import ResponseCache
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter: `rate` tokens are added per second, up to
+    `capacity` (the allowed burst). acquire() waits until enough tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds from a Retry-After header, if the server sent a numeric one."""
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncLLMClient:
+    """
+    Async client for OpenAI-style chat completion endpoints (DeepSeek, Groq, local mocks).
+
+    - One pooled httpx.AsyncClient (keep-alive connections are reused across calls),
+      or a shared HTTPClientPool passed as `pool` (owned and closed by the caller).
+    - At most `max_concurrency` requests in flight; starts are paced by a TokenBucket.
+    - Failed calls (timeouts, 429 / 5xx) are retried with jittered exponential backoff.
+    - With a ResponseCache, identical payloads are answered from disk without a request;
+      only bodies accepted by post_json's `validate` callable are stored.
+
+    Use as `async with AsyncLLMClient(...) as client: await client.post_json(payload)`.
+    """
+
+    def __init__(self, api_url: str, headers: Dict[str, str], requests_per_second: float = 2.0,
+                 max_concurrency: int = 8, max_retries: int = 4, timeout: float = 30.0,
+                 backoff_base: float = 1.0, backoff_cap: float = 30.0,
+                 cache: Optional[ResponseCache] = None, pool: Optional[HTTPClientPool] = None):
+        self.api_url = api_url
+        self.headers = headers
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.cache = cache
+        self.pool = pool
+
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self) -> None:
+        if self.pool is not None:
+            await self.pool.open()
+        elif self._client is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency,
+                                  max_keepalive_connections=self.max_concurrency)
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def post_json(self, payload: Dict, validate: Optional[Callable[[Dict], Any]] = None) -> Optional[Dict]:
+        """
+        POST `payload` and return the decoded JSON body, or None once retries are exhausted.
+
+        The body is cached only if `validate(body)` is truthy (or no validator is given), so
+        malformed or empty answers are never replayed from the cache.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.api_url, payload)
+            if cached is not None:
+                return cached
+        await self.open()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.rate_limiter.acquire()
+                self.requests += 1
+                delay = None
+                try:
+                    if self.pool is not None:
+                        response = await self.pool.post(self.api_url, headers=self.headers, json=payload,
+                                                        timeout=self.timeout)
+                    else:
+                        response = await self._client.post(self.api_url, headers=self.headers, json=payload)
+                    if response.status_code in RETRY_STATUS:
+                        delay = _retry_after(response)
+                        raise httpx.HTTPStatusError(f"Retryable status {response.status_code}",
+                                                    request=response.request, response=response)
+                    response.raise_for_status()
+                    body = response.json()
+                    if self.cache is not None and (validate is None or validate(body)):
+                        self.cache.set(self.api_url, payload, body)
+                    return body
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code in RETRY_STATUS
+                    if not retryable or attempt == self.max_retries:
+                        print(f"API Error: {str(e)}")
+                        break
+                    self.retries += 1
+                    await asyncio.sleep(delay if delay is not None
+                                        else backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+                except ValueError as e:
+                    # Body was not valid JSON
+                    print(f"API Error: {str(e)}")
+                    break
+        self.failures += 1
+        return None
+
+    def stats(self) -> Dict:
+        """Request / retry / failure counters (plus cache hit rate when caching)."""
+        stats = {'requests': self.requests, 'retries': self.retries, 'failures': self.failures}
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
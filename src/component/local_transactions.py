@@ -0,0 +1,111 @@
+import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.component.customer_sampler import resolve_rng
+from src.component.merchant_index import MerchantIndex
+
+# Amount range the LLM prompt asks for, and the spread of amounts around each
+# customer's typical ticket (log-normal sigma)
+AMOUNT_BOUNDS = (10.0, 200.0)
+AMOUNT_SIGMA = 0.5
+
+
+class LocalTransactionEngine:
+    """
+    Statistical stand-in for the LLM batch generator: produces transactions in the same
+    JSON schema as TransactionGenerator._batch_generate_transactions (and its async
+    variant), in microseconds per row. Output is reproducible for a seeded `rng` and a
+    fixed `date` (which otherwise defaults to today).
+
+    - Categories are drawn in proportion to `spending_categories` weights.
+    - Merchants come from a MerchantIndex over (Zipcode, mapped_category), falling back to
+      any merchant of the category and then to a placeholder "DC <Category> Service".
+    - Amounts are log-normal around the customer's typical ticket (monthly income spread
+      over the month's transactions), rounded to cents and clipped to AMOUNT_BOUNDS.
+    - Timestamps fall on `date` (default today) at a uniform time of day.
+
+    `merchants` is the preprocessed merchant table (Name, Category, Zipcode, mapped_category).
+    """
+
+    def __init__(self, merchants: pd.DataFrame, spending_categories: Dict[str, float],
+                 payment_types: Optional[Dict[str, float]] = None, rng=None):
+        self.rng = resolve_rng(rng)
+        self.spending_categories = dict(spending_categories)
+        self.category_labels = np.array(list(self.spending_categories), dtype=object)
+        self.category_weights = np.array(list(self.spending_categories.values()), dtype=float)
+
+        payment_types = payment_types or {'credit_card': 1.0}
+        self.payment_labels = np.array(list(payment_types), dtype=object)
+        self.payment_cdf = np.cumsum(np.array(list(payment_types.values()), dtype=float))
+        self.payment_cdf /= self.payment_cdf[-1]
+
+        self.merchant_names = merchants['Name'].astype(str).to_numpy(dtype=object)
+        self.merchant_categories = merchants['Category'].astype(str).to_numpy(dtype=object)
+        self.merchant_index = MerchantIndex(merchants['Zipcode'], merchants['mapped_category'],
+                                            category_labels=self.category_labels, rng=self.rng)
+
+    def _category_cdf(self, categories: Optional[Sequence[str]]) -> np.ndarray:
+        """Cumulative spending weights over all categories, restricted to `categories` if given."""
+        weights = self.category_weights.copy()
+        if categories is not None:
+            allowed = np.isin(self.category_labels, list(categories))
+            if allowed.any():
+                weights = np.where(allowed, weights, 0.0)
+                if weights.sum() == 0:
+                    weights = allowed.astype(float)
+        cdf = np.cumsum(weights)
+        return cdf / cdf[-1]
+
+    def generate(self, customer: Dict, num_tx: int, categories: Optional[Sequence[str]] = None,
+                 typical_count: Optional[int] = None, date: Optional[str] = None, rng=None) -> List[Dict]:
+        """
+        `num_tx` transactions for `customer` (needs 'zipcode' and 'income'), optionally
+        limited to `categories`. `typical_count` is the customer's monthly transaction
+        count used to size amounts (defaults to `num_tx`). `date` (YYYY-MM-DD) defaults to
+        today, so pass it explicitly for reproducible output.
+        """
+        rng = self.rng if rng is None else resolve_rng(rng)
+        if num_tx <= 0:
+            return []
+        zipcode = str(customer['zipcode'])
+        date = date or datetime.date.today().isoformat()
+
+        # 1) Categories by spending weight, then one merchant per row
+        cat_codes = np.searchsorted(self._category_cdf(categories), rng.random(num_tx), side='right')
+        cat_codes = np.minimum(cat_codes, len(self.category_labels) - 1)
+        zip_codes = np.full(num_tx, self.merchant_index.encode_zipcodes([zipcode])[0])
+        positions = self.merchant_index.select(zip_codes, cat_codes, rng)
+
+        # 2) Amounts around the typical ticket
+        monthly_income = float(customer.get('income', 0)) / 12.0
+        ticket = monthly_income / max(typical_count or num_tx, 1)
+        low, high = AMOUNT_BOUNDS
+        median = min(max(ticket, low), high)
+        amounts = np.clip(np.round(rng.lognormal(np.log(median), AMOUNT_SIGMA, num_tx), 2), low, high)
+
+        # 3) Time of day and payment type
+        seconds = rng.integers(0, 24 * 3600, num_tx)
+        payment_codes = np.searchsorted(self.payment_cdf, rng.random(num_tx), side='right')
+
+        transactions = []
+        for i in range(num_tx):
+            if positions[i] >= 0:
+                name, category = self.merchant_names[positions[i]], self.merchant_categories[positions[i]]
+            else:
+                category = self.category_labels[cat_codes[i]]
+                name = f"DC {category.replace('_', ' ').title()} Service"
+            s = int(seconds[i])
+            transactions.append({
+                "amount": float(amounts[i]),
+                "timestamp": f"{date}T{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}Z",
+                "merchant_details": {
+                    "name": name,
+                    "category": category,
+                    "zipcode": zipcode
+                },
+                "payment_type": self.payment_labels[min(payment_codes[i], len(self.payment_labels) - 1)]
+            })
+        return transactions
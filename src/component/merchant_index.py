@@ -0,0 +1,111 @@
+import numpy as np
+from typing import Optional, Sequence
+
+from src.component.customer_sampler import resolve_rng
+
+
+class MerchantIndex:
+    """
+    Compact, array-backed index of merchants by (zipcode, category).
+
+    ZIP codes and categories are encoded as integer codes. Merchant row positions are
+    sorted once by key, and CSR-style offset arrays mark where each (zip, category)
+    group and each category-wide fallback group starts, so picking a merchant is
+    a single integer draw within a slice.
+
+    Positions returned by select() index the merchant arrays the index was built from
+    (use `.iloc` on a DataFrame); -1 means no merchant of that category exists at all.
+    """
+
+    def __init__(self, zipcodes: Sequence, categories: Sequence,
+                 category_labels: Optional[Sequence[str]] = None, rng=None):
+        zipcodes = np.asarray(zipcodes).astype(str)
+        categories = np.asarray(categories, dtype=object)
+
+        self.zip_labels, zip_codes = np.unique(zipcodes, return_inverse=True)
+        if category_labels is None:
+            category_labels = np.unique(categories.astype(str))
+        self.category_labels = np.asarray(category_labels, dtype=object)
+        self._category_lookup = {label: code for code, label in enumerate(self.category_labels)}
+        self._zip_lookup = {label: code for code, label in enumerate(self.zip_labels)}
+
+        cat_codes = self.encode_categories(categories)
+        known = np.flatnonzero(cat_codes >= 0)
+        n_cat = len(self.category_labels)
+        self.rng = resolve_rng(rng)
+
+        # (zip, category) groups: one flat key per pair, merchants sorted by key
+        keys = zip_codes[known] * n_cat + cat_codes[known]
+        order = np.argsort(keys, kind='stable')
+        self.group_positions = known[order]
+        self.group_offsets = np.searchsorted(keys[order], np.arange(len(self.zip_labels) * n_cat + 1))
+
+        # Category-wide fallback groups
+        order = np.argsort(cat_codes[known], kind='stable')
+        self.category_positions = known[order]
+        self.category_offsets = np.searchsorted(cat_codes[known][order], np.arange(n_cat + 1))
+
+    def __len__(self) -> int:
+        return len(self.group_positions)
+
+    def encode_zipcodes(self, zipcodes: Sequence) -> np.ndarray:
+        """Integer codes for ZIP codes (-1 for ZIPs with no merchants)."""
+        zipcodes = np.asarray(zipcodes).astype(str)
+        labels, inverse = np.unique(zipcodes, return_inverse=True)
+        codes = np.array([self._zip_lookup.get(label, -1) for label in labels], dtype=np.int64)
+        return codes[inverse]
+
+    def encode_categories(self, categories: Sequence) -> np.ndarray:
+        """Integer codes for category labels (-1 for unknown categories)."""
+        categories = np.asarray(categories, dtype=object)
+        return np.array([self._category_lookup.get(c, -1) for c in categories], dtype=np.int64)
+
+    def select(self, zip_codes: np.ndarray, cat_codes: np.ndarray, rng=None) -> np.ndarray:
+        """
+        Draw one merchant position per (zip code, category code) pair, uniformly within
+        the matching group, falling back to any merchant of the category. Returns -1
+        where the category has no merchants (or the category code is -1).
+        """
+        rng = self.rng if rng is None else resolve_rng(rng)
+        zip_codes = np.asarray(zip_codes, dtype=np.int64)
+        cat_codes = np.asarray(cat_codes, dtype=np.int64)
+        n_cat = len(self.category_labels)
+        positions = np.full(len(cat_codes), -1, dtype=np.int64)
+
+        valid_cat = cat_codes >= 0
+        safe_cat = np.where(valid_cat, cat_codes, 0)
+        keys = np.where((zip_codes >= 0) & valid_cat, zip_codes * n_cat + safe_cat, -1)
+        safe_keys = np.maximum(keys, 0)
+        start = self.group_offsets[safe_keys]
+        count = np.where(keys >= 0, self.group_offsets[safe_keys + 1] - start, 0)
+
+        # Rows whose (zip, category) group is empty fall back to the whole category
+        use_fallback = count == 0
+        fb_start = self.category_offsets[safe_cat]
+        fb_count = np.where(valid_cat, self.category_offsets[safe_cat + 1] - fb_start, 0)
+        start = np.where(use_fallback, fb_start, start)
+        count = np.where(use_fallback, fb_count, count)
+
+        found = count > 0
+        draws = start[found] + (rng.random(int(found.sum())) * count[found]).astype(np.int64)
+        # Both position arrays hold the same merchants, so `draws` is in range for either
+        positions[found] = np.where(use_fallback[found],
+                                    self.category_positions[draws], self.group_positions[draws])
+        return positions
+
+    def select_one(self, zipcode, category: str, rng=None) -> int:
+        """Scalar select(): merchant position for one (zipcode, category), or -1."""
+        rng = self.rng if rng is None else resolve_rng(rng)
+        zip_code = self._zip_lookup.get(str(zipcode), -1)
+        cat_code = self._category_lookup.get(category, -1)
+        if cat_code < 0:
+            return -1
+        if zip_code >= 0:
+            key = zip_code * len(self.category_labels) + cat_code
+            start, stop = self.group_offsets[key], self.group_offsets[key + 1]
+            if stop > start:
+                return int(self.group_positions[rng.integers(start, stop)])
+        start, stop = self.category_offsets[cat_code], self.category_offsets[cat_code + 1]
+        if stop > start:
+            return int(self.category_positions[rng.integers(start, stop)])
+        return -1
@@ -0,0 +1,258 @@
+import itertools
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.component.customer_sampler import BatchCustomerSampler
+from src.component.postprocess import current_epoch
+from src.component.sinks import ChunkStats, chunk_sizes, open_sink, write_chunks
+
+# Column dtypes of BatchCustomerSampler.sample_arrays, used to size shared-memory blocks
+CUSTOMER_DTYPES = {
+    'age': np.int64,
+    'family_type': np.int8,
+    'earners': np.int64,
+    'household_size': np.int64,
+    'income': np.float64,
+}
+
+
+def default_workers() -> int:
+    """Number of worker processes to use when none is given."""
+    return max(1, os.cpu_count() or 1)
+
+
+def split_rows(n: int, n_workers: int) -> List[tuple]:
+    """Split `n` rows into `n_workers` contiguous (start, stop) ranges."""
+    bounds = [n * i // n_workers for i in range(n_workers + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def spawn_seeds(seed, n_workers: int) -> List[np.random.SeedSequence]:
+    """One independent SeedSequence child per worker (or chunk) spawned from `seed`."""
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return root.spawn(n_workers)
+
+
+# ----------------------------------
+# 1) ABM CUSTOMERS VIA SHARED MEMORY
+# ----------------------------------
+
+def _abm_worker(global_model: Dict, start: int, stop: int, seed_seq: np.random.SeedSequence,
+                shm_names: Dict[str, str], n: int, chunk_size: int) -> int:
+    """Sample rows [start, stop) and write them in place into the parent's shared-memory columns."""
+    sampler = BatchCustomerSampler(global_model)
+    rng = np.random.default_rng(seed_seq)
+
+    blocks = {col: shared_memory.SharedMemory(name=name) for col, name in shm_names.items()}
+    try:
+        columns = {col: np.ndarray((n,), dtype=CUSTOMER_DTYPES[col], buffer=blocks[col].buf)
+                   for col in blocks}
+        offset = start
+        for size in chunk_sizes(stop - start, chunk_size):
+            arrays = sampler.sample_arrays(size, rng)
+            for col, values in arrays.items():
+                columns[col][offset:offset + size] = values
+            offset += size
+        del columns
+    finally:
+        for block in blocks.values():
+            block.close()
+    return stop - start
+
+
+def generate_customers_parallel(global_model: Dict, n: int, n_workers: Optional[int] = None,
+                                seed=None, chunk_size: int = 1_000_000) -> pd.DataFrame:
+    """
+    Generate `n` ABM customers across a process pool.
+
+    Each worker gets its own spawned SeedSequence child and writes its contiguous slice
+    directly into shared-memory column buffers, so nothing large is pickled back to the
+    parent and the result is bit-identical for a given (seed, n_workers, chunk_size).
+    """
+    n_workers = n_workers or default_workers()
+    sampler = BatchCustomerSampler(global_model)
+
+    blocks = {col: shared_memory.SharedMemory(create=True, size=max(1, n * np.dtype(dtype).itemsize))
+              for col, dtype in CUSTOMER_DTYPES.items()}
+    try:
+        shm_names = {col: block.name for col, block in blocks.items()}
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [
+                pool.submit(_abm_worker, global_model, start, stop, seed_seq, shm_names, n, chunk_size)
+                for (start, stop), seed_seq in zip(split_rows(n, n_workers), spawn_seeds(seed, n_workers))
+            ]
+            for future in futures:
+                future.result()
+
+        # Copy out of shared memory before the blocks are released
+        arrays = {col: np.ndarray((n,), dtype=dtype, buffer=blocks[col].buf).copy()
+                  for col, dtype in CUSTOMER_DTYPES.items()}
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+    return sampler.to_frame(arrays)
+
+
+# ----------------------------------
+# 2) CTGAN PROFILES VIA ORDERED CHUNK FILES
+# ----------------------------------
+
+_worker_model = None
+
+
+def _init_income_worker(model_path: str, torch_threads: int) -> None:
+    """Load the trained AdvancedIncomeModel once per worker process."""
+    global _worker_model
+    import torch
+    from src.component.customer import AdvancedIncomeModel
+
+    torch.set_num_threads(torch_threads)
+    _worker_model = AdvancedIncomeModel.load(model_path)
+
+
+def seed_synthesizer(synthesizer, seed_seq: np.random.SeedSequence) -> np.random.Generator:
+    """
+    Seed an SDV CTGANSynthesizer for one chunk and return a Generator for the draws after it.
+
+    Global torch / numpy seeds do not reach CTGAN: its sampling swaps in the model's own
+    stored random state (fixed by SDV on the first sample after loading), so the seed
+    has to be set on the synthesizer itself.
+    """
+    synthesizer_seq, rng_seq = seed_seq.spawn(2)
+    set_random_state = getattr(synthesizer, 'set_random_state', None) or synthesizer._set_random_state
+    set_random_state(int(synthesizer_seq.generate_state(1)[0]))
+    return np.random.default_rng(rng_seq)
+
+
+def _income_worker(num_rows: int, seed_seq: np.random.SeedSequence, chunk_path: str) -> Optional[str]:
+    """Sample `num_rows` profiles and write them to `chunk_path` (returned for ordered merging)."""
+    if num_rows <= 0:
+        return None
+    rng = seed_synthesizer(_worker_model.synthesizer, seed_seq)
+    with open_sink(chunk_path) as sink:
+        sink.write(_worker_model.generate(num_rows, rng=rng))
+    return chunk_path
+
+
+def _read_chunk(path: str) -> pd.DataFrame:
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return pd.read_parquet(path)
+
+
+def _chunk_extension() -> str:
+    """Prefer Parquet for intermediate chunk files, fall back to CSV without pyarrow."""
+    try:
+        import pyarrow  # noqa: F401
+        return '.parquet'
+    except ImportError:
+        return '.csv'
+
+
+def generate_income_parallel(model_path: str, num_samples: int, n_workers: Optional[int] = None,
+                             seed=None, output_path: Optional[str] = None, torch_threads: int = 1):
+    """
+    Sample `num_samples` profiles from a saved AdvancedIncomeModel across a process pool.
+
+    Every worker loads the model once, seeds the synthesizer (and the post-processing
+    draws) from its own SeedSequence child and writes its share to an ordered chunk file.
+    Chunks are then merged in worker order, either into `output_path` (streamed, returns
+    rows written) or into one returned DataFrame.
+
+    Rows are split evenly across workers, so the output is determined by
+    (seed, num_samples, n_workers); changing n_workers changes the rows.
+    """
+    n_workers = n_workers or default_workers()
+    tmp_dir = tempfile.mkdtemp(prefix='income_chunks_')
+    ext = _chunk_extension()
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_income_worker,
+                                 initargs=(model_path, torch_threads)) as pool:
+            futures = [
+                pool.submit(_income_worker, stop - start, seed_seq,
+                            os.path.join(tmp_dir, f'chunk_{i:05d}{ext}'))
+                for i, ((start, stop), seed_seq) in enumerate(
+                    zip(split_rows(num_samples, n_workers), spawn_seeds(seed, n_workers)))
+            ]
+            chunk_paths = [path for path in (future.result() for future in futures) if path is not None]
+
+        chunks = (_read_chunk(path) for path in chunk_paths)
+        if output_path is None and not chunk_paths:
+            return pd.DataFrame()
+        if output_path is not None:
+            with open_sink(output_path) as sink:
+                return write_chunks(chunks, sink)
+        return pd.concat(list(chunks), ignore_index=True)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# ----------------------------------
+# 3) CTGAN TRANSACTIONS VIA A BOUNDED WINDOW OF CHUNKS
+# ----------------------------------
+
+_worker_transactions = None
+
+
+def _init_transaction_worker(model_path: str, torch_threads: int) -> None:
+    """Load the trained TransactionCTGAN once per worker process."""
+    global _worker_transactions
+    import torch
+    from src.component.transaction import TransactionCTGAN
+
+    torch.set_num_threads(torch_threads)
+    _worker_transactions = TransactionCTGAN.load(model_path)
+
+
+def _transaction_worker(num_rows: int, seed_seq: np.random.SeedSequence, now: int) -> pd.DataFrame:
+    """Sample one chunk of `num_rows` transactions (CTGAN and timestamps seeded from `seed_seq`)."""
+    rng = seed_synthesizer(_worker_transactions.synthesizer, seed_seq)
+    return _worker_transactions.generate(num_rows, rng=rng, now=now)
+
+
+def generate_transactions_parallel(model_path: str, num_samples: int, output_path: str,
+                                   n_workers: Optional[int] = None, chunk_size: int = 50_000,
+                                   seed=None, torch_threads: int = 1,
+                                   on_chunk: Optional[Callable[[ChunkStats], None]] = None,
+                                   now: Optional[int] = None) -> int:
+    """
+    Sample `num_samples` transactions from a saved TransactionCTGAN across a process pool
+    and stream them to `output_path` (format inferred from the extension).
+
+    Work is split into fixed `chunk_size` batches, each seeded from its own SeedSequence
+    child. Timestamps are drawn back from `now` (epoch seconds; default: the current time,
+    read once for the whole run), so output is determined by (seed, num_samples,
+    chunk_size, now) and does not depend on n_workers. At most two chunks per worker are in flight and finished chunks are
+    written in order, which bounds memory regardless of `num_samples`. Returns the number
+    of rows written.
+    """
+    n_workers = n_workers or default_workers()
+    sizes = list(chunk_sizes(num_samples, chunk_size))
+    seeds = spawn_seeds(seed, len(sizes))
+    now = current_epoch() if now is None else now
+
+    def ordered_chunks(pool: ProcessPoolExecutor) -> Iterator[pd.DataFrame]:
+        window = deque()
+        jobs = iter(zip(sizes, seeds))
+        for size, seed_seq in itertools.islice(jobs, 2 * n_workers):
+            window.append(pool.submit(_transaction_worker, size, seed_seq, now))
+        while window:
+            chunk = window.popleft().result()
+            for size, seed_seq in itertools.islice(jobs, 1):
+                window.append(pool.submit(_transaction_worker, size, seed_seq, now))
+            yield chunk
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_transaction_worker,
+                             initargs=(model_path, torch_threads)) as pool:
+        with open_sink(output_path) as sink:
+            return write_chunks(ordered_chunks(pool), sink, on_chunk=on_chunk)
@@ -0,0 +1,153 @@
+import datetime
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.component.customer_sampler import resolve_rng
+
+# Lightweight (numpy / pandas only) post-processing shared by the CTGAN wrappers in
+# customer.py / transaction.py and the inference-only runtime in ctgan_runtime.py.
+
+# ----------------------------------
+# 1) INCOME PROFILES (AdvancedIncomeModel)
+# ----------------------------------
+
+INCOME_PROFILE_COLUMNS = ['zipcode', 'age', 'marital_status',
+                          'household_size', 'income', 'gender', 'earners']
+
+# Inclusive age range drawn for open-ended brackets such as '65+'
+OPEN_AGE_BOUNDS = (65, 84)
+# Inclusive earner count range drawn for '3+'
+OPEN_EARNER_BOUNDS = (3, 5)
+
+
+def age_bracket_bounds(bracket, fallback: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Inclusive (low, high) age range for an age bracket label: 'a-b' -> (a, b) and
+    '65+' -> OPEN_AGE_BOUNDS. Other labels map to (fallback, fallback), or to
+    OPEN_AGE_BOUNDS when no fallback is given.
+    """
+    label = str(bracket)
+    if '-' in label:
+        low, high = label.split('-')
+        return int(low), int(high)
+    if fallback is None or label.endswith('+'):
+        return OPEN_AGE_BOUNDS
+    return fallback, fallback
+
+
+def earner_bounds(earners, fallback: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Inclusive (low, high) earner count for an earners label: '3+' -> OPEN_EARNER_BOUNDS,
+    'k' -> (k, k). Non-numeric labels map to (fallback, fallback), or raise without one.
+    """
+    if earners == '3+':
+        return OPEN_EARNER_BOUNDS
+    try:
+        count = int(earners)
+    except (TypeError, ValueError):
+        if fallback is None:
+            raise
+        count = fallback
+    return count, count
+
+
+def draw_from_labels(values, bounds: Callable[[object], Tuple[int, int]], rng=None) -> np.ndarray:
+    """
+    Expand bracket labels into integers: `bounds` is evaluated once per distinct label
+    to build low / high arrays indexed by categorical code, then every row gets one
+    vectorized uniform integer draw within its label's inclusive range.
+    """
+    rng = resolve_rng(rng)
+    codes, labels = pd.factorize(pd.Series(values), use_na_sentinel=False)
+    low = np.empty(len(labels), dtype=np.int64)
+    high = np.empty(len(labels), dtype=np.int64)
+    for code, label in enumerate(labels):
+        low[code], high[code] = bounds(label)
+    return rng.integers(low[codes], high[codes], endpoint=True)
+
+
+def finalize_income_profiles(synthetic: pd.DataFrame, rng=None, age_fallback: Optional[int] = None,
+                             earner_fallback: Optional[int] = None) -> pd.DataFrame:
+    """
+    Turn sampled household rows into profiles: expand 'age_bracket' into an
+    integer 'age', '3+' earners into 3-5, and keep INCOME_PROFILE_COLUMNS.
+    The fallbacks replace labels that cannot be parsed (see age_bracket_bounds / earner_bounds).
+    """
+    rng = resolve_rng(rng)
+    if 'age_bracket' in synthetic.columns:
+        synthetic['age'] = draw_from_labels(
+            synthetic['age_bracket'], lambda b: age_bracket_bounds(b, age_fallback), rng)
+
+    if 'earners' in synthetic.columns:
+        synthetic['earners'] = draw_from_labels(
+            synthetic['earners'], lambda e: earner_bounds(e, earner_fallback), rng)
+
+    # Return final columns
+    return synthetic[INCOME_PROFILE_COLUMNS]
+
+
+# ----------------------------------
+# 2) TRANSACTION TIMESTAMPS (TransactionCTGAN)
+# ----------------------------------
+
+def current_epoch() -> int:
+    """Current local wall-clock time as epoch seconds (the default `now` of the timestamp helpers)."""
+    return int(np.datetime64(datetime.datetime.now(), 's').astype(np.int64))
+
+
+def random_epochs_within_30_days(n: int, rng=None, now: Optional[int] = None) -> np.ndarray:
+    """
+    Vectorized random_timestamp_within_30_days: `n` int64 epoch seconds, each a random
+    number of hours (0..720) plus minutes and seconds (0..59) before `now`.
+    `now` defaults to the current local wall-clock time, like the scalar version.
+    """
+    rng = resolve_rng(rng)
+    if now is None:
+        now = current_epoch()
+    offsets = (rng.integers(0, 30 * 24, n, endpoint=True) * 3600
+               + rng.integers(0, 59, n, endpoint=True) * 60
+               + rng.integers(0, 59, n, endpoint=True))
+    return np.int64(now) - offsets.astype(np.int64)
+
+
+def random_timestamps_within_30_days(n: int, rng=None, now: Optional[int] = None) -> np.ndarray:
+    """`n` random timestamps within the 30 days before `now` as a datetime64[s] array."""
+    return random_epochs_within_30_days(n, rng, now).astype('datetime64[s]')
+
+
+# ----------------------------------
+# 3) CONDITIONAL SAMPLING (AdvancedIncomeModel / IncomeModelRuntime)
+# ----------------------------------
+
+class SamplingError(Exception):
+    """The requested rows could not be sampled for a condition (e.g. a ZIP code)."""
+
+
+def sample_matching(sample_batch: Callable[[int], pd.DataFrame], num_rows: int, column: str, value,
+                    max_rounds: int = 20) -> pd.DataFrame:
+    """
+    Collect exactly `num_rows` rows whose `column` equals `value` from `sample_batch(n)`,
+    a conditional sampler that makes the value likely but not guaranteed. The rare misses
+    are topped up in later rounds sized by the acceptance rate observed so far; raises
+    SamplingError if `max_rounds` rounds are not enough.
+    """
+    collected = []
+    remaining = num_rows
+    requested = accepted = 0
+    for _ in range(max_rounds):
+        rate = accepted / requested if requested else 1.0
+        batch_size = max(remaining, int(np.ceil(remaining / max(rate, 0.05))))
+        batch = sample_batch(batch_size)
+        requested += batch_size
+
+        matched = batch[batch[column] == value].head(remaining)
+        accepted += len(matched)
+        collected.append(matched)
+        remaining -= len(matched)
+        if remaining <= 0:
+            return pd.concat(collected, ignore_index=True)
+
+    raise SamplingError(f"Could only sample {num_rows - remaining} of {num_rows} rows "
+                f"for {column}={value} in {max_rounds} rounds.")
@@ -0,0 +1,191 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class _ColumnBuffer:
+    """Pre-sampled rows for one key, stored column-wise; rows before `start` are already served."""
+
+    def __init__(self):
+        self.columns: Dict[str, np.ndarray] = {}
+        self.order = []
+        self.start = 0
+
+    @property
+    def available(self) -> int:
+        if not self.order:
+            return 0
+        return len(self.columns[self.order[0]]) - self.start
+
+    def append(self, frame: pd.DataFrame) -> None:
+        """Add freshly sampled rows, compacting away the served prefix."""
+        if not self.order:
+            self.order = list(frame.columns)
+            self.columns = {col: frame[col].to_numpy() for col in self.order}
+        else:
+            self.columns = {
+                col: np.concatenate([self.columns[col][self.start:], frame[col].to_numpy()])
+                for col in self.order
+            }
+        self.start = 0
+
+    def take(self, n: int) -> pd.DataFrame:
+        """Slice the next `n` rows (caller checks availability)."""
+        stop = self.start + n
+        frame = pd.DataFrame({col: self.columns[col][self.start:stop] for col in self.order},
+                             columns=self.order)
+        self.start = stop
+        return frame
+
+
+class ProfilePool:
+    """
+    Warm in-memory pool of pre-sampled profiles, one columnar buffer per key (e.g. ZIP code,
+    or None for unconditioned profiles).
+
+    - take(key, n) slices n rows from the pool, or returns None on a miss.
+    - sample(key, n) serves a miss with fresh rows, then schedules a refill for `key`.
+    - When a buffer drops below `low_watermark` rows, a background thread calls
+      `sample_fn(key, n)` to top it back up to `capacity` rows.
+    - Calls of `sample_fn` are serialized (the model and its random state are not
+      thread-safe); waiting misses go ahead of queued refills.
+    - stats() reports hit/miss counts, latency of pool slices and refill work.
+    """
+
+    def __init__(self, sample_fn: Callable[[Hashable, int], pd.DataFrame],
+                 capacity: int = 5000, low_watermark: int = 1000, max_workers: int = 2):
+        if low_watermark > capacity:
+            raise ValueError("low_watermark must not exceed capacity")
+        self.sample_fn = sample_fn
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+
+        self._buffers: Dict[Hashable, _ColumnBuffer] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._sample_cond = threading.Condition()
+        self._sampling = False
+        self._waiting_misses = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='profile-pool')
+
+        self.hits = 0
+        self.misses = 0
+        self.rows_served = 0
+        self.take_seconds = 0.0
+        self.refills = 0
+        self.refill_rows = 0
+        self.refill_seconds = 0.0
+        self.refill_errors = 0
+
+    def take(self, key: Hashable, n: int) -> Optional[pd.DataFrame]:
+        """Return `n` pre-sampled rows for `key`, or None if the pool cannot serve them yet."""
+        start = time.perf_counter()
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None or buffer.available < n:
+                self.misses += 1
+                frame = None
+            else:
+                frame = buffer.take(n)
+                self.hits += 1
+                self.rows_served += n
+                self.take_seconds += time.perf_counter() - start
+            # A miss is refilled by sample() once the caller has been served
+            needs_refill = frame is not None and buffer.available < max(self.low_watermark, n)
+
+        if needs_refill:
+            self.request_refill(key)
+        return frame
+
+    def sample(self, key: Hashable, n: int) -> pd.DataFrame:
+        """Sample `n` fresh rows for `key` ahead of queued refills, then schedule a refill."""
+        with self._sample_cond:
+            self._waiting_misses += 1
+            self._sample_cond.wait_for(lambda: not self._sampling)
+            self._waiting_misses -= 1
+            self._sampling = True
+        try:
+            frame = self.sample_fn(key, n)
+        finally:
+            self._release_sampler()
+        self.request_refill(key)
+        return frame
+
+    def _sample_for_refill(self, key: Hashable, n: int) -> pd.DataFrame:
+        """Sample `n` rows for a refill once no miss is running or waiting."""
+        with self._sample_cond:
+            self._sample_cond.wait_for(lambda: not self._sampling and not self._waiting_misses)
+            self._sampling = True
+        try:
+            return self.sample_fn(key, n)
+        finally:
+            self._release_sampler()
+
+    def _release_sampler(self) -> None:
+        with self._sample_cond:
+            self._sampling = False
+            self._sample_cond.notify_all()
+
+    def request_refill(self, key: Hashable) -> None:
+        """Schedule a background top-up for `key` unless one is already pending."""
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._executor.submit(self._refill, key)
+
+    def prefill(self, keys: Iterable[Hashable]) -> None:
+        """Schedule initial fills for `keys` (returns immediately)."""
+        for key in keys:
+            self.request_refill(key)
+
+    def _refill(self, key: Hashable) -> None:
+        try:
+            with self._lock:
+                buffer = self._buffers.get(key)
+                missing = self.capacity - (buffer.available if buffer else 0)
+            if missing <= 0:
+                return
+
+            start = time.perf_counter()
+            frame = self._sample_for_refill(key, missing)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._buffers.setdefault(key, _ColumnBuffer()).append(frame)
+                self.refills += 1
+                self.refill_rows += len(frame)
+                self.refill_seconds += elapsed
+        except Exception as e:
+            with self._lock:
+                self.refill_errors += 1
+            print(f"Profile pool refill failed for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self) -> Dict:
+        """Hit/miss and refill metrics for monitoring endpoints."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'rows_served': self.rows_served,
+                'avg_take_us': 1e6 * self.take_seconds / self.hits if self.hits else 0.0,
+                'refills': self.refills,
+                'refill_rows': self.refill_rows,
+                'refill_seconds': round(self.refill_seconds, 3),
+                'refill_errors': self.refill_errors,
+                'pending_refills': len(self._pending),
+                'available': {str(key): buffer.available for key, buffer in self._buffers.items()},
+            }
+
+    def shutdown(self) -> None:
+        """Stop background refills (pending ones are cancelled)."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
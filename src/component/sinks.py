@@ -0,0 +1,215 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional
+
+import pandas as pd
+
+# ----------------------------------
+# 1) CHUNK STATS / TIMING
+# ----------------------------------
+
+
+@dataclass
+class ChunkStats:
+    """Timing report for one generated (and optionally written) chunk."""
+    chunk_index: int
+    rows: int
+    total_rows: int
+    elapsed_sec: float
+    total_elapsed_sec: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed_sec if self.elapsed_sec > 0 else float('inf')
+
+
+def print_chunk_stats(stats: ChunkStats) -> None:
+    """Default progress callback: one line per chunk."""
+    print(f"Chunk {stats.chunk_index}: {stats.rows} rows in {stats.elapsed_sec:.2f}s "
+          f"({stats.rows_per_sec:,.0f} rows/s, {stats.total_rows} total)")
+
+
+def chunk_sizes(n: int, chunk_size: int) -> Iterator[int]:
+    """Split `n` rows into fixed-size chunks (the last one may be smaller)."""
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    for start in range(0, n, chunk_size):
+        yield min(chunk_size, n - start)
+
+
+def timed_chunks(chunks: Iterable[pd.DataFrame],
+                 on_chunk: Optional[Callable[[ChunkStats], None]] = None) -> Iterator[pd.DataFrame]:
+    """Re-yield `chunks`, reporting how long each one took to produce to `on_chunk`."""
+    start = time.perf_counter()
+    total = 0
+    iterator = iter(chunks)
+    index = 0
+    while True:
+        t0 = time.perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        t1 = time.perf_counter()
+        total += len(chunk)
+        if on_chunk is not None:
+            on_chunk(ChunkStats(index, len(chunk), total, t1 - t0, t1 - start))
+        index += 1
+        yield chunk
+
+
+# ----------------------------------
+# 2) SINKS
+# ----------------------------------
+
+class ChunkSink(ABC):
+    """Base class for sinks that append DataFrame chunks to one output file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_written = 0
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        self._write(chunk)
+        self.rows_written += len(chunk)
+
+    @abstractmethod
+    def _write(self, chunk: pd.DataFrame) -> None:
+        """Append one chunk to the output."""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CSVSink(ChunkSink):
+    """Append chunks to a CSV file; the header is written with the first chunk only."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, 'w', newline='')
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        chunk.to_csv(self._file, header=self.rows_written == 0, index=False)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class DataFrameSink(ChunkSink):
+    """Collect chunks in memory; frame() concatenates everything written so far."""
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path)
+        self._chunks = []
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        self._chunks.append(chunk)
+
+    def frame(self) -> pd.DataFrame:
+        if not self._chunks:
+            return pd.DataFrame()
+        return pd.concat(self._chunks, ignore_index=True)
+
+
+class _ArrowSink(ChunkSink):
+    """Shared logic for pyarrow-backed sinks: the first chunk fixes the schema."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError(f"{type(self).__name__} requires pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self._schema = None
+        self._writer = None
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        table = self._pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = self._open_writer(self._schema)
+        self._writer.write_table(table)
+
+    @abstractmethod
+    def _open_writer(self, schema):
+        """Open the pyarrow writer for `schema` at self.path."""
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class ParquetSink(_ArrowSink):
+    """Append chunks as row groups of a single Parquet file."""
+
+    def __init__(self, path: str, compression: str = 'snappy'):
+        super().__init__(path)
+        self.compression = compression
+
+    def _open_writer(self, schema):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.path, schema, compression=self.compression)
+
+
+class ArrowIPCSink(_ArrowSink):
+    """Append chunks as record batches of an Arrow IPC (Feather v2) file."""
+
+    def _open_writer(self, schema):
+        import pyarrow.ipc as ipc
+        return ipc.new_file(self.path, schema)
+
+
+SINK_FORMATS = {
+    'csv': CSVSink,
+    'parquet': ParquetSink,
+    'arrow': ArrowIPCSink,
+}
+
+_EXTENSIONS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+}
+
+
+def open_sink(path: str, fmt: Optional[str] = None) -> ChunkSink:
+    """Open a sink for `path`; the format is inferred from the extension unless given."""
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in _EXTENSIONS:
+            raise ValueError(f"Cannot infer sink format from '{path}'. Use one of: {list(SINK_FORMATS)}")
+        fmt = _EXTENSIONS[ext]
+    if fmt not in SINK_FORMATS:
+        raise ValueError(f"Unknown sink format '{fmt}'. Use one of: {list(SINK_FORMATS)}")
+    return SINK_FORMATS[fmt](path)
+
+
+def write_chunks(chunks: Iterable[pd.DataFrame], sink: ChunkSink,
+                 on_chunk: Optional[Callable[[ChunkStats], None]] = None) -> int:
+    """
+    Stream `chunks` into `sink` one at a time (constant memory).
+    `on_chunk` receives generation + write timing for every chunk. Returns total rows written.
+    """
+    start = time.perf_counter()
+    t0 = start
+    for index, chunk in enumerate(chunks):
+        sink.write(chunk)
+        t1 = time.perf_counter()
+        if on_chunk is not None:
+            on_chunk(ChunkStats(index, len(chunk), sink.rows_written, t1 - t0, t1 - start))
+        t0 = t1
+    return sink.rows_written
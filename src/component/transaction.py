@@ -2,7 +2,18 @@ import pandas as pd
 import numpy as np
 import random
 import datetime
+import os
+import tempfile
 import torch
+from typing import Callable, Iterator, Optional
+
+from src.component.artifacts import export_ctgan_artifacts
+from src.component.ctgan_training import CTGANTrainer, TrainingProfile
+from src.component.customer_sampler import resolve_rng
+from src.component.merchant_index import MerchantIndex
+from src.component.parallel import generate_transactions_parallel, seed_synthesizer, spawn_seeds
+from src.component.postprocess import current_epoch, random_timestamps_within_30_days
+from src.component.sinks import ChunkStats, chunk_sizes, open_sink, write_chunks
 
 # SDV imports
 from sdv.single_table import SingleTableMetadata
@@ -34,6 +45,18 @@ CATEGORY_MAPPING = {
     "Massage Establishment": "personal_care"
 }
 
+# Monthly spending fractions per category (before household / income adjustments)
+BASE_ALLOCATION = {
+    'groceries': 0.18,
+    'dining': 0.12,
+    'transportation': 0.15,
+    'housing': 0.25,
+    'entertainment': 0.10,
+    'personal_care': 0.08,
+    'other': 0.12
+}
+SPENDING_CATEGORIES = list(BASE_ALLOCATION)
+
 def random_timestamp_within_30_days() -> str:
     """
     Return a random ISO 8601 timestamp (YYYY-MM-DD HH:MM:SS) within the last 30 days.
@@ -55,15 +78,9 @@ def generate_spending_pattern(customer: dict) -> dict:
     Generate a spending pattern for the customer based on their income and household size.
     Returns a dictionary of spending fractions per category.
     """
-    base_allocation = {
-        'groceries': 0.18 + (0.02 if customer.get('household_size', 1) > 2 else 0),
-        'dining': 0.12 + (0.03 if customer.get('income', 0) > 75000 else 0),
-        'transportation': 0.15,
-        'housing': 0.25,
-        'entertainment': 0.10,
-        'personal_care': 0.08,
-        'other': 0.12
-    }
+    base_allocation = dict(BASE_ALLOCATION)
+    base_allocation['groceries'] += 0.02 if customer.get('household_size', 1) > 2 else 0
+    base_allocation['dining'] += 0.03 if customer.get('income', 0) > 75000 else 0
     monthly_income = float(customer.get('income', 0)) / 12.0
     return {k: v * monthly_income for k, v in base_allocation.items()}
 
@@ -87,13 +104,15 @@ class TransactionSimulator:
             self.merchants['mapped_category'] = None
 
         self.merchants.dropna(subset=['mapped_category'], inplace=True)
+        self.merchants.reset_index(drop=True, inplace=True)
 
         # Ensure Zipcode is a string
         self.merchants['Zipcode'] = self.merchants['Zipcode'].astype(str)
 
-        # Group merchants by (Zipcode, mapped_category) for fast lookup
-        grouped = self.merchants.groupby(['Zipcode', 'mapped_category'])
-        self.merchant_dict = {(zipc, cat): group for (zipc, cat), group in grouped}
+        # Integer-coded (Zipcode, mapped_category) index for fast lookup
+        self.merchant_index = MerchantIndex(self.merchants['Zipcode'], self.merchants['mapped_category'],
+                                            category_labels=SPENDING_CATEGORIES)
+        self._merchant_records = None  # row dicts for get_merchant, built on first use
 
     def get_merchant(self, category: str, zipcode: str) -> dict:
         """
@@ -102,22 +121,25 @@ class TransactionSimulator:
          - Fall back to a random merchant of that category.
          - If none exist, return a generic fallback.
         """
-        zipcode_str = str(zipcode)
-        group = self.merchant_dict.get((zipcode_str, category), None)
-        if group is None or len(group) == 0:
-            fallback = self.merchants[self.merchants['mapped_category'] == category]
-            if len(fallback) == 0:
-                return {
-                    'merchant_name': f"DC {category.capitalize()} Service",
-                    'merchant_category': category
-                }
-            return fallback.sample(1).iloc[0].to_dict()
-        return group.sample(1).iloc[0].to_dict()
+        position = self.merchant_index.select_one(zipcode, category)
+        if position < 0:
+            return {
+                'merchant_name': f"DC {category.capitalize()} Service",
+                'merchant_category': category
+            }
+        if self._merchant_records is None:
+            self._merchant_records = self.merchants.to_dict('records')
+        return dict(self._merchant_records[position])
 
-    def simulate_transactions(self, num_per_customer=5) -> pd.DataFrame:
+    def simulate_transactions(self, num_per_customer=5, vectorized: bool = True, rng=None) -> pd.DataFrame:
         """
         Generate simulated transactions for each customer.
+        With vectorized=True (default) all rows are drawn as arrays in one pass;
+        vectorized=False keeps the original row-by-row loop.
         """
+        if vectorized:
+            return self.simulate_transactions_vectorized(num_per_customer, rng=rng)
+
         output_rows = []
         for _, cust in self.customers.iterrows():
             cust_dict = cust.to_dict()
@@ -141,6 +163,71 @@ class TransactionSimulator:
                 output_rows.append(row)
         return pd.DataFrame(output_rows)
 
+    def simulate_transactions_vectorized(self, num_per_customer=5, rng=None) -> pd.DataFrame:
+        """
+        Array-at-once equivalent of the row-by-row simulation, same columns and distributions:
+         - category uniform over the spending categories,
+         - amount = monthly pattern amount * U(0.05, 0.30),
+         - merchant drawn uniformly from the (zipcode, category) group, else the category,
+         - timestamp from int64 epoch seconds within the last 30 days (datetime64 column).
+        """
+        rng = resolve_rng(rng)
+        n_cust = len(self.customers)
+        n = n_cust * num_per_customer
+        cust_idx = np.repeat(np.arange(n_cust), num_per_customer)
+
+        # Customer attributes with the same defaults as cust_dict.get(...)
+        income = self._customer_column('income', 0).astype(float)
+        household_size = self._customer_column('household_size', 1).astype(float)
+        zipcodes = self._customer_column('zipcode', '20001')
+        customer_ids = self._customer_column('customer_id', None)
+
+        # Per-customer monthly amount for each category (n_cust x n_categories)
+        fractions = np.tile(np.array(list(BASE_ALLOCATION.values())), (n_cust, 1))
+        fractions[:, SPENDING_CATEGORIES.index('groceries')] += np.where(household_size > 2, 0.02, 0)
+        fractions[:, SPENDING_CATEGORIES.index('dining')] += np.where(income > 75000, 0.03, 0)
+        monthly = fractions * (income / 12.0)[:, None]
+
+        cat_codes = rng.integers(0, len(SPENDING_CATEGORIES), n)
+        amount = np.round(monthly[cust_idx, cat_codes] * rng.uniform(0.05, 0.30, n), 2)
+
+        categories = np.array(SPENDING_CATEGORIES, dtype=object)[cat_codes]
+        txn_zips = zipcodes[cust_idx]
+        merchant_names = self._draw_merchant_names(txn_zips, cat_codes, rng)
+
+        return pd.DataFrame({
+            'customer_id': customer_ids[cust_idx],
+            'zipcode': txn_zips,
+            'category': categories,
+            'merchant_name': merchant_names,
+            'mapped_category': categories,
+            'transaction_amount': amount,
+            'timestamp': random_timestamps_within_30_days(n, rng)
+        })
+
+    def _customer_column(self, column: str, default) -> np.ndarray:
+        """Customer column as an array, or `default` repeated when the column is missing."""
+        if column in self.customers.columns:
+            return self.customers[column].to_numpy()
+        return np.full(len(self.customers), default, dtype=object)
+
+    def _draw_merchant_names(self, zipcodes: np.ndarray, cat_codes: np.ndarray, rng) -> np.ndarray:
+        """
+        Merchant name for every (zipcode, category code) pair, with get_merchant's fallbacks,
+        selected in one batched MerchantIndex draw.
+        """
+        positions = self.merchant_index.select(self.merchant_index.encode_zipcodes(zipcodes), cat_codes, rng)
+        names = np.array([f"DC {c.capitalize()} Service" for c in SPENDING_CATEGORIES], dtype=object)[cat_codes]
+        found = positions >= 0
+        names[found] = self._merchant_names()[positions[found]]
+        return names
+
+    def _merchant_names(self) -> np.ndarray:
+        """Display name per merchant row, as chosen by simulate_transactions."""
+        if 'Name' in self.merchants.columns:
+            return self.merchants['Name'].to_numpy(dtype=object)
+        return np.full(len(self.merchants), "Unknown Merchant", dtype=object)
+
 # ----------------------------------
 # 3) CTGAN MODEL FOR TRANSACTIONS
 # ----------------------------------
@@ -150,10 +237,12 @@ class TransactionCTGAN:
     CTGAN-based synthesizer for generating transaction-level data.
     """
 
-    def __init__(self, epochs=50):
+    def __init__(self, epochs=50, training_profile: Optional[TrainingProfile] = None):
         self.epochs = epochs
+        self.training_profile = training_profile  # None = plain synthesizer.fit
         self.metadata = None
         self.synthesizer = None
+        self.trainer_ = None
 
     def fit(self, transactions_df: pd.DataFrame):
         """
@@ -181,30 +270,129 @@ class TransactionCTGAN:
         if 'transaction_amount' in modeling_df.columns:
             self.metadata.update_column('transaction_amount', sdtype='numerical')
 
+        if self.training_profile is None:
+            self.synthesizer = CTGANSynthesizer(
+                metadata=self.metadata,
+                enforce_rounding=False,
+                epochs=self.epochs,
+                verbose=True
+            )
+            self.synthesizer.fit(modeling_df)
+            self.trainer_ = None
+            return
+
+        # Performance profile: batch size / PAC / threads, early stopping, checkpoints, epoch log
         self.synthesizer = CTGANSynthesizer(
             metadata=self.metadata,
             enforce_rounding=False,
-            epochs=self.epochs,
-            verbose=True
+            **self.training_profile.synthesizer_kwargs(self.epochs)
         )
-        self.synthesizer.fit(modeling_df)
+        self.trainer_ = CTGANTrainer(self.training_profile)
+        self.trainer_.fit_synthesizer(self.synthesizer, modeling_df)
+
+    def partial_fit(self, transactions_df: pd.DataFrame, epochs: int = 5):
+        """
+        Warm-start update: continue training the fitted model for `epochs` epochs on
+        `transactions_df` (typically just the new rows). Metadata, the data transformer
+        and the generator / discriminator weights are reused, so the cost depends on
+        the new rows only, not on everything seen so far.
+        """
+        if not self.synthesizer:
+            raise RuntimeError("You must fit the model before calling partial_fit.")
+        modeling_df = transactions_df.drop(columns=['timestamp'], errors='ignore')
+        if self.trainer_ is None:
+            self.trainer_ = CTGANTrainer(self.training_profile or TrainingProfile(verbose=False))
+        self.trainer_.continue_synthesizer(self.synthesizer, modeling_df, epochs)
 
-    def generate(self, num_samples=1000) -> pd.DataFrame:
+    def generate(self, num_samples=1000, rng=None, now: Optional[int] = None) -> pd.DataFrame:
         """
-        Generate synthetic transactions and re-add a random timestamp to each row.
+        Generate synthetic transactions and re-add a random timestamp to each row
+        (within the 30 days before `now`, in epoch seconds; default: the current time).
         """
         if not self.synthesizer:
             raise RuntimeError("You must fit the model before generating samples.")
         synthetic_df = self.synthesizer.sample(num_rows=num_samples)
-        synthetic_df['timestamp'] = [random_timestamp_within_30_days() for _ in range(len(synthetic_df))]
+        synthetic_df['timestamp'] = random_timestamps_within_30_days(len(synthetic_df), rng, now)
         return synthetic_df
 
+    def generate_chunks(self, num_samples: int, chunk_size: int = 50_000, rng=None) -> Iterator[pd.DataFrame]:
+        """Yield `num_samples` synthetic transactions in batches of at most `chunk_size` rows."""
+        rng = resolve_rng(rng)
+        for size in chunk_sizes(num_samples, chunk_size):
+            yield self.generate(size, rng=rng)
+
+    def _seeded_chunks(self, num_samples: int, chunk_size: int, seed, now: int) -> Iterator[pd.DataFrame]:
+        """
+        In-process counterpart of generate_transactions_parallel: every chunk seeds the
+        synthesizer and its timestamps from its own SeedSequence child, so one (seed,
+        chunk_size, now) gives the same rows here as across a process pool.
+        """
+        sizes = list(chunk_sizes(num_samples, chunk_size))
+        for size, seed_seq in zip(sizes, spawn_seeds(seed, len(sizes))):
+            rng = seed_synthesizer(self.synthesizer, seed_seq)
+            yield self.generate(size, rng=rng, now=now)
+
+    def generate_to_sink(self, output_path: str, num_samples: int, chunk_size: int = 50_000,
+                         n_workers: Optional[int] = 1, seed=None, model_path: Optional[str] = None,
+                         torch_threads: int = 1,
+                         on_chunk: Optional[Callable[[ChunkStats], None]] = None,
+                         now: Optional[int] = None) -> int:
+        """
+        Stream `num_samples` synthetic transactions to `output_path` (.csv / .parquet / .arrow)
+        in fixed-size chunks, so memory stays bounded by `chunk_size`.
+
+        With n_workers=1 chunks are sampled in this process; otherwise (None = all cores)
+        every worker process loads its own copy of the synthesizer from 'model_path'
+        (saved to a temporary file first if not given). Either way the output is
+        determined by (seed, num_samples, chunk_size, now), with `now` (epoch seconds)
+        defaulting to the time of the call. Returns the number of rows written.
+        """
+        if not self.synthesizer:
+            raise RuntimeError("You must fit the model before generating samples.")
+        now = current_epoch() if now is None else now
+        if n_workers == 1:
+            with open_sink(output_path) as sink:
+                return write_chunks(self._seeded_chunks(num_samples, chunk_size, seed, now), sink,
+                                    on_chunk=on_chunk)
+
+        if model_path is not None:
+            return generate_transactions_parallel(model_path, num_samples, output_path, n_workers=n_workers,
+                                                  chunk_size=chunk_size, seed=seed,
+                                                  torch_threads=torch_threads, on_chunk=on_chunk, now=now)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, 'transaction_model.pkl')
+            self.save(model_path)
+            return generate_transactions_parallel(model_path, num_samples, output_path, n_workers=n_workers,
+                                                  chunk_size=chunk_size, seed=seed,
+                                                  torch_threads=torch_threads, on_chunk=on_chunk, now=now)
+
     def save(self, path: str):
         """Save the CTGAN synthesizer."""
         if not self.synthesizer:
             raise RuntimeError("No trained synthesizer to save.")
         self.synthesizer.save(path)
 
+    def save_trainer_state(self, path: str):
+        """Save the discriminator / optimizer state of the last training run (see partial_fit)."""
+        if self.trainer_ is None:
+            raise RuntimeError("No trainer state to save: fit with a training_profile first.")
+        self.trainer_.save_state(path)
+
+    def load_trainer_state(self, path: str):
+        """Restore state from save_trainer_state, so the next partial_fit continues that run."""
+        self.trainer_ = CTGANTrainer(self.training_profile or TrainingProfile(verbose=False))
+        self.trainer_.load_state(path)
+
+    def export_artifacts(self, path: str) -> str:
+        """
+        Export the trained generator for fast serving: memory-mappable weights
+        (generator.safetensors) plus transformer metadata (metadata.json) in directory `path`.
+        """
+        if not self.synthesizer:
+            raise RuntimeError("No trained synthesizer to export.")
+        return export_ctgan_artifacts(self.synthesizer, path, kind='TransactionCTGAN')
+
     @classmethod
     def load(cls, path: str):
         """Load a CTGAN synthesizer from disk."""